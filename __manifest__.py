@@ -15,16 +15,26 @@
     """,
     'author': 'Tu Empresa',
     'website': 'https://www.tuempresa.com',
-    'depends': ['base', 'web', 'portal', 'mail'],
+    'depends': ['base', 'web', 'portal', 'mail', 'bus'],
     'data': [
         # Seguridad
         'security/security.xml',
         'security/ir.model.access.csv',
         # Datos base
         'data/sports_types_data.xml',
+        'data/ir_cron_data.xml',
         # Vistas backend (orden importante: primero booking, luego field)
         'views/booking_views.xml',
+        'views/booking_recurrence_views.xml',
+        'views/booking_waitlist_views.xml',
         'views/sports_field_views.xml',
+        'views/sports_field_schedule_exception_views.xml',
+        'views/booking_mail_queue_views.xml',
+        'views/booking_report_views.xml',
+        'views/booking_archive_views.xml',
+        'views/booking_export_views.xml',
+        'views/booking_import_views.xml',
+        'views/route_metrics_views.xml',
         'views/menu_views.xml',
         # Portal
         'views/portal_templates.xml',
@@ -32,6 +42,9 @@
     'assets': {
         'web.assets_frontend': [
             'sports_booking/static/src/css/portal.css',
+        ],
+        # Calendario de reservas: solo en la página de nueva reserva
+        'sports_booking.assets_calendar': [
             'sports_booking/static/src/js/booking_calendar.js',
         ],
     },
@@ -1 +1,2 @@
-from . import portal
\ No newline at end of file
+from . import portal
+from . import export
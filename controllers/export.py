@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import tempfile
+
+import xlsxwriter
+
+from odoo import http, _, fields
+from odoo.http import request, content_disposition
+from odoo.exceptions import AccessError
+from odoo.modules.registry import Registry
+from odoo.tools import SQL
+from odoo.addons.sports_booking.models.booking_export import EXPORT_STATE_FILTERS
+
+
+class SportsBookingExportController(http.Controller):
+
+    # Filas leídas del cursor del servidor por cada viaje a la base de datos
+    _export_chunk_size = 2000
+    # Tamaño de los bloques de archivo enviados en la respuesta
+    _stream_block_size = 64 * 1024
+
+    _export_headers = [
+        'Referencia', 'Cliente', 'Email', 'Cancha', 'Deporte', 'Fecha',
+        'Hora Inicio', 'Hora Fin', 'Duración (horas)', 'Precio Total', 'Estado',
+    ]
+
+    @http.route(['/sports_booking/export'], type='http', auth='user', methods=['GET'])
+    def export_bookings(self, date_from, date_to, state='all', field_ids=None, format='csv', **kw):
+        """Exporta las reservas filtradas en streaming, con memoria constante"""
+        if not request.env.user.has_group('sports_booking.group_sports_booking_staff'):
+            raise AccessError(_('Solo el personal puede exportar reservas.'))
+
+        domain = [
+            ('booking_date', '>=', fields.Date.to_date(date_from)),
+            ('booking_date', '<=', fields.Date.to_date(date_to)),
+        ]
+        if EXPORT_STATE_FILTERS.get(state):
+            domain.append(('state', 'in', EXPORT_STATE_FILTERS[state]))
+        if field_ids:
+            domain.append(('field_id', 'in', [int(field_id) for field_id in field_ids.split(',')]))
+
+        # Los filtros y las reglas de acceso se resuelven aquí; la consulta se
+        # ejecuta luego, mientras se envía la respuesta, en su propio cursor
+        Booking = request.env['sports.booking']
+        Booking.check_access_rights('read')
+        query = SQL("""
+            SELECT b.name, p.name, p.email, f.name, b.sport_type, b.booking_date,
+                   b.start_time, b.end_time, b.duration, b.total_price, b.state
+            FROM sports_booking b
+            JOIN res_partner p ON p.id = b.partner_id
+            JOIN sports_field f ON f.id = b.field_id
+            WHERE b.id IN %s
+            ORDER BY b.booking_date, b.start_time, b.id
+        """, Booking._search(domain).subselect())
+        labels = {
+            'sport_type': dict(Booking._fields['sport_type']._description_selection(request.env)),
+            'state': dict(Booking._fields['state']._description_selection(request.env)),
+        }
+
+        filename = 'reservas_%s_%s.%s' % (date_from, date_to, 'xlsx' if format == 'xlsx' else 'csv')
+        if format == 'xlsx':
+            body = self._stream_xlsx(request.env.cr.dbname, query, labels, _('Reservas'))
+            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        else:
+            body = self._stream_csv(request.env.cr.dbname, query, labels)
+            content_type = 'text/csv; charset=utf-8'
+        return http.Response(body, headers=[
+            ('Content-Type', content_type),
+            ('Content-Disposition', content_disposition(filename)),
+            ('Cache-Control', 'no-store'),
+        ], direct_passthrough=True)
+
+    def _iter_rows(self, dbname, query, labels):
+        """Recorre el resultado con un cursor con nombre (del lado del servidor)
+
+        Abre un cursor nuevo del registro porque la respuesta se genera después
+        de que se cierra el de la petición. PostgreSQL entrega las filas por
+        bloques de ``_export_chunk_size``, así que en memoria hay un solo bloque.
+        """
+        with Registry(dbname).cursor() as cr:
+            server_cursor = cr._cnx.cursor('sports_booking_export')
+            try:
+                server_cursor.execute(query.code, query.params)
+                while True:
+                    rows = server_cursor.fetchmany(self._export_chunk_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield self._format_row(row, labels)
+            finally:
+                server_cursor.close()
+
+    def _format_row(self, row, labels):
+        (name, partner, email, field, sport_type, booking_date,
+         start_time, end_time, duration, total_price, state) = row
+        return [
+            name, partner, email or '', field, labels['sport_type'].get(sport_type, sport_type or ''),
+            fields.Date.to_string(booking_date), self._format_time(start_time), self._format_time(end_time),
+            duration, total_price, labels['state'].get(state, state),
+        ]
+
+    def _format_time(self, value):
+        return '{:02.0f}:{:02.0f}'.format(*divmod(round((value or 0.0) * 60), 60))
+
+    def _stream_csv(self, dbname, query, labels):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM para que Excel detecte UTF-8
+        buffer.write('\ufeff')
+        writer.writerow(self._export_headers)
+        for index, row in enumerate(self._iter_rows(dbname, query, labels), 1):
+            writer.writerow(row)
+            if index % self._export_chunk_size == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+
+    def _stream_xlsx(self, dbname, query, labels, sheet_name):
+        """XLSX en modo ``constant_memory``: cada fila se vuelca a disco al escribirla
+
+        El formato es un zip que solo queda completo al cerrar el libro, así que
+        se arma en un archivo temporal y después se envía por bloques.
+        """
+        with tempfile.TemporaryFile() as output:
+            workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+            worksheet = workbook.add_worksheet(sheet_name)
+            bold = workbook.add_format({'bold': True})
+            worksheet.write_row(0, 0, self._export_headers, bold)
+            for index, row in enumerate(self._iter_rows(dbname, query, labels), 1):
+                worksheet.write_row(index, 0, row)
+            workbook.close()
+            output.seek(0)
+            while True:
+                block = output.read(self._stream_block_size)
+                if not block:
+                    break
+                yield block
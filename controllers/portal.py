@@ -1,43 +1,57 @@
 # -*- coding: utf-8 -*-
 from odoo import http, _, fields
 from odoo.http import request
-from odoo.addons.portal.controllers.portal import CustomerPortal, pager as portal_pager
+from odoo.addons.portal.controllers.portal import CustomerPortal
 from odoo.exceptions import AccessError, MissingError
+from odoo.osv import expression
+from odoo.addons.sports_booking.models.route_metrics import instrumented, get_route_stats
 from datetime import datetime, timedelta
+import base64
 import json
+from urllib.parse import urlencode
 
 class SportsBookingPortal(CustomerPortal):
     
+    # Máximo de días que se pueden consultar en una llamada de disponibilidad
+    _availability_max_days = 31
+    
+    def _get_booking_count(self):
+        """Total de reservas del usuario actual, calculado con un único read_group"""
+        partner = request.env.user.partner_id
+        return partner.booking_count if partner else 0
+    
     def _prepare_home_portal_values(self, counters):
         """Sobrescribir para agregar contador de reservas"""
         values = super()._prepare_home_portal_values(counters)
         
         # Agregar contador de reservas
         if 'booking_count' in counters:
-            partner = request.env.user.partner_id
-            booking_count = request.env['sports.booking'].search_count([
-                ('partner_id', '=', partner.id)
-            ]) if partner else 0
-            values['booking_count'] = booking_count
+            values['booking_count'] = self._get_booking_count()
         
         return values
     
-    def _prepare_portal_layout_values(self):
-        """Preparar valores base para el layout del portal"""
-        values = super()._prepare_portal_layout_values()
-        partner = request.env.user.partner_id
-        
-        # Agregar contador de reservas al layout
-        booking_count = request.env['sports.booking'].search_count([
-            ('partner_id', '=', partner.id)
-        ]) if partner else 0
-        values['booking_count'] = booking_count
-        
-        return values
+    @http.route()
+    def home(self, **kw):
+        """Agregar el contador solo en la página de inicio del portal, que lo muestra"""
+        response = super().home(**kw)
+        response.qcontext['booking_count'] = self._get_booking_count()
+        return response
     
     @http.route(['/my/bookings', '/my/bookings/page/<int:page>'], type='http', auth='user', website=True)
-    def portal_my_bookings(self, page=1, date_begin=None, date_end=None, sortby=None, filterby=None, **kw):
-        """Lista de reservas del usuario"""
+    @instrumented('portal_my_bookings')
+    def portal_my_bookings(self, page=1, date_begin=None, date_end=None, sortby=None, filterby=None,
+                           after=None, before=None, **kw):
+        """Lista de reservas del usuario
+        
+        Paginación por clave (keyset): cada página continúa desde la última
+        fila de la anterior en vez de saltar ``offset`` filas, así el costo
+        no depende de la profundidad de la página.
+        """
+        if not sortby:
+            sortby = 'date'
+        if not filterby:
+            filterby = 'all'
+        
         values = self._prepare_portal_layout_values()
         SportsBooking = request.env['sports.booking']
         partner = request.env.user.partner_id
@@ -52,10 +66,11 @@ class SportsBookingPortal(CustomerPortal):
         elif filterby == 'cancelled':
             domain += [('state', '=', 'cancelled')]
         
+        # Cada orden termina en id para que la clave de paginación sea única
         searchbar_sortings = {
-            'date': {'label': _('Fecha'), 'order': 'booking_date desc'},
-            'name': {'label': _('Referencia'), 'order': 'name desc'},
-            'state': {'label': _('Estado'), 'order': 'state'},
+            'date': {'label': _('Fecha'), 'keys': [('booking_date', 'desc'), ('start_time', 'desc'), ('id', 'desc')]},
+            'name': {'label': _('Referencia'), 'keys': [('name', 'desc'), ('id', 'desc')]},
+            'state': {'label': _('Estado'), 'keys': [('state', 'asc'), ('booking_date', 'desc'), ('id', 'desc')]},
         }
         
         searchbar_filters = {
@@ -65,30 +80,56 @@ class SportsBookingPortal(CustomerPortal):
             'cancelled': {'label': _('Canceladas'), 'domain': []},
         }
         
-        if not sortby:
-            sortby = 'date'
-        if not filterby:
-            filterby = 'all'
-        
-        order = searchbar_sortings[sortby]['order']
+        keys = searchbar_sortings.get(sortby, searchbar_sortings['date'])['keys']
+        url_args = {'sortby': sortby, 'filterby': filterby}
+        if page > 1:
+            # URLs antiguas por número de página: se busca la última fila de la
+            # página anterior y se continúa desde ella con el mismo orden y filtro
+            # (si la página ya no existe, se vuelve al inicio del listado)
+            previous = SportsBooking.search(
+                domain, order=', '.join('%s %s' % key for key in keys),
+                offset=(page - 1) * self._items_per_page - 1, limit=1,
+            )
+            if previous:
+                url_args['after'] = self._encode_keyset_cursor(previous, keys)
+            return request.redirect('/my/bookings?%s' % urlencode(url_args))
+        cursor = self._decode_keyset_cursor(before or after, keys)
+        backwards = bool(before and cursor)
+        if backwards:
+            # Página anterior: se recorre en orden inverso y se da vuelta el resultado
+            keys = [(fname, 'asc' if direction == 'desc' else 'desc') for fname, direction in keys]
+        if cursor:
+            domain = expression.AND([domain, self._keyset_domain(keys, cursor)])
         
-        # Paginación
-        booking_count = SportsBooking.search_count(domain)
-        pager = portal_pager(
-            url="/my/bookings",
-            url_args={'sortby': sortby, 'filterby': filterby},
-            total=booking_count,
-            page=page,
-            step=self._items_per_page
+        # Una sola lectura con exactamente los campos que usa la plantilla
+        bookings = SportsBooking.search_fetch(
+            domain, self._portal_booking_list_fields,
+            order=', '.join('%s %s' % key for key in keys),
+            limit=self._items_per_page + 1,
         )
+        has_more = len(bookings) > self._items_per_page
+        bookings = bookings[:self._items_per_page]
+        if backwards:
+            bookings = bookings[::-1]
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = bool(cursor), has_more
         
-        bookings = SportsBooking.search(domain, order=order, limit=self._items_per_page, offset=pager['offset'])
+        keyset_pager = {
+            'first': '/my/bookings?%s' % urlencode(url_args) if has_previous else False,
+            'previous': '/my/bookings?%s' % urlencode(dict(
+                url_args, before=self._encode_keyset_cursor(bookings[0], keys))) if has_previous and bookings else False,
+            'next': '/my/bookings?%s' % urlencode(dict(
+                url_args, after=self._encode_keyset_cursor(bookings[-1], keys))) if has_next and bookings else False,
+        }
         
         values.update({
             'bookings': bookings,
+            # El total sin filtros ya se calcula para el contador del portal
+            'booking_count': self._get_booking_count() if filterby == 'all' else False,
             'page_name': 'booking',
             'default_url': '/my/bookings',
-            'pager': pager,
+            'keyset_pager': keyset_pager,
             'searchbar_sortings': searchbar_sortings,
             'searchbar_filters': searchbar_filters,
             'sortby': sortby,
@@ -97,7 +138,69 @@ class SportsBookingPortal(CustomerPortal):
         
         return request.render("sports_booking.portal_my_bookings", values)
     
+    # Campos que muestra el listado de reservas del portal
+    _portal_booking_list_fields = [
+        'name', 'field_id', 'sport_type', 'booking_date', 'start_time', 'end_time',
+        'duration', 'total_price', 'state',
+    ]
+    
+    def _keyset_domain(self, keys, cursor):
+        """Dominio de las filas posteriores a ``cursor`` en el orden ``keys``
+        
+        Equivale a la comparación de filas ``(a, b, c) < (x, y, z)`` expandida
+        en OR; la cota sobre la primera clave permite a PostgreSQL empezar el
+        recorrido del índice directamente en la posición del cursor.
+        """
+        clauses = []
+        for index, (fname, direction) in enumerate(keys):
+            clause = [(key[0], '=', value) for key, value in zip(keys[:index], cursor[:index])]
+            clause.append((fname, '<' if direction == 'desc' else '>', cursor[index]))
+            clauses.append(clause)
+        first_field, first_direction = keys[0]
+        bound = [(first_field, '<=' if first_direction == 'desc' else '>=', cursor[0])]
+        return expression.AND([bound, expression.OR(clauses)])
+    
+    def _encode_keyset_cursor(self, booking, keys):
+        values = [booking[fname] for fname, _direction in keys]
+        values = [fields.Date.to_string(value) if fname == 'booking_date' else value
+                  for (fname, _direction), value in zip(keys, values)]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    
+    def _decode_keyset_cursor(self, token, keys):
+        """Valores del cursor en el orden ``keys``, o None si el cursor no es válido
+        
+        El cursor viene de la URL: un valor con un tipo que no corresponde al
+        campo reinicia el listado en lugar de llegar al dominio.
+        """
+        if not token:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()))
+        except ValueError:
+            return None
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        booking_fields = request.env['sports.booking']._fields
+        for (fname, _direction), value in zip(keys, values):
+            field_type = booking_fields[fname].type
+            if field_type == 'date':
+                try:
+                    if not isinstance(value, str) or not fields.Date.to_date(value):
+                        return None
+                except ValueError:
+                    return None
+            elif field_type in ('char', 'selection'):
+                if not isinstance(value, str):
+                    return None
+            elif field_type == 'integer':
+                if not isinstance(value, int) or isinstance(value, bool):
+                    return None
+            elif not isinstance(value, (int, float)) or isinstance(value, bool):
+                return None
+        return values
+    
     @http.route(['/my/bookings/<int:booking_id>'], type='http', auth='user', website=True)
+    @instrumented('portal_booking_detail')
     def portal_booking_detail(self, booking_id, access_token=None, **kw):
         """Detalle de una reserva"""
         try:
@@ -107,17 +210,19 @@ class SportsBookingPortal(CustomerPortal):
         
         values = self._prepare_portal_layout_values()
         values.update({
-            'booking': booking_sudo,
+            # bin_size: la plantilla solo comprueba si hay imagen, sin cargarla
+            'booking': booking_sudo.with_context(bin_size=True),
             'page_name': 'booking',
         })
         
         return request.render("sports_booking.portal_booking_detail", values)
     
     @http.route(['/bookings/new'], type='http', auth='public', website=True)
+    @instrumented('booking_new')
     def booking_new(self, **kw):
         """Página para crear nueva reserva"""
         if not request.env.user or request.env.user._is_public():
-            return request.redirect('/web/login?redirect=/bookings/new')
+            return request.redirect('/web/login?%s' % urlencode({'redirect': request.httprequest.full_path}))
         
         fields_active = request.env['sports.field'].sudo().search([('active', '=', True)], order='name')
         
@@ -125,11 +230,15 @@ class SportsBookingPortal(CustomerPortal):
             'fields': fields_active,
             'page_name': 'new_booking',
             'today': fields.Date.today().strftime('%Y-%m-%d'),
+            # Preselección al llegar desde la búsqueda de horarios
+            'selected_field_id': int(kw['field_id']) if kw.get('field_id', '').isdigit() else False,
+            'selected_date': kw.get('date', ''),
         }
         
         return request.render("sports_booking.portal_booking_new", values)
     
     @http.route(['/bookings/available-slots'], type='json', auth='public', website=True)
+    @instrumented('get_available_slots')
     def get_available_slots(self, field_id, date, **kw):
         """API para obtener slots disponibles"""
         try:
@@ -150,7 +259,147 @@ class SportsBookingPortal(CustomerPortal):
         except Exception as e:
             return {'error': str(e)}
     
+    @http.route(['/bookings/available-slots/batch'], type='json', auth='public', website=True)
+    @instrumented('get_available_slots_batch')
+    def get_available_slots_batch(self, field_ids=None, date_from=None, days=7, **kw):
+        """API para obtener la disponibilidad de varias canchas y días en una sola llamada"""
+        try:
+            today = fields.Date.today()
+            date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else today
+            if date_from < today:
+                date_from = today
+            days = min(max(int(days), 1), self._availability_max_days)
+            date_to = date_from + timedelta(days=days - 1)
+            
+            Field = request.env['sports.field'].sudo()
+            if field_ids:
+                sports_fields = Field.browse([int(field_id) for field_id in field_ids]).exists()
+                sports_fields = sports_fields.filtered('active')
+            else:
+                sports_fields = Field.search([('active', '=', True)], order='name')
+            
+            availability = sports_fields._apply_holds(
+                Field._get_availability_cached(tuple(sports_fields.ids), date_from, date_to),
+                date_from, date_to, exclude_uid=request.env.uid,
+            )
+            
+            return {
+                'success': True,
+                'date_from': fields.Date.to_string(date_from),
+                'date_to': fields.Date.to_string(date_to),
+                'fields': {
+                    field.id: {
+                        'field_name': field.name,
+                        'price_per_hour': field.price_per_hour,
+                        'slots': availability[field.id],
+                    }
+                    for field in sports_fields
+                },
+            }
+        except Exception as e:
+            return {'error': str(e)}
+    
+    # Límites de la búsqueda del próximo horario libre
+    _next_slots_max_results = 50
+    
+    def _search_next_slots(self, sport_type, date_from=None, time_from=None, duration=1.0,
+                           max_price=None, limit=10, days=14):
+        """Normaliza los parámetros y busca los próximos horarios libres de un deporte"""
+        now = fields.Datetime.context_timestamp(request.env.user, fields.Datetime.now())
+        today = now.date()
+        date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else today
+        time_from = float(time_from) if time_from not in (None, '') else 0.0
+        if date_from <= today:
+            date_from = today
+            time_from = max(time_from, now.hour + now.minute / 60.0)
+        return request.env['sports.field']._find_next_slots(
+            sport_type, date_from, time_from=time_from, duration=float(duration),
+            max_price=float(max_price) if max_price not in (None, '') else None,
+            limit=min(max(int(limit), 1), self._next_slots_max_results),
+            max_days=min(max(int(days), 1), self._availability_max_days),
+        )
+    
+    @http.route(['/bookings/next-slots'], type='json', auth='public', website=True)
+    @instrumented('get_next_slots')
+    def get_next_slots(self, sport_type, date_from=None, time_from=None, duration=1.0,
+                       max_price=None, limit=10, days=14, **kw):
+        """API para obtener los próximos horarios libres de un deporte en todas sus canchas"""
+        try:
+            return {
+                'success': True,
+                'slots': self._search_next_slots(sport_type, date_from, time_from, duration,
+                                                 max_price, limit, days),
+            }
+        except Exception as e:
+            return {'error': str(e)}
+    
+    @http.route(['/bookings/search'], type='http', auth='public', website=True)
+    @instrumented('booking_search')
+    def booking_search(self, sport_type=None, date_from=None, time_from=None, duration=None,
+                       max_price=None, **kw):
+        """Página de búsqueda del próximo horario libre"""
+        now = fields.Datetime.context_timestamp(request.env.user, fields.Datetime.now())
+        values = {
+            'page_name': 'booking_search',
+            'sport_types': request.env['sports.field']._fields['sport_type']._description_selection(request.env),
+            'sport_type': sport_type,
+            'date_from': date_from or now.strftime('%Y-%m-%d'),
+            'time_from': time_from or now.strftime('%H:%M'),
+            'duration': duration or '1',
+            'max_price': max_price or '',
+            'slots': None,
+        }
+        if sport_type:
+            try:
+                hours, minutes = (values['time_from'].split(':') + ['0'])[:2]
+                values['slots'] = self._search_next_slots(
+                    sport_type, values['date_from'], int(hours) + int(minutes) / 60.0,
+                    values['duration'], max_price)
+            except ValueError:
+                values['error'] = _('Los parámetros de búsqueda no son válidos.')
+        return request.render("sports_booking.portal_booking_search", values)
+    
+    @http.route(['/bookings/hold'], type='json', auth='user', website=True)
+    @instrumented('booking_hold')
+    def booking_hold(self, field_id, date, start_time, end_time, **kw):
+        """Retiene un horario unos minutos mientras el cliente completa la reserva"""
+        try:
+            field = request.env['sports.field'].sudo().browse(int(field_id)).exists()
+            booking_date = datetime.strptime(date, '%Y-%m-%d').date()
+            if not field or booking_date < fields.Date.today():
+                return {'error': _('El horario seleccionado no es válido.')}
+            expires_at, error = request.env['sports.booking.hold'].sudo()._acquire(
+                field, booking_date, float(start_time), float(end_time))
+            if error:
+                return {'error': error}
+            return {
+                'success': True,
+                'expires_at': fields.Datetime.to_string(expires_at),
+                'expires_in': int((expires_at - fields.Datetime.now()).total_seconds()),
+            }
+        except Exception as e:
+            return {'error': str(e)}
+    
+    @http.route(['/bookings/waitlist'], type='json', auth='user', website=True)
+    @instrumented('booking_waitlist')
+    def booking_waitlist(self, field_id, date, start_time, end_time, **kw):
+        """Anota al cliente en la lista de espera de un horario ocupado"""
+        try:
+            field = request.env['sports.field'].sudo().browse(int(field_id)).exists()
+            booking_date = datetime.strptime(date, '%Y-%m-%d').date()
+            if not field or booking_date < fields.Date.today():
+                return {'error': _('El horario seleccionado no es válido.')}
+            entry, error = request.env['sports.booking.waitlist'].sudo()._join(
+                request.env.user.partner_id, field, booking_date, float(start_time), float(end_time),
+                user=request.env.user)
+            if error:
+                return {'error': error}
+            return {'success': True, 'state': entry.state}
+        except Exception as e:
+            return {'error': str(e)}
+    
     @http.route(['/bookings/create'], type='http', auth='user', website=True, methods=['POST'], csrf=True)
+    @instrumented('booking_create')
     def booking_create(self, **post):
         """Crear nueva reserva"""
         try:
@@ -170,6 +419,7 @@ class SportsBookingPortal(CustomerPortal):
                 'notes': post.get('notes', ''),
                 'players_count': int(post.get('players_count', 0)) if post.get('players_count') else 0,
                 'state': 'pending',
+                'portal_created': True,
             })
             
             # Confirmar automáticamente
@@ -181,6 +431,7 @@ class SportsBookingPortal(CustomerPortal):
             return request.redirect('/bookings/new?error=%s' % str(e))
     
     @http.route(['/bookings/cancel/<int:booking_id>'], type='http', auth='user', website=True, methods=['POST'], csrf=True)
+    @instrumented('booking_cancel')
     def booking_cancel(self, booking_id, **kw):
         """Cancelar reserva"""
         try:
@@ -202,25 +453,33 @@ class SportsBookingPortal(CustomerPortal):
             return request.redirect('/my/bookings?error=%s' % str(e))
     
     @http.route(['/bookings/fields'], type='http', auth='public', website=True)
+    @instrumented('booking_fields_list')
     def booking_fields_list(self, **kw):
         """Catálogo público de canchas"""
         sport_type = kw.get('sport_type', False)
         
-        domain = [('active', '=', True)]
-        if sport_type:
-            domain.append(('sport_type', '=', sport_type))
-        
-        fields_active = request.env['sports.field'].sudo().search(domain, order='name')
+        Field = request.env['sports.field']
+        field_ids, sport_types = Field._get_catalog(sport_type or False)
+        # La página lleva contenido de la sesión (token CSRF de los formularios,
+        # menú del usuario, plantillas del sitio): ni el navegador ni un proxy
+        # deben guardarla. Las miniaturas de /web/image sí se guardan.
+        headers = [('Cache-Control', 'no-store')]
         
-        # Obtener tipos de deporte únicos
-        sport_types = request.env['sports.field'].sudo().search([('active', '=', True)]).mapped('sport_type')
-        sport_types = list(set(sport_types))
+        # bin_size: las imágenes se sirven aparte, en miniatura, desde /web/image
+        fields_active = request.env['sports.field'].sudo().with_context(bin_size=True).browse(field_ids)
         
         values = {
             'fields': fields_active,
-            'sport_types': sport_types,
+            'sport_types': list(sport_types),
             'selected_sport': sport_type,
             'page_name': 'fields_catalog',
         }
         
-        return request.render("sports_booking.portal_fields_catalog", values)
\ No newline at end of file
+        return request.render("sports_booking.portal_fields_catalog", values, headers=headers)
+    
+    @http.route(['/sports_booking/route-metrics'], type='http', auth='user', methods=['GET'])
+    def route_metrics(self, **kw):
+        """Percentiles de consultas y latencia por ruta (solo administradores)"""
+        if not request.env.user.has_group('sports_booking.group_sports_booking_admin'):
+            raise AccessError(_('Solo los administradores pueden consultar las métricas.'))
+        return request.make_json_response(get_route_stats())
@@ -1,3 +1,14 @@
 from . import sports_field
+from . import sports_field_pricing_rule
+from . import sports_field_schedule_exception
 from . import booking
-from . import res_partner
\ No newline at end of file
+from . import booking_recurrence
+from . import booking_hold
+from . import booking_waitlist
+from . import booking_mail_queue
+from . import booking_archive
+from . import booking_report
+from . import booking_export
+from . import booking_import
+from . import res_partner
+from . import route_metrics
\ No newline at end of file
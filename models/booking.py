@@ -1,7 +1,61 @@
-from odoo import models, fields, api, _
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+
+import psycopg2
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError, UserError
 from datetime import datetime, timedelta
 
+from .scheduling import find_conflict, interval_price
+
+_logger = logging.getLogger(__name__)
+
+# Estados que ocupan la cancha (bloquean el horario para otras reservas)
+BOOKING_ACTIVE_STATES = ['pending', 'confirmed', 'in_progress']
+
+# Rango [inicio, fin) de la reserva como timestamp, usado por la restricción de exclusión
+BOOKING_TSRANGE_SQL = (
+    "tsrange(booking_date + start_time * interval '1 hour', "
+    "booking_date + end_time * interval '1 hour', '[)')"
+)
+BOOKING_ACTIVE_STATES_SQL = "state IN (%s)" % ', '.join("'%s'" % state for state in BOOKING_ACTIVE_STATES)
+
+# Canal del bus con la disponibilidad de una cancha en un día (string: se
+# puede suscribir desde el portal, también como usuario público)
+AVAILABILITY_CHANNEL = 'sports_booking.availability/%s/%s'
+AVAILABILITY_NOTIFICATION = 'sports_booking/availability'
+
+# Modos de seguimiento del chatter (parámetros sports_booking.tracking_mode para las
+# reservas del backend y sports_booking.portal_tracking_mode para las del portal):
+# 'full' sigue todos los campos, 'state' solo el estado y 'off' no registra nada
+TRACKING_MODES = ('full', 'state', 'off')
+TRACKING_STATE_FIELDS = {'state'}
+# Clave de contexto para operaciones masivas e importaciones: sin chatter ni seguimiento
+SKIP_CHATTER_CONTEXT = 'sports_booking_skip_chatter'
+# Marca de la transacción (no del contexto, que puede enviar cualquier cliente
+# RPC) mientras se escriben reservas cuyo horario ya se validó
+SCHEDULE_CHECKED_KEY = 'sports_booking.schedule_checked'
+
+# Índices de las consultas frecuentes: (nombre, expresiones, condición del índice parcial).
+# Solapes y disponibilidad por cancha también pueden usar el índice GiST de no_overlap.
+BOOKING_INDEXES = [
+    # Disponibilidad, validación de solapes, contadores e informe por cancha y fecha
+    ('sports_booking_field_date_idx', ['field_id', 'booking_date'], ''),
+    # Portal: reservas del cliente en el orden del listado
+    ('sports_booking_partner_date_idx', ['partner_id', 'booking_date DESC', 'start_time DESC', 'id DESC'], ''),
+    # Cron de cambio automático de estado
+    ('sports_booking_clock_idx', ['booking_date', 'start_time'], "state IN ('confirmed', 'in_progress')"),
+]
+# Índices de versiones anteriores, cubiertos por los de BOOKING_INDEXES
+BOOKING_OBSOLETE_INDEXES = [
+    'sports_booking_field_date_active_idx',
+    'sports_booking_field_date_state_idx',
+    'sports_booking_date_order_idx',
+]
+
+
 class SportsBooking(models.Model):
     _name = 'sports.booking'
     _description = 'Reserva de Cancha'
@@ -51,15 +105,261 @@ class SportsBooking(models.Model):
     confirmation_date = fields.Datetime(string='Fecha de Confirmación', readonly=True, tracking=True)
     user_id = fields.Many2one('res.users', string='Responsable', default=lambda self: self.env.user, tracking=True)
     
+    # Origen de la reserva: define el modo de seguimiento del chatter
+    portal_created = fields.Boolean(string='Creada desde el Portal', readonly=True, copy=False)
+    
+    # Serie recurrente de origen
+    recurrence_id = fields.Many2one('sports.booking.recurrence', string='Serie Recurrente',
+                                    index=True, ondelete='set null', copy=False, readonly=True)
+    
     _sql_constraints = [
         ('check_times', 'CHECK(end_time > start_time)', 'La hora de fin debe ser posterior a la hora de inicio!'),
+        # Requiere la extensión btree_gist (ver _auto_init) para combinar field_id con el rango
+        ('no_overlap',
+         'EXCLUDE USING gist (field_id WITH =, %s WITH &&) WHERE (%s)' % (BOOKING_TSRANGE_SQL, BOOKING_ACTIVE_STATES_SQL),
+         'Ya existe una reserva para esta cancha en el horario seleccionado!'),
     ]
     
+    def _auto_init(self):
+        # La extensión debe existir antes de que se creen las restricciones SQL
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        except psycopg2.Error:
+            _logger.warning(
+                "No se pudo instalar la extensión btree_gist; la restricción de solape "
+                "de reservas solo se validará en Python."
+            )
+        return super()._auto_init()
+    
+    def init(self):
+        for indexname in BOOKING_OBSOLETE_INDEXES:
+            tools.drop_index(self.env.cr, indexname, self._table)
+        for indexname, expressions, where in BOOKING_INDEXES:
+            tools.create_index(self.env.cr, indexname, self._table, expressions, where=where)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        to_name = [vals for vals in vals_list if vals.get('name', _('Nuevo')) == _('Nuevo')]
+        for vals, name in zip(to_name, self._reserve_booking_names(len(to_name))):
+            vals['name'] = name
+        
+        # Validar el lote completo antes de insertar, para reportar conflictos
+        # legibles en lugar del error de la restricción de exclusión (salvo que
+        # el llamador ya lo haya validado, ver _create_prechecked)
+        if not self.env.cr.precommit.data.get(SCHEDULE_CHECKED_KEY):
+            defaults = self.default_get(['state', 'booking_date'])
+            entries = []
+            for vals in vals_list:
+                state = vals.get('state', defaults.get('state'))
+                booking_date = vals.get('booking_date', defaults.get('booking_date'))
+                if state in ['cancelled', 'draft'] or not all((
+                        vals.get('field_id'), booking_date, 'start_time' in vals, 'end_time' in vals)):
+                    continue
+                entries.append((
+                    False, vals['name'], self.env['sports.field'].browse(vals['field_id']),
+                    fields.Date.to_date(booking_date), vals['start_time'], vals['end_time'],
+                ))
+            self._check_schedule(entries)
+        
+        with self._schedule_prechecked():
+            bookings = self._create_by_tracking_mode(vals_list)
+        footprint = bookings._get_availability_footprint()
+        if footprint:
+            self.env['sports.field']._bump_availability_version(
+                (field_id, booking_date) for field_id, booking_date, _start, _end in footprint)
+            self._notify_availability(footprint)
+        bookings._mark_report_dirty()
+        # Los horarios retenidos por el usuario que se acaban de reservar
+        self.env['sports.booking.hold'].sudo()._release_booked(bookings)
+        self.env['sports.booking.waitlist'].sudo()._mark_booked(bookings)
+        return bookings.with_env(self.env)
+    
+    def write(self, vals):
+        if not any(fname in vals for fname in ['field_id', 'booking_date', 'start_time', 'end_time', 'state']):
+            return super().write(vals)
+        footprint = self._get_availability_footprint()
+        self._mark_report_dirty()
+        res = super().write(vals)
+        new_footprint = self._get_availability_footprint()
+        changes = footprint ^ new_footprint
+        if changes:
+            self.env['sports.field']._bump_availability_version(
+                (field_id, booking_date) for field_id, booking_date, _start, _end in changes)
+            self._notify_availability(changes)
+            # Horarios liberados (cancelación o cambio de horario): ofrecerlos a la lista de espera
+            self.env['sports.booking.waitlist']._schedule_promotion(footprint - new_footprint)
+        self._mark_report_dirty()
+        return res
+    
+    def unlink(self):
+        footprint = self._get_availability_footprint()
+        self._mark_report_dirty()
+        res = super().unlink()
+        if footprint:
+            self.env['sports.field']._bump_availability_version(
+                (field_id, booking_date) for field_id, booking_date, _start, _end in footprint)
+            self._notify_availability(footprint)
+            self.env['sports.booking.waitlist']._schedule_promotion(footprint)
+        return res
+    
+    @api.model
+    def _create_prechecked(self, vals_list):
+        """Crea reservas cuyo horario ya validó el llamador, como la importación masiva"""
+        with self._schedule_prechecked():
+            return self.create(vals_list)
+    
+    @contextmanager
+    def _schedule_prechecked(self):
+        """Omite la validación de horarios de las reservas escritas dentro del bloque
+        
+        La marca se guarda en el cursor y se retira al salir, así que solo la
+        pueden activar los métodos del servidor; la restricción de exclusión
+        sigue protegiendo los solapes.
+        """
+        data = self.env.cr.precommit.data
+        if data.get(SCHEDULE_CHECKED_KEY):
+            yield
+            return
+        data[SCHEDULE_CHECKED_KEY] = True
+        try:
+            yield
+        finally:
+            data.pop(SCHEDULE_CHECKED_KEY, None)
+    
+    @api.model
+    def _get_tracking_modes(self):
+        """Retorna el modo de seguimiento de las reservas del backend y del portal"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        backend_mode = ICP.get_param('sports_booking.tracking_mode', 'full')
+        portal_mode = ICP.get_param('sports_booking.portal_tracking_mode', 'off')
+        return (
+            backend_mode if backend_mode in TRACKING_MODES else 'full',
+            portal_mode if portal_mode in TRACKING_MODES else 'off',
+        )
+    
+    def _group_by_tracking_mode(self):
+        """Agrupa las reservas por modo de seguimiento: ``{modo: reservas}``"""
+        if self.env.context.get(SKIP_CHATTER_CONTEXT) or self.env.context.get('tracking_disable'):
+            return {'off': self}
+        backend_mode, portal_mode = self._get_tracking_modes()
+        ids_by_mode = defaultdict(list)
+        for booking in self:
+            ids_by_mode[portal_mode if booking.portal_created else backend_mode].append(booking.id)
+        return {mode: self.browse(ids) for mode, ids in ids_by_mode.items()}
+    
+    def _create_by_tracking_mode(self, vals_list):
+        """Crea las reservas sin chatter (mensaje de creación, seguidores ni
+        seguimiento) cuando su modo de seguimiento es 'off'"""
+        if self.env.context.get(SKIP_CHATTER_CONTEXT):
+            return super(SportsBooking, self.with_context(tracking_disable=True)).create(vals_list)
+        backend_mode, portal_mode = self._get_tracking_modes()
+        silent = [(portal_mode if vals.get('portal_created') else backend_mode) == 'off' for vals in vals_list]
+        if not any(silent):
+            return super(SportsBooking, self).create(vals_list)
+        if all(silent):
+            return super(SportsBooking, self.with_context(tracking_disable=True)).create(vals_list)
+        # Lote mixto: se crea cada grupo por separado y se conserva el orden original
+        ids = [None] * len(vals_list)
+        for flag, model in [(True, self.with_context(tracking_disable=True)), (False, self)]:
+            indexes = [index for index, is_silent in enumerate(silent) if is_silent == flag]
+            created = super(SportsBooking, model).create([vals_list[index] for index in indexes])
+            for index, booking_id in zip(indexes, created.ids):
+                ids[index] = booking_id
+        return self.browse(ids)
+    
+    def _track_prepare(self, fields_iter):
+        """Prepara el seguimiento de cada reserva según su modo"""
+        fnames = list(fields_iter)
+        for mode, bookings in self._group_by_tracking_mode().items():
+            if mode == 'full':
+                super(SportsBooking, bookings)._track_prepare(fnames)
+            elif mode == 'state':
+                super(SportsBooking, bookings)._track_prepare(
+                    [fname for fname in fnames if fname in TRACKING_STATE_FIELDS])
+    
+    def _mark_report_dirty(self):
+        """Marca los días de estas reservas para el refresco incremental del reporte"""
+        self.env['sports.booking.report']._mark_dirty(
+            (booking.field_id.id, booking.booking_date) for booking in self
+        )
+    
+    def _get_availability_footprint(self):
+        """Horarios futuros que estas reservas ocupan en la disponibilidad publicada
+        
+        La disponibilidad en caché de un (cancha, día) solo se invalida si este
+        conjunto cambia, por ejemplo no al pasar de confirmada a en curso.
+        """
+        today = fields.Date.today()
+        return {
+            (booking.field_id.id, booking.booking_date, booking.start_time, booking.end_time)
+            for booking in self
+            if booking.state in BOOKING_ACTIVE_STATES and booking.booking_date >= today
+        }
+    
     @api.model
-    def create(self, vals):
-        if vals.get('name', _('Nuevo')) == _('Nuevo'):
-            vals['name'] = self.env['ir.sequence'].next_by_code('sports.booking') or _('Nuevo')
-        return super(SportsBooking, self).create(vals)
+    def _notify_availability(self, footprint):
+        """Programa la publicación en el bus de los días afectados por ``footprint``
+        
+        Los días se acumulan durante la transacción y se publican una sola vez
+        antes del commit; si la transacción se revierte, tampoco se publica.
+        """
+        if not footprint:
+            return
+        data = self.env.cr.precommit.data
+        if 'sports_booking.availability' not in data:
+            data['sports_booking.availability'] = set()
+            self.env.cr.precommit.add(self._send_availability)
+        data['sports_booking.availability'].update(
+            (field_id, booking_date) for field_id, booking_date, _start, _end in footprint
+        )
+    
+    @api.model
+    def _send_availability(self):
+        """Publica la disponibilidad actualizada de cada (cancha, día) modificado"""
+        pairs = self.env.cr.precommit.data.pop('sports_booking.availability', set())
+        field_ids_by_date = defaultdict(set)
+        for field_id, booking_date in pairs:
+            field_ids_by_date[booking_date].add(field_id)
+        notifications = []
+        for booking_date, field_ids in field_ids_by_date.items():
+            sports_fields = self.env['sports.field'].sudo().browse(field_ids).exists()
+            date_str = fields.Date.to_string(booking_date)
+            availability = sports_fields._apply_holds(
+                sports_fields._get_availability(booking_date, booking_date), booking_date, booking_date)
+            for field_id, days in availability.items():
+                notifications.append((AVAILABILITY_CHANNEL % (field_id, date_str), AVAILABILITY_NOTIFICATION, {
+                    'field_id': field_id,
+                    'date': date_str,
+                    'slots': [
+                        {'start_time': slot['start_time'], 'end_time': slot['end_time'], 'available': slot['available']}
+                        for slot in days[date_str]
+                    ],
+                }))
+        if notifications:
+            self.env['bus.bus'].sudo()._sendmany(notifications)
+            self.env.flush_all()
+    
+    @api.model
+    def _reserve_booking_names(self, count):
+        """Reserva ``count`` números de la secuencia de reservas de una sola vez"""
+        if not count:
+            return []
+        IrSequence = self.env['ir.sequence'].sudo()
+        sequence = IrSequence.search([
+            ('code', '=', 'sports.booking'),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return [_('Nuevo')] * count
+        if sequence.implementation != 'standard' or sequence.use_date_range:
+            # Sin secuencia PostgreSQL propia: se consume número a número
+            return [sequence._next() for _i in range(count)]
+        self.env.cr.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            ['ir_sequence_%03d' % sequence.id, count],
+        )
+        return [sequence.get_next_char(number) for number, in self.env.cr.fetchall()]
     
     @api.depends('start_time', 'end_time')
     def _compute_duration(self):
@@ -68,68 +368,102 @@ class SportsBooking(models.Model):
     
     @api.depends('duration', 'field_id', 'booking_date', 'start_time')
     def _compute_total_price(self):
+        """Precio prorrateado por tramos según las reglas de precio de la cancha
+        
+        El perfil de precios se calcula una vez por (cancha, fecha) para todo el lote.
+        """
+        profiles = {}
         for booking in self:
-            if not booking.field_id or not booking.duration:
+            if not booking.field_id or not booking.duration or not booking.booking_date:
                 booking.total_price = 0.0
                 continue
             
-            price = booking.field_id.price_per_hour
-            
-            # Aplicar precio de fin de semana
-            if booking.booking_date and booking.booking_date.weekday() in [5, 6]:  # Sábado, Domingo
-                if booking.field_id.price_weekend:
-                    price = booking.field_id.price_weekend
-            
-            # Aplicar precio nocturno
-            if booking.start_time >= 18.0 and booking.field_id.price_night:
-                price = booking.field_id.price_night
-            
-            booking.total_price = price * booking.duration
+            key = (booking.field_id.id, booking.booking_date)
+            if key not in profiles:
+                profiles[key] = booking.field_id._get_price_profile(booking.booking_date)
+            booking.total_price = interval_price(profiles[key], booking.start_time, booking.end_time)
     
     @api.constrains('field_id', 'booking_date', 'start_time', 'end_time', 'state')
     def _check_booking_overlap(self):
-        """Valida que no haya conflictos de reservas"""
-        for booking in self:
-            if booking.state in ['cancelled', 'draft']:
-                continue
-            
-            # Verificar horarios de la cancha
-            if booking.start_time < booking.field_id.opening_time:
-                raise ValidationError(_('La hora de inicio es anterior a la hora de apertura de la cancha.'))
-            if booking.end_time > booking.field_id.closing_time:
-                raise ValidationError(_('La hora de fin es posterior a la hora de cierre de la cancha.'))
-            
-            # Verificar disponibilidad del día
-            weekday = booking.booking_date.weekday()
-            availability_map = {
-                0: booking.field_id.available_monday,
-                1: booking.field_id.available_tuesday,
-                2: booking.field_id.available_wednesday,
-                3: booking.field_id.available_thursday,
-                4: booking.field_id.available_friday,
-                5: booking.field_id.available_saturday,
-                6: booking.field_id.available_sunday,
-            }
-            
-            if not availability_map.get(weekday, False):
-                raise ValidationError(_('La cancha no está disponible en este día de la semana.'))
-            
-            # Buscar conflictos con otras reservas
-            overlapping = self.search([
-                ('id', '!=', booking.id),
-                ('field_id', '=', booking.field_id.id),
-                ('booking_date', '=', booking.booking_date),
-                ('state', 'in', ['pending', 'confirmed', 'in_progress']),
-                '|',
-                '&', ('start_time', '<', booking.end_time), ('end_time', '>', booking.start_time),
-                '&', ('start_time', '>=', booking.start_time), ('start_time', '<', booking.end_time),
-            ])
-            
-            if overlapping:
-                raise ValidationError(_(
+        """Valida que no haya conflictos de reservas
+        
+        La restricción de exclusión ``no_overlap`` garantiza la integridad en la
+        base de datos, incluso con escrituras concurrentes; esta validación solo
+        produce mensajes legibles. ``create`` ya valida el lote antes de insertar.
+        """
+        if self.env.cr.precommit.data.get(SCHEDULE_CHECKED_KEY):
+            return
+        self._check_schedule([
+            (booking.id, booking.name, booking.field_id, booking.booking_date,
+             booking.start_time, booking.end_time)
+            for booking in self
+            if booking.state not in ['cancelled', 'draft']
+        ])
+    
+    @api.model
+    def _check_schedule(self, entries):
+        """Valida horarios, días disponibles y solapes de un lote de reservas
+        
+        :param entries: ver :meth:`_get_schedule_errors`
+        :raise ValidationError: con el primer error encontrado
+        """
+        errors = self._get_schedule_errors(entries)
+        if errors:
+            raise ValidationError(errors[0][1])
+    
+    @api.model
+    def _get_schedule_errors(self, entries):
+        """Retorna todos los errores de horario de un lote de reservas
+        
+        :param entries: tuplas ``(id, nombre, cancha, fecha, hora_inicio, hora_fin)``;
+            ``id`` es False para las reservas que aún no existen
+        :return: lista de tuplas ``(nombre, mensaje)``
+        
+        Las reservas existentes de todas las canchas y fechas del lote se cargan
+        con una sola consulta y cada grupo (cancha, fecha) se valida con un
+        barrido ordenado.
+        """
+        errors = []
+        groups = defaultdict(list)
+        for booking_id, name, field, booking_date, start_time, end_time in entries:
+            # Horario de la cancha en esa fecha (días disponibles y excepciones)
+            hours = field._get_day_hours(booking_date)
+            if not hours:
+                errors.append((name, _('La cancha no está disponible en esta fecha.')))
+            elif start_time < hours[0]:
+                errors.append((name, _('La hora de inicio es anterior a la hora de apertura de la cancha.')))
+            elif end_time > hours[1]:
+                errors.append((name, _('La hora de fin es posterior a la hora de cierre de la cancha.')))
+            else:
+                groups[field.id, booking_date].append((start_time, end_time, name))
+        
+        if not groups:
+            return errors
+        
+        # Buscar conflictos con otras reservas de las mismas canchas y fechas
+        existing = defaultdict(list)
+        for other in self.search_fetch([
+            ('id', 'not in', [entry[0] for entry in entries if entry[0]]),
+            ('field_id', 'in', list({field_id for field_id, _date in groups})),
+            ('booking_date', 'in', list({booking_date for _field_id, booking_date in groups})),
+            ('state', 'in', BOOKING_ACTIVE_STATES),
+        ], ['name', 'field_id', 'booking_date', 'start_time', 'end_time']):
+            existing[other.field_id.id, other.booking_date].append((other.start_time, other.end_time, other.name))
+        # Los horarios retenidos por otros clientes también están ocupados
+        dates = [booking_date for _field_id, booking_date in groups]
+        for hold in self.env['sports.booking.hold'].sudo()._get_active_holds(
+                {field_id for field_id, _date in groups}, min(dates), max(dates), exclude_uid=self.env.uid):
+            existing[hold.field_id.id, hold.booking_date].append(
+                (hold.start_time, hold.end_time, _('Horario retenido temporalmente por otro cliente')))
+        
+        for key, intervals in groups.items():
+            conflict = find_conflict(intervals, existing[key])
+            if conflict:
+                errors.append((conflict[0], _(
                     'Ya existe una reserva para esta cancha en el horario seleccionado.\n'
                     'Reserva conflictiva: %s'
-                ) % overlapping[0].name)
+                ) % conflict[1]))
+        return errors
     
     @api.constrains('booking_date')
     def _check_booking_date(self):
@@ -138,25 +472,44 @@ class SportsBooking(models.Model):
             if booking.booking_date < fields.Date.today() and booking.state == 'draft':
                 raise ValidationError(_('No se pueden crear reservas para fechas pasadas.'))
     
+    def _change_state(self, state, allowed_states, error, body, vals=None):
+        """Aplica una transición de estado a todo el conjunto de registros
+        
+        Valida los estados de origen antes de escribir, escribe en lote (una
+        escritura para las reservas que ya ocupaban su horario y otra para el
+        resto) y registra los mensajes del chatter en lote.
+        """
+        if any(booking.state not in allowed_states for booking in self):
+            raise UserError(error)
+        if not self:
+            return
+        # El mensaje de la transición se registra junto con los valores seguidos,
+        # en un solo mensaje por reserva
+        for mode, bookings in self._group_by_tracking_mode().items():
+            if mode != 'off':
+                bookings._track_set_log_message(body)
+        vals = dict(vals or {}, state=state)
+        # Las reservas que ya ocupaban su horario no se vuelven a validar: un
+        # cierre o un horario especial posterior no debe impedir iniciarlas,
+        # completarlas o cancelarlas (ni detener el cron de estados)
+        occupying = self.filtered(lambda booking: booking.state in BOOKING_ACTIVE_STATES)
+        if occupying:
+            with self._schedule_prechecked():
+                occupying.write(vals)
+        if self - occupying:
+            (self - occupying).write(vals)
+    
     def action_confirm(self):
         """Confirmar la reserva"""
-        for booking in self:
-            if booking.state != 'draft' and booking.state != 'pending':
-                raise UserError(_('Solo se pueden confirmar reservas en estado Borrador o Pendiente.'))
-            booking.write({
-                'state': 'confirmed',
-                'confirmation_date': fields.Datetime.now(),
-            })
-            booking.message_post(body=_('Reserva confirmada'))
-            
-            # Enviar email de confirmación si hay template disponible
-            try:
-                template = self.env.ref('sports_booking.sports_booking_email_template', raise_if_not_found=False)
-                if template and booking.partner_id.email:
-                    template.send_mail(booking.id, force_send=True)
-            except Exception as e:
-                # Log error but don't block the confirmation
-                booking.message_post(body=_('No se pudo enviar el email de confirmación: %s') % str(e))
+        self._change_state(
+            'confirmed', ['draft', 'pending'],
+            _('Solo se pueden confirmar reservas en estado Borrador o Pendiente.'),
+            _('Reserva confirmada'),
+            {'confirmation_date': fields.Datetime.now()},
+        )
+        
+        # El email de confirmación se envía desde la cola, fuera de la petición
+        self.env['sports.booking.mail.queue']._enqueue(self, 'sports_booking.sports_booking_email_template')
         return True
     
     def action_set_pending(self):
@@ -166,38 +519,54 @@ class SportsBooking(models.Model):
     
     def action_start(self):
         """Iniciar la reserva"""
-        for booking in self:
-            if booking.state != 'confirmed':
-                raise UserError(_('Solo se pueden iniciar reservas confirmadas.'))
-            booking.write({'state': 'in_progress'})
-            booking.message_post(body=_('Reserva iniciada'))
+        self._change_state(
+            'in_progress', ['confirmed'],
+            _('Solo se pueden iniciar reservas confirmadas.'),
+            _('Reserva iniciada'),
+        )
         return True
     
     def action_complete(self):
         """Completar la reserva"""
-        for booking in self:
-            if booking.state != 'in_progress':
-                raise UserError(_('Solo se pueden completar reservas en curso.'))
-            booking.write({'state': 'completed'})
-            booking.message_post(body=_('Reserva completada'))
+        self._change_state(
+            'completed', ['in_progress'],
+            _('Solo se pueden completar reservas en curso.'),
+            _('Reserva completada'),
+        )
         return True
     
     def action_cancel(self):
         """Cancelar la reserva"""
-        for booking in self:
-            if booking.state in ['completed', 'cancelled']:
-                raise UserError(_('No se pueden cancelar reservas completadas o ya canceladas.'))
-            booking.write({'state': 'cancelled'})
-            booking.message_post(body=_('Reserva cancelada'))
-            
-            # Enviar email de cancelación si hay template disponible
-            try:
-                template = self.env.ref('sports_booking.sports_booking_cancellation_template', raise_if_not_found=False)
-                if template and booking.partner_id.email:
-                    template.send_mail(booking.id, force_send=True)
-            except Exception as e:
-                # Log error but don't block the cancellation
-                booking.message_post(body=_('No se pudo enviar el email de cancelación: %s') % str(e))
+        self._change_state(
+            'cancelled', ['draft', 'pending', 'confirmed', 'in_progress'],
+            _('No se pueden cancelar reservas completadas o ya canceladas.'),
+            _('Reserva cancelada'),
+        )
+        
+        # El email de cancelación se envía desde la cola, fuera de la petición
+        self.env['sports.booking.mail.queue']._enqueue(self, 'sports_booking.sports_booking_cancellation_template')
+        return True
+    
+    @api.model
+    def _cron_update_states(self):
+        """Iniciar y completar automáticamente las reservas según la hora actual
+        
+        Las horas de las reservas están en la zona horaria de la compañía.
+        """
+        tz = self.env.company.partner_id.tz or self.env.user.tz or 'UTC'
+        now = fields.Datetime.context_timestamp(self.with_context(tz=tz), fields.Datetime.now())
+        today, hour = now.date(), now.hour + now.minute / 60.0
+        
+        self.search([
+            ('state', '=', 'confirmed'),
+            '|', ('booking_date', '<', today),
+            '&', ('booking_date', '=', today), ('start_time', '<=', hour),
+        ]).action_start()
+        self.search([
+            ('state', '=', 'in_progress'),
+            '|', ('booking_date', '<', today),
+            '&', ('booking_date', '=', today), ('end_time', '<=', hour),
+        ]).action_complete()
         return True
     
     def action_reset_draft(self):
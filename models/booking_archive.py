@@ -0,0 +1,173 @@
+import logging
+import threading
+
+from odoo import models, fields, api, tools
+
+_logger = logging.getLogger(__name__)
+
+# Estados finales: solo estas reservas se pueden archivar
+ARCHIVE_STATES = ('completed', 'cancelled')
+
+# Columnas copiadas tal cual de sports_booking a sports_booking_archive
+ARCHIVE_COLUMNS = [
+    'name', 'partner_id', 'field_id', 'sport_type', 'booking_date', 'start_time', 'end_time',
+    'duration', 'total_price', 'state', 'notes', 'players_count', 'confirmation_date',
+    'user_id', 'recurrence_id',
+]
+
+# Valor de seguimiento como texto (alias ``t`` de mail_tracking_value y ``f`` de
+# ir_model_fields). El texto va primero: los many2one guardan el id en
+# ``*_value_integer`` y el nombre mostrado en ``*_value_char``
+TRACKING_VALUE_SQL = (
+    "COALESCE(t.{side}_value_char, t.{side}_value_text, "
+    "to_char(t.{side}_value_datetime, CASE WHEN f.ttype = 'date' THEN 'YYYY-MM-DD' ELSE 'YYYY-MM-DD HH24:MI' END), "
+    "t.{side}_value_float::text, t.{side}_value_integer::text, '')"
+)
+
+
+class SportsBookingArchive(models.Model):
+    """Reservas históricas movidas fuera de la tabla de reservas activa
+
+    No hereda ``mail.thread``: al archivar, el chatter y los valores de
+    seguimiento de la reserva se compactan en el campo de texto ``history``.
+    """
+    _name = 'sports.booking.archive'
+    _description = 'Reserva Archivada'
+    _order = 'booking_date desc, start_time desc'
+
+    # Días después de los cuales se archiva si no se configura sports_booking.archive_after_days
+    _default_archive_days = 365
+    # Reservas movidas por transacción
+    _archive_batch_size = 5000
+
+    original_id = fields.Integer(string='ID Original', readonly=True, index=True)
+    name = fields.Char(string='Número de Reserva', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', readonly=True, index=True, ondelete='restrict')
+    field_id = fields.Many2one('sports.field', string='Cancha', readonly=True, ondelete='restrict')
+    sport_type = fields.Selection(
+        selection=lambda self: self.env['sports.field']._fields['sport_type'].selection,
+        string='Deporte', readonly=True,
+    )
+    booking_date = fields.Date(string='Fecha de Reserva', readonly=True)
+    start_time = fields.Float(string='Hora Inicio', readonly=True)
+    end_time = fields.Float(string='Hora Fin', readonly=True)
+    duration = fields.Float(string='Duración (horas)', readonly=True)
+    total_price = fields.Float(string='Precio Total', readonly=True)
+    state = fields.Selection([
+        ('completed', 'Completada'),
+        ('cancelled', 'Cancelada'),
+    ], string='Estado', readonly=True)
+    notes = fields.Text(string='Notas', readonly=True)
+    players_count = fields.Integer(string='Número de Jugadores', readonly=True)
+    confirmation_date = fields.Datetime(string='Fecha de Confirmación', readonly=True)
+    user_id = fields.Many2one('res.users', string='Responsable', readonly=True, ondelete='set null')
+    recurrence_id = fields.Many2one('sports.booking.recurrence', string='Serie Recurrente',
+                                    readonly=True, ondelete='set null')
+    history = fields.Text(string='Historial', readonly=True)
+
+    def init(self):
+        # El refresco del reporte lee el archivo por cancha y fecha
+        tools.create_index(self.env.cr, 'sports_booking_archive_field_date_idx',
+                           self._table, ['field_id', 'booking_date'])
+
+    @api.model
+    def _get_archive_date(self):
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'sports_booking.archive_after_days', self._default_archive_days))
+        return fields.Date.subtract(fields.Date.context_today(self), days=days)
+
+    @api.model
+    def _cron_archive(self):
+        """Mover por lotes las reservas finalizadas anteriores al horizonte configurado"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        archive_date = self._get_archive_date()
+        total = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM sports_booking
+                WHERE state IN %s AND booking_date < %s
+                ORDER BY booking_date, id
+                LIMIT %s
+            """, [ARCHIVE_STATES, archive_date, self._archive_batch_size])
+            booking_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not booking_ids:
+                break
+            self._archive_bookings(booking_ids)
+            total += len(booking_ids)
+            if auto_commit:
+                self.env.cr.commit()
+            if len(booking_ids) < self._archive_batch_size:
+                break
+        if total:
+            _logger.info("Reservas archivadas: %s (anteriores a %s)", total, archive_date)
+        return True
+
+    def _archive_bookings(self, booking_ids):
+        """Copia las reservas al archivo, compacta su chatter y las elimina por SQL
+
+        Los mensajes y valores de seguimiento se resumen en ``history`` (una
+        línea por mensaje, con los cambios de campos). Los adjuntos pasan a la
+        reserva archivada; mensajes, seguidores y actividades se eliminan.
+        """
+        self.env.flush_all()
+        cr = self.env.cr
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        cr.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS sports_booking_archive_map (
+                booking_id integer PRIMARY KEY,
+                archive_id integer NOT NULL
+            ) ON COMMIT DROP
+        """)
+        cr.execute("TRUNCATE sports_booking_archive_map")
+        cr.execute("""
+            WITH moved AS (
+                INSERT INTO sports_booking_archive
+                    (original_id, {columns}, history, create_uid, write_uid, create_date, write_date)
+                SELECT b.id, {b_columns}, h.history, %(uid)s, %(uid)s,
+                       now() at time zone 'UTC', now() at time zone 'UTC'
+                FROM sports_booking b
+                LEFT JOIN LATERAL (
+                    SELECT string_agg(line, E'\\n' ORDER BY date, id) AS history
+                    FROM (
+                        SELECT m.date, m.id,
+                               to_char(m.date, 'YYYY-MM-DD HH24:MI') || ' ' || COALESCE(p.name, '') || ': ' ||
+                               concat_ws(' | ',
+                                   NULLIF(btrim(regexp_replace(COALESCE(m.body, ''), '<[^>]*>', '', 'g')), ''),
+                                   (SELECT string_agg(f.name || ': ' || {old_value} || ' → ' || {new_value},
+                                                      ', ' ORDER BY t.id)
+                                    FROM mail_tracking_value t
+                                    JOIN ir_model_fields f ON f.id = t.field_id
+                                    WHERE t.mail_message_id = m.id)
+                               ) AS line
+                        FROM mail_message m
+                        LEFT JOIN res_partner p ON p.id = m.author_id
+                        WHERE m.model = 'sports.booking' AND m.res_id = b.id
+                    ) AS lines
+                ) AS h ON TRUE
+                WHERE b.id = ANY(%(ids)s)
+                RETURNING id, original_id
+            )
+            INSERT INTO sports_booking_archive_map (booking_id, archive_id)
+            SELECT original_id, id FROM moved
+        """.format(
+            columns=columns,
+            b_columns=', '.join('b.%s' % column for column in ARCHIVE_COLUMNS),
+            old_value=TRACKING_VALUE_SQL.format(side='old'),
+            new_value=TRACKING_VALUE_SQL.format(side='new'),
+        ),
+            {'ids': booking_ids, 'uid': self.env.uid})
+
+        cr.execute("""
+            UPDATE ir_attachment a
+            SET res_model = 'sports.booking.archive', res_id = m.archive_id
+            FROM sports_booking_archive_map m
+            WHERE a.res_model = 'sports.booking' AND a.res_id = m.booking_id
+        """)
+        # Los valores de seguimiento y notificaciones se eliminan en cascada
+        for table, model_column in [('mail_message', 'model'), ('mail_followers', 'res_model'),
+                                    ('mail_activity', 'res_model')]:
+            cr.execute("""
+                DELETE FROM {table} WHERE {model_column} = 'sports.booking' AND res_id = ANY(%s)
+            """.format(table=table, model_column=model_column), [booking_ids])
+        cr.execute("DELETE FROM sports_booking WHERE id = ANY(%s)", [booking_ids])
+        self.env.invalidate_all()
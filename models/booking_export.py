@@ -0,0 +1,57 @@
+from urllib.parse import urlencode
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+from .booking import BOOKING_ACTIVE_STATES
+
+# Filtros de estado de la exportación: clave -> estados incluidos
+EXPORT_STATE_FILTERS = {
+    'all': [],
+    'active': BOOKING_ACTIVE_STATES,
+    'completed': ['completed'],
+    'cancelled': ['cancelled'],
+}
+
+
+class SportsBookingExport(models.TransientModel):
+    """Parámetros de la exportación; el archivo se genera en /sports_booking/export"""
+    _name = 'sports.booking.export'
+    _description = 'Exportación de Reservas'
+
+    date_from = fields.Date(string='Desde', required=True,
+                            default=lambda self: fields.Date.context_today(self).replace(month=1, day=1))
+    date_to = fields.Date(string='Hasta', required=True, default=fields.Date.context_today)
+    field_ids = fields.Many2many('sports.field', string='Canchas', help='Vacío: todas las canchas')
+    state_filter = fields.Selection([
+        ('all', 'Todas'),
+        ('active', 'Activas'),
+        ('completed', 'Completadas'),
+        ('cancelled', 'Canceladas'),
+    ], string='Estado', required=True, default='all')
+    file_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+    ], string='Formato', required=True, default='xlsx')
+
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
+        for export in self:
+            if export.date_from > export.date_to:
+                raise ValidationError(_('La fecha final debe ser posterior a la inicial.'))
+
+    def action_export(self):
+        self.ensure_one()
+        params = {
+            'date_from': fields.Date.to_string(self.date_from),
+            'date_to': fields.Date.to_string(self.date_to),
+            'state': self.state_filter,
+            'format': self.file_format,
+        }
+        if self.field_ids:
+            params['field_ids'] = ','.join(str(field_id) for field_id in self.field_ids.ids)
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/sports_booking/export?%s' % urlencode(params),
+            'target': 'self',
+        }
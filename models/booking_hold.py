@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+
+from .booking import BOOKING_TSRANGE_SQL
+
+
+class SportsBookingHold(models.Model):
+    """Retención temporal de un horario mientras el cliente completa la reserva
+
+    La restricción de exclusión resuelve la competencia por un mismo horario
+    con un simple ``INSERT ... ON CONFLICT DO NOTHING``, antes de pagar el
+    costo de crear (y revertir) una reserva completa.
+    """
+    _name = 'sports.booking.hold'
+    _description = 'Retención Temporal de Horario'
+    _order = 'expires_at'
+
+    # Minutos de retención si no se configura sports_booking.hold_minutes
+    _default_hold_minutes = 5
+
+    field_id = fields.Many2one('sports.field', string='Cancha', required=True, ondelete='cascade')
+    booking_date = fields.Date(string='Fecha', required=True)
+    start_time = fields.Float(string='Hora Inicio', required=True)
+    end_time = fields.Float(string='Hora Fin', required=True)
+    user_id = fields.Many2one('res.users', string='Usuario', required=True, index=True, ondelete='cascade',
+                              default=lambda self: self.env.user)
+    expires_at = fields.Datetime(string='Expira', required=True, index=True)
+
+    _sql_constraints = [
+        ('check_times', 'CHECK(end_time > start_time)', 'La hora de fin debe ser posterior a la hora de inicio!'),
+        # Como en las reservas, requiere la extensión btree_gist
+        ('no_overlap',
+         'EXCLUDE USING gist (field_id WITH =, %s WITH &&)' % BOOKING_TSRANGE_SQL,
+         'El horario ya está retenido por otro cliente!'),
+    ]
+
+    @api.model
+    def _get_hold_minutes(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'sports_booking.hold_minutes', self._default_hold_minutes))
+
+    @api.model
+    def _get_active_holds(self, field_ids, date_from, date_to, exclude_uid=None):
+        """Retenciones vigentes en las canchas y fechas dadas
+
+        :param exclude_uid: ignorar las retenciones de este usuario (las propias)
+        """
+        domain = [
+            ('field_id', 'in', list(field_ids)),
+            ('booking_date', '>=', date_from),
+            ('booking_date', '<=', date_to),
+            ('expires_at', '>', fields.Datetime.now()),
+        ]
+        if exclude_uid:
+            domain.append(('user_id', '!=', exclude_uid))
+        return self.search_fetch(domain, ['field_id', 'booking_date', 'start_time', 'end_time', 'expires_at'])
+
+    @api.model
+    def _acquire(self, field, booking_date, start_time, end_time):
+        """Retiene el horario para el usuario actual, liberando su retención anterior
+
+        :return: par ``(fecha de expiración, False)`` o ``(False, mensaje de error)``
+        """
+        self._release()
+        errors = self.env['sports.booking']._get_schedule_errors(
+            [(False, '', field, booking_date, start_time, end_time)])
+        if errors:
+            return False, errors[0][1]
+
+        expires_at = fields.Datetime.now() + timedelta(minutes=self._get_hold_minutes())
+        if not self._insert_hold(field.id, booking_date, start_time, end_time, self.env.uid, expires_at):
+            return False, _('Otro cliente acaba de seleccionar este horario.')
+        return expires_at, False
+
+    @api.model
+    def _insert_hold(self, field_id, booking_date, start_time, end_time, user_id, expires_at):
+        """Inserta la retención si el horario no está retenido por otro usuario
+
+        :return: True si se creó la retención
+        """
+        now = fields.Datetime.now()
+        # Las retenciones vencidas del día aún ocupan la restricción de exclusión
+        self.env.cr.execute("""
+            DELETE FROM sports_booking_hold
+            WHERE field_id = %s AND booking_date = %s AND expires_at <= %s
+        """, [field_id, booking_date, now])
+        self.env.cr.execute("""
+            INSERT INTO sports_booking_hold
+                (field_id, booking_date, start_time, end_time, user_id, expires_at,
+                 create_uid, write_uid, create_date, write_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+            RETURNING id
+        """, [field_id, booking_date, start_time, end_time, user_id, expires_at,
+              self.env.uid, self.env.uid, now, now])
+        held = self.env.cr.fetchone()
+        self.invalidate_model()
+        if held:
+            self.env['sports.booking']._notify_availability({(field_id, booking_date, start_time, end_time)})
+        return bool(held)
+
+    @api.model
+    def _release(self):
+        """Libera las retenciones del usuario actual"""
+        holds = self.search([('user_id', '=', self.env.uid)])
+        if holds:
+            footprint = holds._get_footprint()
+            holds.unlink()
+            self.env['sports.booking']._notify_availability(footprint)
+        return True
+
+    @api.model
+    def _release_booked(self, bookings):
+        """Libera las retenciones del usuario actual que estas reservas ya ocupan
+
+        Las demás retenciones del usuario (otra cancha, fecha u horario) se conservan.
+        """
+        footprint = [
+            (booking.field_id.id, booking.booking_date, booking.start_time, booking.end_time)
+            for booking in bookings if booking.field_id and booking.booking_date
+        ]
+        if not footprint:
+            return
+        field_ids, dates, starts, ends = [list(values) for values in zip(*footprint)]
+        self.flush_model()
+        self.env.cr.execute("""
+            DELETE FROM sports_booking_hold h
+            USING unnest(%s::integer[], %s::date[], %s::float[], %s::float[]) AS b(b_field_id, b_date, b_start, b_end)
+            WHERE h.user_id = %s
+              AND h.field_id = b.b_field_id
+              AND tsrange(h.booking_date + h.start_time * interval '1 hour',
+                          h.booking_date + h.end_time * interval '1 hour', '[)')
+               && tsrange(b.b_date + b.b_start * interval '1 hour',
+                          b.b_date + b.b_end * interval '1 hour', '[)')
+            RETURNING h.field_id, h.booking_date, h.start_time, h.end_time
+        """, [field_ids, dates, starts, ends, self.env.uid])
+        released = self.env.cr.fetchall()
+        if released:
+            self.invalidate_model()
+            today = fields.Date.today()
+            self.env['sports.booking']._notify_availability({hold for hold in released if hold[1] >= today})
+
+    def _get_footprint(self):
+        today = fields.Date.today()
+        return {
+            (hold.field_id.id, hold.booking_date, hold.start_time, hold.end_time)
+            for hold in self if hold.booking_date >= today
+        }
+
+    @api.model
+    def _cron_cleanup(self):
+        """Eliminar las retenciones vencidas y publicar los horarios liberados"""
+        expired = self.search([('expires_at', '<=', fields.Datetime.now())])
+        footprint = expired._get_footprint()
+        expired.unlink()
+        self.env['sports.booking']._notify_availability(footprint)
+        return True
@@ -0,0 +1,364 @@
+import base64
+import csv
+import io
+
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+
+from .booking import BOOKING_ACTIVE_STATES, SKIP_CHATTER_CONTEXT
+from .sports_field_schedule_exception import (
+    SCHEDULE_EXCEPTION_JOIN_SQL, SCHEDULE_OPEN_SQL, SCHEDULE_OPENING_SQL, SCHEDULE_CLOSING_SQL,
+)
+
+WEEKDAY_FIELDS = [
+    'available_monday', 'available_tuesday', 'available_wednesday', 'available_thursday',
+    'available_friday', 'available_saturday', 'available_sunday',
+]
+
+# Columnas del CSV de canchas: nombre -> (tipo SQL, conversor)
+FIELD_COLUMNS = {
+    'name': ('varchar', str),
+    'code': ('varchar', str),
+    'sport_type': ('varchar', str),
+    'price_per_hour': ('float', float),
+    'price_weekend': ('float', float),
+    'price_night': ('float', float),
+    'opening_time': ('float', float),
+    'closing_time': ('float', float),
+    'time_slot_duration': ('float', float),
+    **{fname: ('boolean', lambda value: value.strip().lower() in ('1', 'true', 'si', 'sí', 'x'))
+       for fname in WEEKDAY_FIELDS},
+}
+
+# Columnas del CSV de reservas
+BOOKING_COLUMNS = {
+    'field_code': ('varchar', str),
+    'partner': ('varchar', str),
+    'booking_date': ('date', fields.Date.to_date),
+    'start_time': ('float', float),
+    'end_time': ('float', float),
+    'state': ('varchar', str),
+    'notes': ('text', str),
+    'players_count': ('integer', int),
+}
+
+IMPORT_BOOKING_STATES = BOOKING_ACTIVE_STATES + ['completed', 'cancelled']
+
+
+class SportsBookingImport(models.TransientModel):
+    """Importación masiva de canchas o reservas desde CSV
+
+    Las filas se cargan en una tabla temporal de staging y se validan con
+    consultas sobre el conjunto completo (solapes dentro del archivo y contra
+    la base, horarios, días disponibles, códigos repetidos). Todos los
+    errores se reportan juntos y las filas válidas se crean por lotes.
+    """
+    _name = 'sports.booking.import'
+    _description = 'Importación de Canchas y Reservas'
+
+    # Registros creados por lote; toda la importación es una sola transacción
+    _import_batch_size = 1000
+
+    import_type = fields.Selection([
+        ('bookings', 'Reservas'),
+        ('fields', 'Canchas'),
+    ], string='Importar', required=True, default='bookings')
+    file = fields.Binary(string='Archivo CSV', required=True, attachment=False)
+    filename = fields.Char(string='Nombre del Archivo')
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('validated', 'Validado'),
+        ('done', 'Importado'),
+    ], string='Estado', default='draft', required=True)
+    line_count = fields.Integer(string='Filas', readonly=True)
+    imported_count = fields.Integer(string='Importadas', readonly=True)
+    error_count = fields.Integer(string='Filas con Errores', readonly=True)
+    error_report = fields.Text(string='Errores', readonly=True)
+
+    # ------------------------------------------------------------------
+    # Lectura y staging
+    # ------------------------------------------------------------------
+
+    def _read_rows(self):
+        """Retorna las filas del CSV como ``(número de línea, dict)``"""
+        try:
+            content = base64.b64decode(self.file).decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise UserError(_('El archivo debe estar codificado en UTF-8.'))
+        try:
+            dialect = csv.Sniffer().sniff(content[:4096], delimiters=',;')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+        # La línea 1 es la cabecera
+        return reader.fieldnames or [], list(enumerate(reader, 2))
+
+    def _stage(self, table, columns, required):
+        """Carga el CSV en una tabla temporal, convirtiendo tipos en Python
+
+        :return: lista de errores de formato ``(línea, mensaje)``
+        """
+        header, rows = self._read_rows()
+        missing = [column for column in required if column not in header]
+        if missing:
+            raise UserError(_('Faltan columnas obligatorias: %s') % ', '.join(missing))
+
+        cr = self.env.cr
+        cr.execute('DROP TABLE IF EXISTS "%s"' % table)
+        cr.execute('CREATE TEMPORARY TABLE "%s" (line integer PRIMARY KEY, %s) ON COMMIT DROP' % (
+            table, ', '.join('"%s" %s' % (column, sqltype) for column, (sqltype, _parse) in columns.items())))
+
+        errors = []
+        values = {column: [] for column in ['line'] + list(columns)}
+        for line, row in rows:
+            parsed = {}
+            try:
+                for column, (_sqltype, parse) in columns.items():
+                    raw = (row.get(column) or '').strip()
+                    parsed[column] = parse(raw) if raw else None
+            except ValueError:
+                errors.append((line, _('Valor inválido en la columna %s.') % column))
+                continue
+            values['line'].append(line)
+            for column in columns:
+                values[column].append(parsed[column])
+        self.line_count = len(rows)
+
+        cr.execute('INSERT INTO "%s" (line, %s) SELECT * FROM unnest(%%s::integer[], %s)' % (
+            table,
+            ', '.join('"%s"' % column for column in columns),
+            ', '.join('%%s::%s[]' % sqltype for sqltype, _parse in columns.values()),
+        ), [values['line']] + [values[column] for column in columns])
+        return errors
+
+    def _collect_errors(self, checks):
+        """Ejecuta consultas ``SELECT line, mensaje`` y acumula los resultados"""
+        errors = []
+        for query, params in checks:
+            self.env.cr.execute(query, params)
+            errors.extend(self.env.cr.fetchall())
+        return errors
+
+    # ------------------------------------------------------------------
+    # Canchas
+    # ------------------------------------------------------------------
+
+    def _validate_fields(self):
+        errors = self._stage('sports_field_import_stage', FIELD_COLUMNS, ['name', 'code', 'sport_type'])
+        sport_types = [value for value, _label in self.env['sports.field']._fields['sport_type'].selection]
+        errors += self._collect_errors([
+            ("""
+                SELECT line, %s FROM sports_field_import_stage
+                WHERE name IS NULL OR code IS NULL OR sport_type IS NULL
+            """, [_('El nombre, el código y el deporte son obligatorios.')]),
+            ("""
+                SELECT line, %s FROM sports_field_import_stage WHERE sport_type <> ALL(%s)
+            """, [_('Tipo de deporte desconocido.'), sport_types]),
+            ("""
+                SELECT line, %s || first_line FROM (
+                    SELECT line, MIN(line) OVER (PARTITION BY code) AS first_line
+                    FROM sports_field_import_stage
+                    WHERE code IS NOT NULL
+                ) AS codes
+                WHERE line > first_line
+            """, [_('Código repetido en el archivo, ver línea ')]),
+            ("""
+                SELECT s.line, %s FROM sports_field_import_stage s
+                JOIN sports_field f ON f.code = s.code
+            """, [_('Ya existe una cancha con este código.')]),
+            ("""
+                SELECT line, %s FROM sports_field_import_stage
+                WHERE COALESCE(opening_time, 6) >= COALESCE(closing_time, 23)
+                   OR COALESCE(opening_time, 6) NOT BETWEEN 0 AND 24
+                   OR COALESCE(closing_time, 23) NOT BETWEEN 0 AND 24
+            """, [_('Horario de apertura y cierre inválido.')]),
+            ("""
+                SELECT line, %s FROM sports_field_import_stage
+                WHERE time_slot_duration IS NOT NULL AND (time_slot_duration <= 0 OR time_slot_duration > 8)
+            """, [_('La duración del bloque debe estar entre 0.5 y 8 horas.')]),
+        ])
+        return errors
+
+    def _import_fields(self, invalid_lines):
+        self.env.cr.execute("""
+            SELECT * FROM sports_field_import_stage WHERE line <> ALL(%s) ORDER BY line
+        """, [list(invalid_lines)])
+        vals_list = [
+            {column: value for column, value in row.items() if column != 'line' and value is not None}
+            for row in self.env.cr.dictfetchall()
+        ]
+        Field = self.env['sports.field'].with_context(tracking_disable=True, mail_create_nolog=True)
+        self._create_in_batches(Field.create, vals_list)
+        return len(vals_list)
+
+    # ------------------------------------------------------------------
+    # Reservas
+    # ------------------------------------------------------------------
+
+    def _validate_bookings(self):
+        errors = self._stage(
+            'sports_booking_import_stage', BOOKING_COLUMNS,
+            ['field_code', 'partner', 'booking_date', 'start_time', 'end_time'],
+        )
+        cr = self.env.cr
+        cr.execute("""
+            ALTER TABLE sports_booking_import_stage
+                ADD COLUMN field_id integer,
+                ADD COLUMN partner_id integer;
+            UPDATE sports_booking_import_stage s SET field_id = f.id
+            FROM sports_field f WHERE f.code = s.field_code;
+            UPDATE sports_booking_import_stage SET state = 'confirmed' WHERE state IS NULL;
+        """)
+        self._resolve_partners()
+
+        active_states = tuple(BOOKING_ACTIVE_STATES)
+        overlap = "s.start_time < o.end_time AND o.start_time < s.end_time"
+        exception_join = SCHEDULE_EXCEPTION_JOIN_SQL.format(date='s.booking_date')
+        is_open = SCHEDULE_OPEN_SQL.format(date='s.booking_date')
+        errors += self._collect_errors([
+            ("""
+                SELECT line, %s FROM sports_booking_import_stage
+                WHERE booking_date IS NULL OR start_time IS NULL OR end_time IS NULL OR partner IS NULL
+            """, [_('La fecha, las horas y el cliente son obligatorios.')]),
+            ("""
+                SELECT line, %s FROM sports_booking_import_stage WHERE field_id IS NULL
+            """, [_('No existe una cancha con este código.')]),
+            ("""
+                SELECT line, %s FROM sports_booking_import_stage WHERE state <> ALL(%s)
+            """, [_('Estado desconocido.'), IMPORT_BOOKING_STATES]),
+            ("""
+                SELECT line, %s FROM sports_booking_import_stage WHERE end_time <= start_time
+            """, [_('La hora de fin debe ser posterior a la hora de inicio.')]),
+            # Horario de la cancha en la fecha: días disponibles y excepciones
+            ("""
+                SELECT s.line, %s FROM sports_booking_import_stage s
+                JOIN sports_field f ON f.id = s.field_id
+                {exception_join}
+                WHERE NOT {is_open}
+            """.format(exception_join=exception_join, is_open=is_open),
+             [_('La cancha no está disponible en esta fecha.')]),
+            ("""
+                SELECT s.line, %s FROM sports_booking_import_stage s
+                JOIN sports_field f ON f.id = s.field_id
+                {exception_join}
+                WHERE {is_open} AND (s.start_time < {opening} OR s.end_time > {closing})
+            """.format(exception_join=exception_join, is_open=is_open,
+                       opening=SCHEDULE_OPENING_SQL, closing=SCHEDULE_CLOSING_SQL),
+             [_('El horario está fuera del horario de apertura de la cancha.')]),
+            # Solapes dentro del archivo: se marca la fila posterior
+            ("""
+                SELECT s.line, %s || MIN(o.line) FROM sports_booking_import_stage s
+                JOIN sports_booking_import_stage o
+                  ON o.field_id = s.field_id AND o.booking_date = s.booking_date AND o.line < s.line
+                 AND {overlap}
+                WHERE s.state IN %s AND o.state IN %s
+                GROUP BY s.line
+            """.format(overlap=overlap), [_('Se solapa con la línea '), active_states, active_states]),
+            # Solapes con las reservas existentes
+            ("""
+                SELECT s.line, %s || MIN(o.name) FROM sports_booking_import_stage s
+                JOIN sports_booking o
+                  ON o.field_id = s.field_id AND o.booking_date = s.booking_date AND {overlap}
+                WHERE s.state IN %s AND o.state IN %s
+                GROUP BY s.line
+            """.format(overlap=overlap), [_('Se solapa con la reserva '), active_states, active_states]),
+        ])
+        return errors
+
+    def _resolve_partners(self):
+        """Asocia clientes por email (o por nombre) y crea en lote los que faltan"""
+        cr = self.env.cr
+        resolve = """
+            UPDATE sports_booking_import_stage s SET partner_id = p.partner_id
+            FROM (
+                SELECT ref, MIN(id) AS partner_id
+                FROM (
+                    SELECT lower(email) AS ref, id FROM res_partner WHERE active AND email IS NOT NULL
+                    UNION ALL
+                    SELECT lower(name), id FROM res_partner WHERE active AND name IS NOT NULL
+                ) AS refs
+                WHERE ref IN (SELECT lower(partner) FROM sports_booking_import_stage)
+                GROUP BY ref
+            ) p
+            WHERE s.partner_id IS NULL AND lower(s.partner) = p.ref
+        """
+        cr.execute(resolve)
+        cr.execute("""
+            SELECT DISTINCT ON (lower(partner)) partner FROM sports_booking_import_stage
+            WHERE partner_id IS NULL AND partner IS NOT NULL
+        """)
+        missing = [row[0] for row in cr.fetchall()]
+        if missing:
+            self.env['res.partner'].with_context(tracking_disable=True).create([
+                {'name': ref.split('@')[0], 'email': ref} if '@' in ref else {'name': ref}
+                for ref in missing
+            ])
+            self.env.flush_all()
+            cr.execute(resolve)
+
+    def _import_bookings(self, invalid_lines):
+        self.env.cr.execute("""
+            SELECT field_id, partner_id, booking_date, start_time, end_time, state, notes, players_count
+            FROM sports_booking_import_stage WHERE line <> ALL(%s) ORDER BY line
+        """, [list(invalid_lines)])
+        vals_list = [
+            {fname: value for fname, value in row.items() if value is not None}
+            for row in self.env.cr.dictfetchall()
+        ]
+        # Los horarios ya se validaron sobre el archivo completo
+        Booking = self.env['sports.booking'].with_context(**{SKIP_CHATTER_CONTEXT: True})
+        self._create_in_batches(Booking._create_prechecked, vals_list)
+        return len(vals_list)
+
+    # ------------------------------------------------------------------
+    # Acciones
+    # ------------------------------------------------------------------
+
+    def _create_in_batches(self, create, vals_list):
+        """Crea los registros por lotes, vaciando la caché entre lotes para acotar la memoria
+
+        No confirma entre lotes: si un lote falla se revierte la importación completa.
+        """
+        for start in range(0, len(vals_list), self._import_batch_size):
+            create(vals_list[start:start + self._import_batch_size])
+            self.env.flush_all()
+            self.env.invalidate_all()
+
+    def _validate(self):
+        self.ensure_one()
+        if self.import_type == 'fields':
+            errors = self._validate_fields()
+        else:
+            errors = self._validate_bookings()
+        errors.sort()
+        self.write({
+            'error_count': len({line for line, _message in errors}),
+            'error_report': '\n'.join(_('Línea %s: %s') % (line, message) for line, message in errors),
+        })
+        return errors
+
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_validate(self):
+        """Validar el archivo completo sin importar nada"""
+        self._validate()
+        self.state = 'validated'
+        return self._reopen()
+
+    def action_import(self):
+        """Validar e importar las filas sin errores"""
+        errors = self._validate()
+        invalid_lines = {line for line, _message in errors}
+        if self.import_type == 'fields':
+            imported = self._import_fields(invalid_lines)
+        else:
+            imported = self._import_bookings(invalid_lines)
+        self.write({'state': 'done', 'imported_count': imported})
+        return self._reopen()
@@ -0,0 +1,120 @@
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class SportsBookingMailQueue(models.Model):
+    _name = 'sports.booking.mail.queue'
+    _description = 'Cola de Correos de Reservas'
+    _order = 'next_attempt, id'
+
+    # Reintentos: espera base * 2^intentos, hasta _max_attempts intentos
+    _max_attempts = 5
+    _retry_base_minutes = 5
+
+    booking_id = fields.Many2one('sports.booking', string='Reserva', required=True, ondelete='cascade')
+    template_id = fields.Many2one('mail.template', string='Plantilla', required=True, ondelete='cascade')
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('sent', 'Enviado'),
+        ('failed', 'Fallido'),
+    ], string='Estado', default='pending', required=True)
+    attempts = fields.Integer(string='Intentos', default=0)
+    next_attempt = fields.Datetime(string='Próximo Intento', default=fields.Datetime.now, required=True)
+    last_error = fields.Text(string='Último Error', readonly=True)
+
+    def init(self):
+        # El cron solo recorre las notificaciones pendientes
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS sports_booking_mail_queue_pending_idx
+            ON sports_booking_mail_queue (next_attempt) WHERE state = 'pending'
+        """)
+
+    @api.model
+    def _enqueue(self, bookings, template_xmlid):
+        """Registra la intención de notificar a los clientes, sin enviar nada"""
+        template = self.env.ref(template_xmlid, raise_if_not_found=False)
+        bookings = bookings.filtered(lambda b: b.partner_id.email)
+        if not template or not bookings:
+            return self.browse()
+        queue = self.sudo().create([
+            {'booking_id': booking.id, 'template_id': template.id}
+            for booking in bookings
+        ])
+        self.env.ref('sports_booking.ir_cron_sports_booking_mail_queue')._trigger()
+        return queue
+
+    @api.model
+    def _cron_send_pending(self, batch_size=100):
+        """Enviar las notificaciones pendientes por lotes
+
+        Cada lote genera los correos de una plantilla con ``send_mail_batch`` y
+        los envía con ``mail.mail.send``, que reutiliza una conexión SMTP por
+        servidor de correo. Los fallos se reintentan con espera exponencial.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        while True:
+            queue = self.search([
+                ('state', '=', 'pending'),
+                ('next_attempt', '<=', fields.Datetime.now()),
+            ], limit=batch_size)
+            if not queue:
+                break
+            for template, entries in queue.grouped('template_id').items():
+                entries._send(template)
+            if auto_commit:
+                self.env.cr.commit()
+            if len(queue) < batch_size:
+                break
+        return True
+
+    def _send(self, template):
+        try:
+            with self.env.cr.savepoint():
+                mails = template.send_mail_batch(self.booking_id.ids)
+                mails.send(raise_exception=False)
+        except Exception as e:
+            _logger.warning("Error al enviar el lote de correos de reservas: %s", e)
+            self._schedule_retry(str(e))
+            return
+        mail_by_res_id = {mail.res_id: mail for mail in mails}
+
+        now = fields.Datetime.now()
+        sent = failed = self.browse()
+        for entry in self:
+            mail = mail_by_res_id.get(entry.booking_id.id)
+            # Los correos enviados con auto_delete ya no existen
+            if mail and mail.exists() and mail.state == 'exception':
+                failed |= entry
+                entry.last_error = mail.failure_reason
+            else:
+                sent |= entry
+        sent.write({'state': 'sent', 'next_attempt': now})
+        if failed:
+            failed._schedule_retry()
+            # Cada reintento genera un correo nuevo
+            mails.exists().filtered(lambda m: m.state == 'exception').unlink()
+
+    def _schedule_retry(self, error=None):
+        now = fields.Datetime.now()
+        for entry in self:
+            attempts = entry.attempts + 1
+            vals = {
+                'attempts': attempts,
+                'next_attempt': now + timedelta(minutes=self._retry_base_minutes * 2 ** attempts),
+            }
+            if attempts >= self._max_attempts:
+                vals['state'] = 'failed'
+            if error:
+                vals['last_error'] = error
+            entry.write(vals)
+
+    def action_retry(self):
+        """Volver a poner en cola las notificaciones fallidas"""
+        self.write({'state': 'pending', 'attempts': 0, 'next_attempt': fields.Datetime.now()})
+        self.env.ref('sports_booking.ir_cron_sports_booking_mail_queue')._trigger()
+        return True
@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError, UserError
+from odoo.tools import format_date
+
+from .booking import SKIP_CHATTER_CONTEXT
+
+
+class SportsBookingRecurrence(models.Model):
+    _name = 'sports.booking.recurrence'
+    _description = 'Serie de Reservas Recurrentes'
+    _inherit = ['mail.thread']
+    _order = 'date_start desc, id desc'
+
+    # Límite de ocurrencias por serie (aprox. una temporada semanal de un año)
+    _max_occurrences = 53
+
+    name = fields.Char(string='Nombre de la Serie', required=True, tracking=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', required=True, tracking=True)
+    field_id = fields.Many2one('sports.field', string='Cancha', required=True, tracking=True)
+    start_time = fields.Float(string='Hora Inicio', required=True)
+    end_time = fields.Float(string='Hora Fin', required=True)
+
+    recurrence_type = fields.Selection([
+        ('weekly', 'Semanal'),
+        ('biweekly', 'Quincenal'),
+    ], string='Frecuencia', required=True, default='weekly')
+    date_start = fields.Date(string='Primera Fecha', required=True, default=fields.Date.today)
+    end_type = fields.Selection([
+        ('until', 'Hasta una fecha'),
+        ('count', 'Número de repeticiones'),
+    ], string='Finaliza', required=True, default='count')
+    until_date = fields.Date(string='Hasta')
+    count = fields.Integer(string='Repeticiones', default=10)
+
+    notes = fields.Text(string='Notas')
+    players_count = fields.Integer(string='Número de Jugadores')
+
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('done', 'Generada'),
+    ], string='Estado', default='draft', required=True, tracking=True)
+    conflict_report = fields.Text(string='Reporte de Conflictos', readonly=True)
+    booking_ids = fields.One2many('sports.booking', 'recurrence_id', string='Reservas')
+    booking_count = fields.Integer(string='Total Reservas', compute='_compute_booking_count')
+
+    _sql_constraints = [
+        ('check_times', 'CHECK(end_time > start_time)', 'La hora de fin debe ser posterior a la hora de inicio!'),
+    ]
+
+    @api.depends('booking_ids')
+    def _compute_booking_count(self):
+        counts = dict(self.env['sports.booking']._read_group(
+            [('recurrence_id', 'in', self.ids)], ['recurrence_id'], ['__count'],
+        ))
+        for recurrence in self:
+            recurrence.booking_count = counts.get(recurrence, 0)
+
+    @api.constrains('end_type', 'until_date', 'count', 'date_start', 'recurrence_type')
+    def _check_end(self):
+        for recurrence in self:
+            if recurrence.end_type == 'until' and (
+                    not recurrence.until_date or recurrence.until_date < recurrence.date_start):
+                raise ValidationError(_('La fecha final debe ser posterior a la primera fecha.'))
+            if recurrence.end_type == 'until':
+                # La serie no se recorta en silencio: se rechaza si pasa del límite
+                step_days = recurrence._get_step().days
+                occurrences = (recurrence.until_date - recurrence.date_start).days // step_days + 1
+                if occurrences > self._max_occurrences:
+                    raise ValidationError(
+                        _('La serie tendría %s repeticiones hasta esa fecha; el máximo es %s.')
+                        % (occurrences, self._max_occurrences))
+            if recurrence.end_type == 'count' and not 0 < recurrence.count <= self._max_occurrences:
+                raise ValidationError(_('Las repeticiones deben estar entre 1 y %s.') % self._max_occurrences)
+
+    def _get_step(self):
+        self.ensure_one()
+        return timedelta(weeks=2 if self.recurrence_type == 'biweekly' else 1)
+
+    def _get_occurrence_dates(self):
+        """Retorna las fechas de todas las ocurrencias de la serie"""
+        self.ensure_one()
+        step = self._get_step()
+        dates = []
+        current = self.date_start
+        while len(dates) < self._max_occurrences:
+            if self.end_type == 'count' and len(dates) >= self.count:
+                break
+            if self.end_type == 'until' and current > self.until_date:
+                break
+            dates.append(current)
+            current += step
+        return dates
+
+    def _get_occurrence_errors(self):
+        """Valida todas las ocurrencias contra las reservas existentes en una sola pasada
+
+        :return: lista de tuplas ``(etiqueta, mensaje)``
+        """
+        self.ensure_one()
+        today = fields.Date.context_today(self)
+        errors = []
+        entries = []
+        for occurrence_date in self._get_occurrence_dates():
+            label = format_date(self.env, occurrence_date)
+            if occurrence_date < today:
+                errors.append((label, _('No se pueden crear reservas para fechas pasadas.')))
+                continue
+            entries.append((False, label, self.field_id, occurrence_date, self.start_time, self.end_time))
+        return errors + self.env['sports.booking']._get_schedule_errors(entries)
+
+    def _format_conflict_report(self, errors):
+        return '\n'.join('%s: %s' % (label, message.replace('\n', ' ')) for label, message in errors)
+
+    def action_check_conflicts(self):
+        """Genera el reporte de conflictos sin crear reservas"""
+        for recurrence in self:
+            errors = recurrence._get_occurrence_errors()
+            recurrence.conflict_report = recurrence._format_conflict_report(errors) or _('Sin conflictos.')
+        return True
+
+    def _prepare_booking_vals(self, booking_date):
+        self.ensure_one()
+        return {
+            'partner_id': self.partner_id.id,
+            'field_id': self.field_id.id,
+            'booking_date': booking_date,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'notes': self.notes,
+            'players_count': self.players_count,
+            'recurrence_id': self.id,
+            'state': 'confirmed',
+            'confirmation_date': fields.Datetime.now(),
+        }
+
+    def action_generate(self):
+        """Crear todas las reservas de la serie en una sola transacción"""
+        # La serie registra un solo mensaje; las reservas generadas no usan chatter
+        Booking = self.env['sports.booking'].with_context(**{SKIP_CHATTER_CONTEXT: True})
+        for recurrence in self:
+            if recurrence.state != 'draft':
+                raise UserError(_('La serie %s ya fue generada.') % recurrence.name)
+            errors = recurrence._get_occurrence_errors()
+            if errors:
+                raise UserError(_(
+                    'No se generó ninguna reserva de la serie %s por los siguientes conflictos:\n%s'
+                ) % (recurrence.name, recurrence._format_conflict_report(errors)))
+
+            # Las ocurrencias ya se validaron arriba: no repetir la validación al crear
+            bookings = Booking._create_prechecked([
+                recurrence._prepare_booking_vals(occurrence_date)
+                for occurrence_date in recurrence._get_occurrence_dates()
+            ])
+            recurrence.write({'state': 'done', 'conflict_report': False})
+            recurrence.message_post(body=_('Se generaron %s reservas.') % len(bookings))
+        return True
+
+    def action_view_bookings(self):
+        self.ensure_one()
+        return {
+            'name': _('Reservas de la Serie'),
+            'type': 'ir.actions.act_window',
+            'view_mode': 'tree,form,calendar',
+            'res_model': 'sports.booking',
+            'domain': [('recurrence_id', '=', self.id)],
+            'context': {'default_recurrence_id': self.id},
+        }
@@ -0,0 +1,224 @@
+import logging
+import threading
+
+from odoo import models, fields, api, tools
+
+from .booking import BOOKING_ACTIVE_STATES
+from .sports_field_schedule_exception import (
+    SCHEDULE_EXCEPTION_JOIN_SQL, SCHEDULE_OPEN_SQL, SCHEDULE_OPENING_SQL, SCHEDULE_CLOSING_SQL,
+)
+
+_logger = logging.getLogger(__name__)
+
+# Estados que cuentan como horas vendidas en los reportes
+REPORT_STATES = BOOKING_ACTIVE_STATES + ['completed']
+
+
+class SportsBookingReport(models.Model):
+    """Ocupación e ingresos pre-agregados por cancha, día y franja horaria
+
+    La tabla se mantiene por SQL: las reservas marcan los pares (cancha, día)
+    modificados en ``sports_booking_report_dirty`` y el cron solo recalcula
+    esos pares, más los días nuevos que aún no tienen filas. Las reservas
+    archivadas (``sports.booking.archive``) se siguen contando.
+    """
+    _name = 'sports.booking.report'
+    _description = 'Análisis de Ocupación de Canchas'
+    _order = 'date desc, field_id, hour'
+    _log_access = False
+
+    # Días futuros que el cron mantiene calculados (ocupación de la agenda)
+    _fill_ahead_days = 30
+    # Pares (cancha, día) recalculados por consulta
+    _refresh_chunk_size = 5000
+
+    field_id = fields.Many2one('sports.field', string='Cancha', readonly=True, index=True)
+    sport_type = fields.Selection(
+        selection=lambda self: self.env['sports.field']._fields['sport_type'].selection,
+        string='Deporte', readonly=True,
+    )
+    date = fields.Date(string='Fecha', readonly=True, index=True)
+    hour = fields.Integer(string='Hora', readonly=True)
+    hours_open = fields.Float(string='Horas Disponibles', readonly=True)
+    hours_sold = fields.Float(string='Horas Vendidas', readonly=True)
+    revenue = fields.Float(string='Ingresos', readonly=True)
+    # Al agrupar se recalcula como horas vendidas / horas disponibles (ver read_group)
+    occupancy = fields.Float(string='Ocupación (%)', readonly=True, group_operator='avg')
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS sports_booking_report_dirty (
+                field_id integer NOT NULL,
+                day date NOT NULL
+            )
+        """)
+        # Solo se agregan marcas, sin clave única: con ON CONFLICT, dos reservas
+        # concurrentes de la misma cancha y día esperaban la fila de la otra.
+        # El cron lee los pares distintos y borra todas sus marcas.
+        self.env.cr.execute("""
+            ALTER TABLE sports_booking_report_dirty
+            DROP CONSTRAINT IF EXISTS sports_booking_report_dirty_pkey
+        """)
+        tools.create_index(self.env.cr, 'sports_booking_report_dirty_day_idx',
+                           'sports_booking_report_dirty', ['day', 'field_id'])
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS sports_booking_report_bucket_idx
+            ON sports_booking_report (field_id, date, hour)
+        """)
+
+    @api.model
+    def _mark_dirty(self, pairs):
+        """Marca pares ``(field_id, fecha)`` para recalcular en el próximo refresco"""
+        pairs = list(set(pairs))
+        if not pairs:
+            return
+        field_ids, days = zip(*pairs)
+        self.env.cr.execute("""
+            INSERT INTO sports_booking_report_dirty (field_id, day)
+            SELECT * FROM unnest(%s::integer[], %s::date[])
+        """, [list(field_ids), list(days)])
+
+    @api.model
+    def _mark_schedule_dirty(self, field_ids):
+        """Marca los días ya calculados desde hoy de estas canchas, tras un cambio de horario
+
+        Los días pasados conservan el horario con el que se calcularon.
+        """
+        filled_until = self.env['ir.config_parameter'].sudo().get_param('sports_booking.report_filled_until')
+        if not field_ids or not filled_until:
+            return
+        self.env.cr.execute("""
+            INSERT INTO sports_booking_report_dirty (field_id, day)
+            SELECT f.field_id, d.day::date
+            FROM unnest(%s::integer[]) AS f(field_id)
+            CROSS JOIN generate_series(%s::date, %s::date, interval '1 day') AS d(day)
+        """, [list(field_ids), fields.Date.context_today(self), filled_until])
+
+    @api.model
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        """La ocupación de un grupo es el total de horas vendidas sobre el total de
+        horas disponibles, no el promedio de los porcentajes de cada franja"""
+        fnames = {spec.split(':')[0] for spec in fields}
+        if 'occupancy' not in fnames:
+            return super().read_group(domain, fields, groupby, offset=offset, limit=limit,
+                                      orderby=orderby, lazy=lazy)
+        extra = [fname for fname in ['hours_sold', 'hours_open'] if fname not in fnames]
+        result = super().read_group(domain, fields + extra, groupby, offset=offset, limit=limit,
+                                    orderby=orderby, lazy=lazy)
+        for group in result:
+            hours_open = group.get('hours_open') or 0.0
+            group['occupancy'] = (
+                min(100.0, 100.0 * (group.get('hours_sold') or 0.0) / hours_open) if hours_open else 0.0
+            )
+            for fname in extra:
+                group.pop(fname, None)
+        return result
+
+    @api.model
+    def _mark_missing_days(self):
+        """Marca los días que todavía no se han calculado, hasta el horizonte futuro"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        filled_until = ICP.get_param('sports_booking.report_filled_until')
+        target = fields.Date.add(fields.Date.context_today(self), days=self._fill_ahead_days)
+        if filled_until:
+            date_from = fields.Date.add(fields.Date.to_date(filled_until), days=1)
+        else:
+            self.env.cr.execute("""
+                SELECT LEAST((SELECT MIN(booking_date) FROM sports_booking),
+                             (SELECT MIN(booking_date) FROM sports_booking_archive))
+            """)
+            date_from = self.env.cr.fetchone()[0] or fields.Date.context_today(self)
+        if date_from > target:
+            return
+        self.env.cr.execute("""
+            INSERT INTO sports_booking_report_dirty (field_id, day)
+            SELECT f.id, d.day::date
+            FROM sports_field f
+            CROSS JOIN generate_series(%s::date, %s::date, interval '1 day') AS d(day)
+            WHERE f.active
+        """, [date_from, target])
+        ICP.set_param('sports_booking.report_filled_until', fields.Date.to_string(target))
+
+    @api.model
+    def _cron_refresh(self):
+        """Recalcular incrementalmente los pares (cancha, día) marcados"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self._mark_missing_days()
+        while True:
+            self.env.cr.execute("""
+                SELECT DISTINCT field_id, day FROM sports_booking_report_dirty
+                ORDER BY day, field_id LIMIT %s
+            """, [self._refresh_chunk_size])
+            pairs = self.env.cr.fetchall()
+            if not pairs:
+                break
+            self._refresh_pairs(pairs)
+            if auto_commit:
+                self.env.cr.commit()
+            if len(pairs) < self._refresh_chunk_size:
+                break
+        return True
+
+    def _refresh_pairs(self, pairs):
+        field_ids, days = [list(values) for values in zip(*pairs)]
+        params = {'field_ids': field_ids, 'days': days, 'states': tuple(REPORT_STATES)}
+        self.env.cr.execute("""
+            DELETE FROM sports_booking_report r
+            USING unnest(%(field_ids)s::integer[], %(days)s::date[]) AS d(field_id, day)
+            WHERE r.field_id = d.field_id AND r.date = d.day
+        """, params)
+        self.env.cr.execute("""
+            INSERT INTO sports_booking_report
+                (field_id, sport_type, date, hour, hours_open, hours_sold, revenue, occupancy)
+            SELECT field_id, sport_type, day, hour, hours_open, hours_sold, revenue,
+                   CASE WHEN hours_open > 0 THEN LEAST(100.0, 100.0 * hours_sold / hours_open) ELSE 0 END
+            FROM (
+                SELECT f.id AS field_id, f.sport_type, d.day, h.hour,
+                       CASE WHEN {is_open}
+                            THEN GREATEST(0, LEAST({closing}, h.hour + 1) - GREATEST({opening}, h.hour))
+                            ELSE 0 END AS hours_open,
+                       COALESCE(s.hours_sold, 0) AS hours_sold,
+                       COALESCE(s.revenue, 0) AS revenue
+                FROM unnest(%(field_ids)s::integer[], %(days)s::date[]) AS d(field_id, day)
+                JOIN sports_field f ON f.id = d.field_id
+                {exception_join}
+                CROSS JOIN generate_series(0, 23) AS h(hour)
+                LEFT JOIN LATERAL (
+                    SELECT SUM(b.overlap) AS hours_sold,
+                           SUM(b.total_price * b.overlap / NULLIF(b.end_time - b.start_time, 0)) AS revenue
+                    FROM (
+                        SELECT LEAST(end_time, h.hour + 1) - GREATEST(start_time, h.hour) AS overlap,
+                               total_price, start_time, end_time
+                        FROM sports_booking
+                        WHERE field_id = d.field_id
+                          AND booking_date = d.day
+                          AND state IN %(states)s
+                          AND start_time < h.hour + 1
+                          AND end_time > h.hour
+                        UNION ALL
+                        -- Reservas históricas movidas al archivo
+                        SELECT LEAST(end_time, h.hour + 1) - GREATEST(start_time, h.hour),
+                               total_price, start_time, end_time
+                        FROM sports_booking_archive
+                        WHERE field_id = d.field_id
+                          AND booking_date = d.day
+                          AND state IN %(states)s
+                          AND start_time < h.hour + 1
+                          AND end_time > h.hour
+                    ) b
+                ) s ON TRUE
+            ) buckets
+            WHERE hours_open > 0 OR hours_sold > 0
+        """.format(
+            exception_join=SCHEDULE_EXCEPTION_JOIN_SQL.format(date='d.day'),
+            is_open=SCHEDULE_OPEN_SQL.format(date='d.day'),
+            opening=SCHEDULE_OPENING_SQL,
+            closing=SCHEDULE_CLOSING_SQL,
+        ), params)
+        self.env.cr.execute("""
+            DELETE FROM sports_booking_report_dirty
+            USING unnest(%(field_ids)s::integer[], %(days)s::date[]) AS d(field_id, day)
+            WHERE sports_booking_report_dirty.field_id = d.field_id
+              AND sports_booking_report_dirty.day = d.day
+        """, params)
+        self.invalidate_model()
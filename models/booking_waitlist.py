@@ -0,0 +1,277 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+
+from .booking import BOOKING_ACTIVE_STATES, BOOKING_TSRANGE_SQL
+from .scheduling import merge_intervals
+
+_logger = logging.getLogger(__name__)
+
+
+class SportsBookingWaitlist(models.Model):
+    """Clientes esperando que se libere un horario de una cancha
+
+    Cuando una reserva se cancela, se reprograma o se elimina, los horarios
+    liberados de la transacción se cruzan en una sola consulta (índice GiST
+    sobre el rango horario) con las solicitudes en espera. Cada horario se
+    ofrece a la solicitud más antigua que quepa, opcionalmente con una
+    retención, y los correos se envían por lotes desde un cron.
+    """
+    _name = 'sports.booking.waitlist'
+    _description = 'Lista de Espera de Reservas'
+    _order = 'booking_date, start_time, id'
+
+    # Minutos que dura una oferta si no se configura sports_booking.waitlist_offer_minutes
+    _default_offer_minutes = 30
+
+    partner_id = fields.Many2one('res.partner', string='Cliente', required=True, index=True, ondelete='cascade')
+    user_id = fields.Many2one('res.users', string='Usuario', ondelete='set null',
+                              help='Usuario del portal para el que se retiene el horario ofrecido')
+    field_id = fields.Many2one('sports.field', string='Cancha', required=True, ondelete='cascade')
+    booking_date = fields.Date(string='Fecha', required=True)
+    start_time = fields.Float(string='Hora Inicio', required=True)
+    end_time = fields.Float(string='Hora Fin', required=True)
+    state = fields.Selection([
+        ('waiting', 'En Espera'),
+        ('offered', 'Ofrecido'),
+        ('done', 'Reservado'),
+        ('expired', 'Vencido'),
+        ('cancelled', 'Cancelado'),
+    ], string='Estado', default='waiting', required=True, index=True)
+    offered_at = fields.Datetime(string='Ofrecido el', readonly=True)
+    offer_expires_at = fields.Datetime(string='Oferta Vence', readonly=True)
+    notified = fields.Boolean(string='Notificado', readonly=True)
+
+    _sql_constraints = [
+        ('check_times', 'CHECK(end_time > start_time)', 'La hora de fin debe ser posterior a la hora de inicio!'),
+    ]
+
+    def init(self):
+        # Búsqueda por intervalo de las solicitudes que se solapan con un horario liberado
+        tools.create_index(self.env.cr, 'sports_booking_waitlist_waiting_range_idx', self._table,
+                           ['field_id', BOOKING_TSRANGE_SQL], method='gist', where="state = 'waiting'")
+        # Cron de notificaciones y de vencimiento de ofertas
+        tools.create_index(self.env.cr, 'sports_booking_waitlist_offered_idx', self._table,
+                           ['offer_expires_at'], where="state = 'offered'")
+
+    @api.constrains('field_id', 'booking_date', 'start_time', 'end_time')
+    def _check_schedule(self):
+        for entry in self:
+            hours = entry.field_id._get_day_hours(entry.booking_date)
+            if not hours or entry.start_time < hours[0] or entry.end_time > hours[1]:
+                raise ValidationError(_('El horario está fuera del horario de apertura de la cancha.'))
+
+    @api.model
+    def _get_offer_minutes(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'sports_booking.waitlist_offer_minutes', self._default_offer_minutes))
+
+    @api.model
+    def _hold_offers(self):
+        """Si se retiene el horario ofrecido (parámetro sports_booking.waitlist_hold)"""
+        return tools.str2bool(self.env['ir.config_parameter'].sudo().get_param('sports_booking.waitlist_hold', 'True'))
+
+    @api.model
+    def _join(self, partner, field, booking_date, start_time, end_time, user=None):
+        """Anota al cliente en la lista de espera de un horario ocupado
+
+        :return: par ``(solicitud, False)`` o ``(False, mensaje de error)``
+        """
+        errors = self.env['sports.booking'].sudo()._get_schedule_errors(
+            [(False, '', field, booking_date, start_time, end_time)])
+        if not errors:
+            return False, _('El horario está disponible: puedes reservarlo directamente.')
+        entry = self.search([
+            ('partner_id', '=', partner.id),
+            ('field_id', '=', field.id),
+            ('booking_date', '=', booking_date),
+            ('start_time', '=', start_time),
+            ('end_time', '=', end_time),
+            ('state', 'in', ['waiting', 'offered']),
+        ], limit=1)
+        if not entry:
+            try:
+                entry = self.create({
+                    'partner_id': partner.id,
+                    'user_id': user.id if user else False,
+                    'field_id': field.id,
+                    'booking_date': booking_date,
+                    'start_time': start_time,
+                    'end_time': end_time,
+                })
+            except ValidationError as e:
+                return False, e.args[0]
+        return entry, False
+
+    @api.model
+    def _schedule_promotion(self, footprint):
+        """Programa la promoción de la lista de espera para los horarios liberados
+
+        Los horarios se acumulan durante la transacción y se procesan juntos
+        antes del commit, después de escribir las cancelaciones.
+        """
+        if not footprint:
+            return
+        data = self.env.cr.precommit.data
+        if 'sports_booking.waitlist' not in data:
+            data['sports_booking.waitlist'] = set()
+            self.env.cr.precommit.add(self._promote_pending)
+        data['sports_booking.waitlist'].update(footprint)
+
+    @api.model
+    def _promote_pending(self):
+        footprint = self.env.cr.precommit.data.pop('sports_booking.waitlist', set())
+        self.sudo()._promote(footprint)
+        self.env.flush_all()
+
+    @api.model
+    def _promote(self, footprint):
+        """Ofrece los horarios liberados a las solicitudes en espera
+
+        :param footprint: tuplas ``(field_id, fecha, hora_inicio, hora_fin)`` liberadas
+        :return: solicitudes ofrecidas
+        """
+        today = fields.Date.context_today(self)
+        footprint = [item for item in footprint if item[1] >= today]
+        if not footprint:
+            return self.browse()
+        field_ids, dates, starts, ends = [list(values) for values in zip(*footprint)]
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT DISTINCT w.id
+            FROM sports_booking_waitlist w
+            JOIN unnest(%s::integer[], %s::date[], %s::float[], %s::float[]) AS f(f_field_id, f_date, f_start, f_end)
+              ON w.field_id = f.f_field_id
+             AND {tsrange} && tsrange(f.f_date + f.f_start * interval '1 hour',
+                                      f.f_date + f.f_end * interval '1 hour', '[)')
+            WHERE w.state = 'waiting'
+            ORDER BY w.id
+        """.format(tsrange=BOOKING_TSRANGE_SQL), [field_ids, dates, starts, ends])
+        candidates = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not candidates:
+            return self.browse()
+
+        # Ocupación actual (reservas y retenciones vigentes) de los días afectados
+        busy = defaultdict(list)
+        candidate_fields = candidates.field_id
+        candidate_dates = set(candidates.mapped('booking_date'))
+        groups = self.env['sports.booking']._read_group(
+            [
+                ('field_id', 'in', candidate_fields.ids),
+                ('booking_date', 'in', list(candidate_dates)),
+                ('state', 'in', BOOKING_ACTIVE_STATES),
+            ],
+            ['field_id', 'booking_date:day'],
+            ['start_time:array_agg', 'end_time:array_agg'],
+        )
+        for field, booking_date, starts, ends in groups:
+            busy[field.id, fields.Date.to_date(booking_date)].extend(zip(starts, ends))
+        for hold in self.env['sports.booking.hold']._get_active_holds(
+                candidate_fields.ids, min(candidate_dates), max(candidate_dates)):
+            busy[hold.field_id.id, hold.booking_date].append((hold.start_time, hold.end_time))
+
+        now = fields.Datetime.now()
+        expires_at = now + timedelta(minutes=self._get_offer_minutes())
+        hold_offers = self._hold_offers()
+        offered = self.browse()
+        # En orden de llegada: cada horario ofrecido deja de estar libre para los siguientes
+        for entry in candidates:
+            key = (entry.field_id.id, entry.booking_date)
+            hours = entry.field_id._get_day_hours(entry.booking_date)
+            if not hours or entry.start_time < hours[0] or entry.end_time > hours[1]:
+                continue
+            if any(start < entry.end_time and entry.start_time < end
+                   for start, end in merge_intervals(busy[key])):
+                continue
+            if hold_offers and entry.user_id and not self.env['sports.booking.hold']._insert_hold(
+                    entry.field_id.id, entry.booking_date, entry.start_time, entry.end_time,
+                    entry.user_id.id, expires_at):
+                continue
+            busy[key].append((entry.start_time, entry.end_time))
+            offered |= entry
+        if offered:
+            offered.write({
+                'state': 'offered',
+                'offered_at': now,
+                'offer_expires_at': expires_at,
+                'notified': False,
+            })
+            self.env.ref('sports_booking.ir_cron_sports_booking_waitlist')._trigger()
+        return offered
+
+    @api.model
+    def _mark_booked(self, bookings):
+        """Cierra las solicitudes cubiertas por reservas nuevas de los mismos clientes"""
+        bookings = bookings.filtered(lambda b: b.state in BOOKING_ACTIVE_STATES)
+        if not bookings:
+            return
+        entries = self.search([
+            ('partner_id', 'in', bookings.partner_id.ids),
+            ('field_id', 'in', bookings.field_id.ids),
+            ('booking_date', 'in', list(set(bookings.mapped('booking_date')))),
+            ('state', 'in', ['waiting', 'offered']),
+        ])
+        entries.filtered(lambda entry: any(
+            booking.partner_id == entry.partner_id and booking.field_id == entry.field_id
+            and booking.booking_date == entry.booking_date
+            and booking.start_time < entry.end_time and entry.start_time < booking.end_time
+            for booking in bookings
+        )).write({'state': 'done'})
+
+    @api.model
+    def _cron_process(self, batch_size=100):
+        """Notificar las ofertas por lotes y liberar las ofertas vencidas
+
+        Los horarios de las ofertas vencidas se vuelven a ofrecer al siguiente
+        de la lista; las solicitudes de días pasados se dan por vencidas.
+        """
+        now = fields.Datetime.now()
+        expired = self.search([('state', '=', 'offered'), ('offer_expires_at', '<=', now)])
+        if expired:
+            footprint = {(entry.field_id.id, entry.booking_date, entry.start_time, entry.end_time)
+                         for entry in expired}
+            expired.write({'state': 'expired'})
+            self._promote(footprint)
+        self.search([
+            ('state', '=', 'waiting'),
+            ('booking_date', '<', fields.Date.context_today(self)),
+        ]).write({'state': 'expired'})
+
+        template = self.env.ref('sports_booking.sports_booking_waitlist_offer_template', raise_if_not_found=False)
+        while template:
+            entries = self.search([
+                ('state', '=', 'offered'),
+                ('notified', '=', False),
+                ('partner_id.email', '!=', False),
+            ], limit=batch_size)
+            if not entries:
+                break
+            try:
+                with self.env.cr.savepoint():
+                    template.send_mail_batch(entries.ids).send(raise_exception=False)
+            except Exception as e:
+                _logger.warning("Error al notificar las ofertas de la lista de espera: %s", e)
+            entries.write({'notified': True})
+            if len(entries) < batch_size:
+                break
+        return True
+
+    def action_cancel(self):
+        """Retirar las solicitudes; los horarios ya ofrecidos pasan al siguiente de la lista"""
+        offered = self.filtered(lambda entry: entry.state == 'offered')
+        footprint = {(entry.field_id.id, entry.booking_date, entry.start_time, entry.end_time)
+                     for entry in offered}
+        for entry in offered.filtered('user_id'):
+            self.env['sports.booking.hold'].sudo().search([
+                ('user_id', '=', entry.user_id.id),
+                ('field_id', '=', entry.field_id.id),
+                ('booking_date', '=', entry.booking_date),
+                ('start_time', '=', entry.start_time),
+                ('end_time', '=', entry.end_time),
+            ]).unlink()
+        self.filtered(lambda entry: entry.state in ['waiting', 'offered']).write({'state': 'cancelled'})
+        self._schedule_promotion(footprint)
+        return True
@@ -1,4 +1,4 @@
-from odoo import models, fields
+from odoo import models, fields, _
 
 class ResPartner(models.Model):
     _inherit = 'res.partner'
@@ -7,8 +7,11 @@ class ResPartner(models.Model):
     booking_count = fields.Integer(string='Total Reservas', compute='_compute_booking_count')
     
     def _compute_booking_count(self):
+        counts = dict(self.env['sports.booking']._read_group(
+            [('partner_id', 'in', self.ids)], ['partner_id'], ['__count'],
+        ))
         for partner in self:
-            partner.booking_count = len(partner.booking_ids)
+            partner.booking_count = counts.get(partner, 0)
     
     def action_view_bookings(self):
         self.ensure_one()
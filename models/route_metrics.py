@@ -0,0 +1,134 @@
+import functools
+import threading
+import time
+from collections import defaultdict, deque
+
+from odoo import models, fields, api, _
+from odoo.http import request
+
+# Muestras conservadas por ruta en cada proceso (ventana móvil)
+ROUTE_METRICS_WINDOW = 1000
+ROUTE_METRICS_KEYS = ('total_ms', 'queries', 'sql_ms', 'orm_ms', 'render_ms')
+
+_samples = defaultdict(lambda: deque(maxlen=ROUTE_METRICS_WINDOW))
+_samples_lock = threading.Lock()
+
+
+def record_sample(route, sample):
+    """Guarda una medición ``{métrica: valor}`` de la ruta"""
+    with _samples_lock:
+        _samples[route].append(tuple(sample[key] for key in ROUTE_METRICS_KEYS))
+
+
+def reset_samples():
+    with _samples_lock:
+        _samples.clear()
+
+
+def _percentile(values, ratio):
+    return values[min(len(values) - 1, int(ratio * len(values)))]
+
+
+def get_route_stats():
+    """Percentiles p50/p95/p99 de cada métrica, por ruta
+
+    Cada proceso de Odoo tiene su propio histograma: con varios workers los
+    valores corresponden al worker que atiende la consulta.
+
+    :return: ``{ruta: {'count': n, 'total_ms': {'p50': ..., 'p95': ..., 'p99': ...}, ...}}``
+    """
+    with _samples_lock:
+        snapshot = {route: list(samples) for route, samples in _samples.items()}
+    stats = {}
+    for route, samples in snapshot.items():
+        stats[route] = {'count': len(samples)}
+        for index, key in enumerate(ROUTE_METRICS_KEYS):
+            values = sorted(sample[index] for sample in samples)
+            stats[route][key] = {
+                'p50': _percentile(values, 0.50),
+                'p95': _percentile(values, 0.95),
+                'p99': _percentile(values, 0.99),
+            }
+    return stats
+
+
+def instrumented(route):
+    """Decorador de controladores: mide consultas SQL, tiempo SQL, ORM y render
+
+    Solo actúa si el parámetro ``sports_booking.route_metrics`` está activo.
+    El tiempo ORM es el del controlador descontando el SQL; el render se mide
+    forzando la generación de la plantilla QWeb de la respuesta.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not request.env['ir.config_parameter'].sudo().get_param('sports_booking.route_metrics'):
+                return func(self, *args, **kwargs)
+            thread = threading.current_thread()
+            queries_start = getattr(thread, 'query_count', 0)
+            sql_start = getattr(thread, 'query_time', 0.0)
+            start = time.perf_counter()
+            response = func(self, *args, **kwargs)
+            handler_end = time.perf_counter()
+            sql_handler = getattr(thread, 'query_time', 0.0) - sql_start
+            if getattr(response, 'is_qweb', False):
+                response.flatten()
+            end = time.perf_counter()
+            record_sample(route, {
+                'total_ms': (end - start) * 1000,
+                'queries': getattr(thread, 'query_count', 0) - queries_start,
+                'sql_ms': (getattr(thread, 'query_time', 0.0) - sql_start) * 1000,
+                'orm_ms': max(0.0, handler_end - start - sql_handler) * 1000,
+                'render_ms': (end - handler_end) * 1000,
+            })
+            return response
+        return wrapper
+    return decorator
+
+
+class SportsBookingRouteStats(models.TransientModel):
+    """Vista en el backend de las métricas de rutas del portal del proceso actual"""
+    _name = 'sports.booking.route.stats'
+    _description = 'Métricas de Rutas del Portal'
+    _order = 'total_p95 desc'
+
+    route = fields.Char(string='Ruta', readonly=True)
+    count = fields.Integer(string='Muestras', readonly=True)
+    total_p50 = fields.Float(string='Total p50 (ms)', readonly=True)
+    total_p95 = fields.Float(string='Total p95 (ms)', readonly=True)
+    total_p99 = fields.Float(string='Total p99 (ms)', readonly=True)
+    queries_p50 = fields.Float(string='Consultas p50', readonly=True)
+    queries_p95 = fields.Float(string='Consultas p95', readonly=True)
+    queries_p99 = fields.Float(string='Consultas p99', readonly=True)
+    sql_p95 = fields.Float(string='SQL p95 (ms)', readonly=True)
+    orm_p95 = fields.Float(string='ORM p95 (ms)', readonly=True)
+    render_p95 = fields.Float(string='Render p95 (ms)', readonly=True)
+
+    @api.model
+    def action_open(self):
+        """Captura el histograma actual y lo muestra en una lista"""
+        stats = self.create([{
+            'route': route,
+            'count': values['count'],
+            'total_p50': values['total_ms']['p50'],
+            'total_p95': values['total_ms']['p95'],
+            'total_p99': values['total_ms']['p99'],
+            'queries_p50': values['queries']['p50'],
+            'queries_p95': values['queries']['p95'],
+            'queries_p99': values['queries']['p99'],
+            'sql_p95': values['sql_ms']['p95'],
+            'orm_p95': values['orm_ms']['p95'],
+            'render_p95': values['render_ms']['p95'],
+        } for route, values in get_route_stats().items()])
+        return {
+            'name': _('Métricas de Rutas del Portal'),
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'view_mode': 'tree',
+            'domain': [('id', 'in', stats.ids)],
+        }
+
+    @api.model
+    def action_reset(self):
+        reset_samples()
+        return self.action_open()
@@ -0,0 +1,144 @@
+"""Utilidades de intervalos horarios usadas por el motor de disponibilidad.
+
+Las horas se representan como floats en formato 24h (ej: 18.5 = 18:30),
+igual que en los campos ``start_time``/``end_time`` de las reservas.
+"""
+import math
+
+
+def build_slots(opening_time, closing_time, duration):
+    """Genera la grilla de slots de una cancha entre apertura y cierre"""
+    slots = []
+    if duration <= 0:
+        return slots
+    current_time = opening_time
+    while current_time + duration <= closing_time:
+        slots.append({
+            'start_time': current_time,
+            'end_time': current_time + duration,
+            'available': True,
+        })
+        current_time += duration
+    return slots
+
+
+def merge_intervals(intervals):
+    """Ordena y fusiona intervalos (inicio, fin) solapados o contiguos"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def mark_busy_slots(slots, busy):
+    """Marca como no disponibles los slots que se solapan con intervalos ocupados.
+
+    ``slots`` debe estar ordenado por hora de inicio y ``busy`` debe venir de
+    :func:`merge_intervals`; ambos se recorren una sola vez (barrido ordenado).
+    """
+    index = 0
+    for slot in slots:
+        while index < len(busy) and busy[index][1] <= slot['start_time']:
+            index += 1
+        if index == len(busy):
+            break
+        if busy[index][0] < slot['end_time']:
+            slot['available'] = False
+    return slots
+
+
+def iter_free_starts(opening_time, closing_time, step, duration, busy, earliest=0.0):
+    """Genera en orden las horas de inicio libres para un intervalo de ``duration``.
+
+    Los inicios se alinean a la grilla de la cancha (``opening_time`` más
+    múltiplos de ``step``). Se recorren solo los huecos entre los intervalos
+    de ``busy`` (ordenados y fusionados con :func:`merge_intervals`), así que
+    el costo depende de las reservas y de los resultados consumidos, no del
+    tamaño de la grilla; el consumidor puede detenerse en cualquier momento.
+    """
+    if step <= 0 or duration <= 0:
+        return
+    gap_start = max(opening_time, earliest)
+    for busy_start, busy_end in list(busy) + [(closing_time, closing_time)]:
+        gap_end = min(busy_start, closing_time)
+        # Primer inicio de la grilla dentro del hueco (con tolerancia de redondeo)
+        start = opening_time + max(0, math.ceil((gap_start - opening_time) / step - 1e-9)) * step
+        while start + duration <= gap_end + 1e-9:
+            yield start
+            start += step
+        if gap_end >= closing_time:
+            return
+        gap_start = max(gap_start, busy_end)
+
+
+def find_conflict(new_intervals, existing_intervals):
+    """Busca un solape que involucre al menos un intervalo nuevo.
+
+    Los intervalos son tuplas ``(inicio, fin, etiqueta)``. Se ordenan por
+    inicio y se recorren una vez, recordando el fin máximo visto entre todos
+    los intervalos y entre los nuevos: un intervalo nuevo choca si empieza
+    antes del fin máximo global, uno existente si empieza antes del fin
+    máximo de los nuevos. Los solapes entre intervalos existentes se ignoran.
+
+    :return: par ``(etiqueta, etiqueta_conflictiva)`` o ``None``
+    """
+    events = sorted(
+        [(start, end, label, True) for start, end, label in new_intervals] +
+        [(start, end, label, False) for start, end, label in existing_intervals],
+        key=lambda event: (event[0], event[1]),
+    )
+    max_all = max_new = None
+    for start, end, label, is_new in events:
+        if is_new and max_all and start < max_all[0]:
+            return label, max_all[1]
+        if not is_new and max_new and start < max_new[0]:
+            return max_new[1], label
+        if not max_all or end > max_all[0]:
+            max_all = (end, label)
+        if is_new and (not max_new or end > max_new[0]):
+            max_new = (end, label)
+    return None
+
+
+def weekday_mask(flags):
+    """Convierte 7 booleanos (Lunes..Domingo) en una máscara de bits (bit 0 = Lunes)"""
+    mask = 0
+    for weekday, flag in enumerate(flags):
+        if flag:
+            mask |= 1 << weekday
+    return mask
+
+
+def build_price_profile(base_price, bands):
+    """Construye el perfil de precios de un día como tramos consecutivos.
+
+    :param bands: tuplas ``(hora_desde, hora_hasta, precio)`` ordenadas de
+        mayor a menor prioridad; las horas no cubiertas usan ``base_price``
+    :return: lista de tramos ``(desde, hasta, precio)`` que cubren 0..24
+    """
+    points = sorted({0.0, 24.0}.union(*((start, end) for start, end, _price in bands)))
+    profile = []
+    for start, end in zip(points, points[1:]):
+        price = next(
+            (price for band_start, band_end, price in bands if band_start <= start and end <= band_end),
+            base_price,
+        )
+        if profile and profile[-1][2] == price:
+            profile[-1] = (profile[-1][0], end, price)
+        else:
+            profile.append((start, end, price))
+    return profile
+
+
+def interval_price(profile, start_time, end_time):
+    """Precio de un intervalo prorrateado sobre los tramos del perfil"""
+    total = 0.0
+    for band_start, band_end, price in profile:
+        overlap = min(band_end, end_time) - max(band_start, start_time)
+        if overlap > 0:
+            total += overlap * price
+    return total
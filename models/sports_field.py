@@ -1,5 +1,34 @@
-from odoo import models, fields, api, _
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
+from odoo.tools.lru import LRU
+
+from .booking import BOOKING_ACTIVE_STATES
+from .scheduling import (
+    build_slots, merge_intervals, mark_busy_slots, iter_free_starts,
+    build_price_profile, interval_price, weekday_mask,
+)
+
+# Tarifa nocturna a partir de esta hora y días de la tarifa de fin de semana
+NIGHT_START = 18.0
+WEEKEND_DAYS = (5, 6)
+
+# Campos de la cancha de los que dependen el horario y la disponibilidad (los
+# precios se invalidan aparte, en _invalidate_pricing)
+SCHEDULE_FIELDS = {
+    'opening_time', 'closing_time', 'time_slot_duration',
+    'available_monday', 'available_tuesday', 'available_wednesday', 'available_thursday',
+    'available_friday', 'available_saturday', 'available_sunday',
+}
+
+# Disponibilidad por ``(base, cancha, día, versión de la cancha, versión del día)``.
+# Las versiones salen de una secuencia y se guardan en la base, así que un cambio
+# hecho por cualquier worker deja de usar las entradas anteriores sin vaciar la
+# caché del registro; las entradas obsoletas salen por antigüedad
+_availability_cache = LRU(8192)
 
 class SportsField(models.Model):
     _name = 'sports.field'
@@ -28,6 +57,7 @@ class SportsField(models.Model):
     price_per_hour = fields.Float(string='Precio por Hora', required=True, default=0.0, tracking=True)
     price_weekend = fields.Float(string='Precio Fin de Semana', tracking=True)
     price_night = fields.Float(string='Precio Nocturno (después 18:00)', tracking=True)
+    pricing_rule_ids = fields.One2many('sports.field.pricing.rule', 'field_id', string='Reglas de Precio')
     
     # Horarios
     opening_time = fields.Float(string='Hora Apertura', default=6.0, help='Hora en formato 24h (ej: 6.0 = 6:00 AM)')
@@ -49,6 +79,8 @@ class SportsField(models.Model):
     
     # Imagen
     image = fields.Image(string='Imagen de la Cancha', max_width=1024, max_height=1024)
+    image_512 = fields.Image(string='Imagen 512', related='image', max_width=512, max_height=512, store=True)
+    image_128 = fields.Image(string='Imagen 128', related='image', max_width=128, max_height=128, store=True)
     
     # Relaciones
     booking_ids = fields.One2many('sports.booking', 'field_id', string='Reservas')
@@ -62,15 +94,52 @@ class SportsField(models.Model):
     available_friday = fields.Boolean(string='Viernes', default=True)
     available_saturday = fields.Boolean(string='Sábado', default=True)
     available_sunday = fields.Boolean(string='Domingo', default=True)
+    weekday_mask = fields.Integer(string='Máscara de Días', compute='_compute_weekday_mask', store=True,
+                                  help='Días disponibles como bits (bit 0 = Lunes)')
+    schedule_exception_ids = fields.One2many('sports.field.schedule.exception', 'field_id',
+                                             string='Cierres y Horarios Especiales')
+    cache_version = fields.Integer(string='Versión de Caché', readonly=True, copy=False,
+                                   help='Cambia con el horario, los precios o las excepciones de la cancha')
     
     _sql_constraints = [
         ('code_unique', 'UNIQUE(code)', 'El código de la cancha debe ser único!'),
     ]
     
+    def init(self):
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS sports_field_cache_version_seq")
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS sports_field_availability_version (
+                field_id integer NOT NULL,
+                day date NOT NULL,
+                version bigint NOT NULL
+            )
+        """)
+        # Solo se agregan filas: sin clave única, dos reservas concurrentes del
+        # mismo día no compiten por una fila (ver _bump_availability_version)
+        self.env.cr.execute("""
+            ALTER TABLE sports_field_availability_version
+            DROP CONSTRAINT IF EXISTS sports_field_availability_version_pkey
+        """)
+        tools.create_index(self.env.cr, 'sports_field_availability_version_day_idx',
+                           'sports_field_availability_version', ['field_id', 'day', 'version'])
+    
     @api.depends('booking_ids')
     def _compute_booking_count(self):
+        counts = dict(self.env['sports.booking']._read_group(
+            [('field_id', 'in', self.ids)], ['field_id'], ['__count'],
+        ))
+        for field in self:
+            field.booking_count = counts.get(field, 0)
+    
+    @api.depends('available_monday', 'available_tuesday', 'available_wednesday', 'available_thursday',
+                 'available_friday', 'available_saturday', 'available_sunday')
+    def _compute_weekday_mask(self):
         for field in self:
-            field.booking_count = len(field.booking_ids)
+            field.weekday_mask = weekday_mask((
+                field.available_monday, field.available_tuesday, field.available_wednesday,
+                field.available_thursday, field.available_friday, field.available_saturday,
+                field.available_sunday,
+            ))
     
     @api.constrains('opening_time', 'closing_time')
     def _check_opening_hours(self):
@@ -88,48 +157,402 @@ class SportsField(models.Model):
             if field.time_slot_duration <= 0 or field.time_slot_duration > 8:
                 raise ValidationError(_('La duración del bloque debe estar entre 0.5 y 8 horas.'))
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        fields_created = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return fields_created
+    
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        if SCHEDULE_FIELDS.intersection(vals):
+            self._bump_cache_version()
+            self.env['sports.booking.report']._mark_schedule_dirty(self.ids)
+        if any(fname in vals for fname in ['price_per_hour', 'price_weekend', 'price_night']):
+            self._invalidate_pricing()
+        return res
+    
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+    
+    def _bump_cache_version(self):
+        """Invalida el horario, los precios y la disponibilidad en caché de estas canchas"""
+        if not self:
+            return
+        self.env.cr.execute("""
+            UPDATE sports_field SET cache_version = nextval('sports_field_cache_version_seq')
+            WHERE id IN %s
+        """, [tuple(self.ids)])
+        self.invalidate_recordset(['cache_version'])
+    
+    @api.model
+    def _bump_availability_version(self, pairs):
+        """Invalida la disponibilidad en caché de pares ``(field_id, fecha)``
+        
+        Agrega una fila por par en lugar de actualizar una fila compartida: con
+        REPEATABLE READ dos reservas concurrentes de la misma cancha y día
+        chocarían en esa fila y una de ellas se reintentaría. La versión de un
+        día es el número de filas y la mayor de ellas (ver
+        :meth:`_get_day_versions`); las filas sobrantes se compactan en
+        :meth:`_gc_availability_versions`.
+        """
+        pairs = list(set(pairs))
+        if not pairs:
+            return
+        field_ids, days = zip(*pairs)
+        self.env.cr.execute("""
+            INSERT INTO sports_field_availability_version (field_id, day, version)
+            SELECT field_id, day, nextval('sports_field_cache_version_seq')
+            FROM unnest(%s::integer[], %s::date[]) AS p(field_id, day)
+        """, [list(field_ids), list(days)])
+    
+    @api.model
+    def _get_day_versions(self, field_ids, date_from, date_to):
+        """Versiones de la disponibilidad por ``(field_id, día)``: ``(filas, mayor)``
+        
+        La mayor versión sola no basta: una transacción que tomó un número más
+        bajo puede confirmarse después que otra, y solo el número de filas lo
+        refleja.
+        """
+        self.env.cr.execute("""
+            SELECT field_id, day, COUNT(*), MAX(version) FROM sports_field_availability_version
+            WHERE field_id IN %s AND day BETWEEN %s AND %s
+            GROUP BY field_id, day
+        """, [tuple(field_ids), date_from, date_to])
+        return {(field_id, day): (count, version) for field_id, day, count, version in self.env.cr.fetchall()}
+    
+    @api.autovacuum
+    def _gc_availability_versions(self):
+        """Compacta las versiones de cada día en una sola fila con una versión nueva
+        
+        La versión nueva es mayor que todas las anteriores, así que el par
+        ``(filas, mayor)`` resultante no coincide con ninguno ya usado como
+        clave de caché, aunque se confirmen después filas tomadas antes.
+        """
+        self.env.cr.execute("""
+            WITH compacted AS (
+                DELETE FROM sports_field_availability_version
+                WHERE (field_id, day) IN (
+                    SELECT field_id, day FROM sports_field_availability_version
+                    GROUP BY field_id, day HAVING COUNT(*) > 1
+                )
+                RETURNING field_id, day
+            )
+            INSERT INTO sports_field_availability_version (field_id, day, version)
+            SELECT field_id, day, nextval('sports_field_cache_version_seq')
+            FROM (SELECT DISTINCT field_id, day FROM compacted) AS pairs
+        """)
+    
+    @api.model
+    @tools.ormcache('sport_type')
+    def _get_catalog(self, sport_type):
+        """Datos del catálogo público en caché, por tipo de deporte
+        
+        La caché se vacía en todos los workers con cualquier alta, baja o
+        modificación de canchas (ver :meth:`create`, :meth:`write` y
+        :meth:`unlink`), así que las visitas al catálogo no consultan la base.
+        
+        :return: ``(ids_canchas, tipos_de_deporte)``
+        """
+        Field = self.sudo()
+        domain = [('active', '=', True)]
+        if sport_type:
+            domain.append(('sport_type', '=', sport_type))
+        sport_types = tuple(
+            sport for [sport] in Field._read_group([('active', '=', True)], ['sport_type'])
+        )
+        return tuple(Field.search(domain, order='name').ids), sport_types
+    
+    @api.model
+    def _get_availability_cached(self, field_ids, date_from, date_to):
+        """Versión en caché de :meth:`_get_availability` para el portal
+        
+        Cada (cancha, día) se guarda por separado con sus versiones, que se leen
+        en una sola consulta; solo se recalculan los días que faltan. El
+        resultado se comparte entre peticiones y no debe modificarse.
+        """
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        sports_fields = self.sudo().browse(field_ids)
+        result = {field.id: {} for field in sports_fields}
+        if not sports_fields or date_to < date_from:
+            return result
+        
+        day_versions = self._get_day_versions(sports_fields.ids, date_from, date_to)
+        
+        dbname = self.env.cr.dbname
+        days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+        missing = {}
+        for field in sports_fields:
+            for day in days:
+                key = (dbname, field.id, day, field.cache_version, day_versions.get((field.id, day), (0, 0)))
+                slots = _availability_cache.get(key)
+                if slots is None:
+                    missing[field.id, day] = key
+                else:
+                    result[field.id][fields.Date.to_string(day)] = slots
+        if missing:
+            missing_days = [day for _field_id, day in missing]
+            computed = sports_fields.browse({field_id for field_id, _day in missing})._get_availability(
+                min(missing_days), max(missing_days))
+            for (field_id, day), key in missing.items():
+                slots = computed[field_id][fields.Date.to_string(day)]
+                _availability_cache[key] = slots
+                result[field_id][fields.Date.to_string(day)] = slots
+        return result
+    
+    @tools.ormcache('self.id', 'self.cache_version')
+    def _get_pricing_table(self):
+        """Compila las tarifas y reglas de la cancha en una tabla inmutable (en caché)
+        
+        :return: ``(precio_base, bandas)`` donde cada banda es
+            ``(desde_fecha, hasta_fecha, máscara_días, hora_desde, hora_hasta, precio)``
+            en orden de prioridad descendente
+        """
+        field = self.sudo()
+        bands = [
+            (rule.date_from, rule.date_to, rule._get_weekday_mask(),
+             rule.hour_from, rule.hour_to, rule.price_per_hour)
+            for rule in field.pricing_rule_ids.sorted(lambda r: (r.sequence, r.id))
+        ]
+        # Tarifas simples de la cancha, con menor prioridad que las reglas
+        if field.price_night:
+            bands.append((False, False, 0b1111111, NIGHT_START, 24.0, field.price_night))
+        if field.price_weekend:
+            weekend_mask = sum(1 << weekday for weekday in WEEKEND_DAYS)
+            bands.append((False, False, weekend_mask, 0.0, 24.0, field.price_weekend))
+        return field.price_per_hour, tuple(bands)
+    
+    def _get_price_profile(self, date):
+        """Retorna los tramos de precio ``(desde, hasta, precio)`` de la cancha para una fecha"""
+        self.ensure_one()
+        base_price, bands = self._get_pricing_table()
+        weekday_bit = 1 << date.weekday()
+        return build_price_profile(base_price, [
+            (hour_from, hour_to, price)
+            for date_from, date_to, mask, hour_from, hour_to, price in bands
+            if mask & weekday_bit
+            and (not date_from or date_from <= date)
+            and (not date_to or date <= date_to)
+        ])
+    
+    def _invalidate_pricing(self):
+        """Invalida las tablas de precios y recalcula en lote las reservas futuras no finalizadas"""
+        self._bump_cache_version()
+        bookings = self.env['sports.booking'].sudo().search([
+            ('field_id', 'in', self.ids),
+            ('booking_date', '>=', fields.Date.context_today(self)),
+            ('state', 'not in', ['completed', 'cancelled']),
+        ])
+        self.env.add_to_compute(bookings._fields['total_price'], bookings)
+        bookings._mark_report_dirty()
+    
+    def get_image_url(self, size='image_512'):
+        """URL de la imagen redimensionada, cacheable por el navegador y el proxy
+        
+        El parámetro ``unique`` cambia con cada modificación de la cancha, por lo que
+        ``/web/image`` puede responder con caché de larga duración y ETag.
+        """
+        self.ensure_one()
+        unique = hashlib.sha512(str(self.write_date).encode()).hexdigest()[:7]
+        return '/web/image/sports.field/%s/%s?unique=%s' % (self.id, size, unique)
+    
+    @tools.ormcache('self.id', 'self.cache_version', 'date_from')
+    def _get_schedule(self, date_from):
+        """Compila el horario de la cancha en una tupla inmutable (en caché)
+        
+        Solo incluye las excepciones desde ``date_from`` (hoy, para
+        :meth:`_get_day_hours`), así que la entrada no crece con el historial.
+        
+        :return: ``(máscara_días, apertura, cierre, duración_slot, excepciones)``
+            donde ``excepciones`` es ``{fecha: (apertura, cierre) | None}``
+        """
+        field = self.sudo()
+        return (field.weekday_mask, field.opening_time, field.closing_time,
+                field.time_slot_duration, field._get_exceptions([('date', '>=', date_from)]))
+    
+    def _get_exceptions(self, date_domain):
+        """Excepciones de horario de la cancha en las fechas de ``date_domain``
+        
+        :return: ``{fecha: (apertura, cierre) | None}``; las excepciones propias
+            de la cancha reemplazan a las generales
+        """
+        self.ensure_one()
+        exceptions = {}
+        for exception in self.env['sports.field.schedule.exception'].sudo().search_fetch(
+            [('field_id', 'in', [False, self.id])] + date_domain,
+            ['field_id', 'date', 'exception_type', 'opening_time', 'closing_time'],
+            order='field_id desc nulls first',
+        ):
+            exceptions[exception.date] = (
+                (exception.opening_time, exception.closing_time)
+                if exception.exception_type == 'special_hours' else None
+            )
+        return exceptions
+    
+    def _get_day_hours(self, date):
+        """Retorna ``(apertura, cierre)`` de la cancha en una fecha, o None si no abre"""
+        self.ensure_one()
+        today = fields.Date.today()
+        mask, opening_time, closing_time, _step, exceptions = self._get_schedule(today)
+        if date < today:
+            # Fechas pasadas (reportes, historial): fuera de la caché
+            exceptions = self._get_exceptions([('date', '=', date)])
+        if date in exceptions:
+            return exceptions[date]
+        if not mask & (1 << date.weekday()):
+            return None
+        return opening_time, closing_time
+    
+    def _get_availability(self, date_from, date_to):
+        """Calcula los slots de varias canchas en un rango de fechas.
+        
+        Ejecuta una única consulta agrupada por cancha y fecha, y marca los
+        slots ocupados con un barrido ordenado en lugar de comparar cada
+        reserva contra cada slot.
+        
+        :return: ``{field_id: {fecha: [slots]}}``; los días no disponibles
+            tienen una lista vacía
+        """
+        date_from = fields.Date.to_date(date_from)
+        date_to = fields.Date.to_date(date_to)
+        result = {field.id: {} for field in self}
+        if not self or date_to < date_from:
+            return result
+        
+        busy = defaultdict(list)
+        groups = self.env['sports.booking'].sudo()._read_group(
+            [
+                ('field_id', 'in', self.ids),
+                ('booking_date', '>=', date_from),
+                ('booking_date', '<=', date_to),
+                ('state', 'in', BOOKING_ACTIVE_STATES),
+            ],
+            ['field_id', 'booking_date:day'],
+            ['start_time:array_agg', 'end_time:array_agg'],
+        )
+        for field, booking_date, starts, ends in groups:
+            busy[field.id, fields.Date.to_date(booking_date)] = merge_intervals(zip(starts, ends))
+        
+        days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+        for field in self:
+            for day in days:
+                hours = field._get_day_hours(day)
+                if not hours:
+                    slots = []
+                else:
+                    slots = build_slots(hours[0], hours[1], field.time_slot_duration)
+                    mark_busy_slots(slots, busy.get((field.id, day), []))
+                    profile = field._get_price_profile(day)
+                    for slot in slots:
+                        slot['price'] = interval_price(profile, slot['start_time'], slot['end_time'])
+                result[field.id][fields.Date.to_string(day)] = slots
+        return result
+    
+    def _apply_holds(self, availability, date_from, date_to, exclude_uid=None):
+        """Marca como no disponibles los slots retenidos temporalmente
+        
+        Las retenciones vencen solas, por eso no forman parte de la caché: se
+        superponen sobre ``availability`` (resultado de :meth:`_get_availability`)
+        copiando solo los días afectados.
+        
+        :param exclude_uid: no aplicar las retenciones de este usuario
+        """
+        holds = self.env['sports.booking.hold'].sudo()._get_active_holds(
+            self.ids, date_from, date_to, exclude_uid=exclude_uid)
+        held = defaultdict(list)
+        for hold in holds:
+            held[hold.field_id.id, fields.Date.to_string(hold.booking_date)].append((hold.start_time, hold.end_time))
+        if not held:
+            return availability
+        result = {field_id: dict(days) for field_id, days in availability.items()}
+        for (field_id, day), intervals in held.items():
+            if day in result.get(field_id, {}):
+                slots = [dict(slot) for slot in result[field_id][day]]
+                result[field_id][day] = mark_busy_slots(slots, merge_intervals(intervals))
+        return result
+    
     def get_available_slots(self, date):
         """Retorna los slots disponibles para una fecha específica"""
         self.ensure_one()
+        date = fields.Date.to_date(date)
+        availability = self._apply_holds(
+            self._get_availability_cached((self.id,), date, date), date, date, exclude_uid=self.env.uid)
+        return [dict(slot) for slot in availability[self.id][fields.Date.to_string(date)]]
+    
+    @api.model
+    def _find_next_slots(self, sport_type, date_from, time_from=0.0, duration=1.0,
+                         max_price=None, limit=10, max_days=14):
+        """Busca los primeros horarios libres de un deporte entre todas sus canchas
         
-        # Verificar día de la semana
-        weekday = date.weekday()  # 0=Monday, 6=Sunday
-        availability_map = {
-            0: self.available_monday,
-            1: self.available_tuesday,
-            2: self.available_wednesday,
-            3: self.available_thursday,
-            4: self.available_friday,
-            5: self.available_saturday,
-            6: self.available_sunday,
-        }
-        
-        if not availability_map.get(weekday, False):
-            return []
+        Lee en una sola consulta las reservas activas (y las retenciones de
+        otros usuarios) del rango, y recorre día por día solo los huecos entre
+        reservas de cada cancha, respetando su horario compilado (días,
+        excepciones y duración de slot). Se detiene en cuanto completa
+        ``limit`` resultados.
         
-        # Generar slots
-        slots = []
-        current_time = self.opening_time
-        
-        while current_time + self.time_slot_duration <= self.closing_time:
-            slots.append({
-                'start_time': current_time,
-                'end_time': current_time + self.time_slot_duration,
-                'available': True,
-            })
-            current_time += self.time_slot_duration
-        
-        # Verificar reservas existentes
-        bookings = self.env['sports.booking'].search([
-            ('field_id', '=', self.id),
-            ('booking_date', '=', date),
-            ('state', 'in', ['confirmed', 'pending']),
-        ])
+        :param time_from: hora mínima de inicio, solo para ``date_from``
+        :param max_price: precio total máximo del horario (opcional)
+        :return: lista ordenada por fecha y hora de
+            ``{field_id, field_name, date, start_time, end_time, price}``
+        """
+        date_from = fields.Date.to_date(date_from)
+        date_to = date_from + timedelta(days=max_days - 1)
+        sports_fields = self.sudo().search([('active', '=', True), ('sport_type', '=', sport_type)], order='name')
+        if not sports_fields or duration <= 0 or limit <= 0:
+            return []
         
-        for booking in bookings:
-            for slot in slots:
-                if (booking.start_time < slot['end_time'] and 
-                    booking.end_time > slot['start_time']):
-                    slot['available'] = False
+        busy = defaultdict(list)
+        groups = self.env['sports.booking'].sudo()._read_group(
+            [
+                ('field_id', 'in', sports_fields.ids),
+                ('booking_date', '>=', date_from),
+                ('booking_date', '<=', date_to),
+                ('state', 'in', BOOKING_ACTIVE_STATES),
+            ],
+            ['field_id', 'booking_date:day'],
+            ['start_time:array_agg', 'end_time:array_agg'],
+        )
+        for field, booking_date, starts, ends in groups:
+            busy[field.id, fields.Date.to_date(booking_date)].extend(zip(starts, ends))
+        holds = self.env['sports.booking.hold'].sudo()._get_active_holds(
+            sports_fields.ids, date_from, date_to, exclude_uid=self.env.uid)
+        for hold in holds:
+            busy[hold.field_id.id, hold.booking_date].append((hold.start_time, hold.end_time))
         
-        return slots
\ No newline at end of file
+        results = []
+        for offset in range(max_days):
+            day = date_from + timedelta(days=offset)
+            earliest = time_from if offset == 0 else 0.0
+            candidates = []
+            for field in sports_fields:
+                hours = field._get_day_hours(day)
+                if not hours:
+                    continue
+                profile = field._get_price_profile(day)
+                found = 0
+                for start in iter_free_starts(hours[0], hours[1], field.time_slot_duration,
+                                              duration, merge_intervals(busy.get((field.id, day), [])), earliest):
+                    price = interval_price(profile, start, start + duration)
+                    if max_price is not None and price > max_price:
+                        continue
+                    candidates.append((start, field.name, field.id, price))
+                    # Ninguna cancha puede aportar más de ``limit`` resultados al día
+                    found += 1
+                    if found >= limit - len(results):
+                        break
+            for start, field_name, field_id, price in sorted(candidates):
+                results.append({
+                    'field_id': field_id,
+                    'field_name': field_name,
+                    'date': fields.Date.to_string(day),
+                    'start_time': start,
+                    'end_time': start + duration,
+                    'price': price,
+                })
+                if len(results) >= limit:
+                    return results
+        return results
@@ -0,0 +1,69 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+from .scheduling import weekday_mask
+
+
+class SportsFieldPricingRule(models.Model):
+    _name = 'sports.field.pricing.rule'
+    _description = 'Regla de Precio de Cancha'
+    _order = 'field_id, sequence, id'
+
+    field_id = fields.Many2one('sports.field', string='Cancha', required=True, index=True, ondelete='cascade')
+    name = fields.Char(string='Descripción', required=True)
+    sequence = fields.Integer(string='Prioridad', default=10, help='Las reglas con menor número tienen prioridad')
+    price_per_hour = fields.Float(string='Precio por Hora', required=True)
+
+    # Franja horaria
+    hour_from = fields.Float(string='Desde', required=True, default=0.0)
+    hour_to = fields.Float(string='Hasta', required=True, default=24.0)
+
+    # Temporada (opcional)
+    date_from = fields.Date(string='Temporada Desde')
+    date_to = fields.Date(string='Temporada Hasta')
+
+    # Días de la semana
+    monday = fields.Boolean(string='Lun', default=True)
+    tuesday = fields.Boolean(string='Mar', default=True)
+    wednesday = fields.Boolean(string='Mié', default=True)
+    thursday = fields.Boolean(string='Jue', default=True)
+    friday = fields.Boolean(string='Vie', default=True)
+    saturday = fields.Boolean(string='Sáb', default=True)
+    sunday = fields.Boolean(string='Dom', default=True)
+
+    @api.constrains('hour_from', 'hour_to')
+    def _check_hours(self):
+        for rule in self:
+            if not 0 <= rule.hour_from < rule.hour_to <= 24:
+                raise ValidationError(_('La franja horaria debe estar entre 0 y 24 y terminar después de empezar.'))
+
+    @api.constrains('date_from', 'date_to')
+    def _check_dates(self):
+        for rule in self:
+            if rule.date_from and rule.date_to and rule.date_from > rule.date_to:
+                raise ValidationError(_('La temporada debe terminar después de empezar.'))
+
+    def _get_weekday_mask(self):
+        self.ensure_one()
+        return weekday_mask((
+            self.monday, self.tuesday, self.wednesday, self.thursday,
+            self.friday, self.saturday, self.sunday,
+        ))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        rules = super().create(vals_list)
+        rules.field_id._invalidate_pricing()
+        return rules
+
+    def write(self, vals):
+        fields_before = self.field_id
+        res = super().write(vals)
+        (fields_before | self.field_id)._invalidate_pricing()
+        return res
+
+    def unlink(self):
+        sports_fields = self.field_id
+        res = super().unlink()
+        sports_fields._invalidate_pricing()
+        return res
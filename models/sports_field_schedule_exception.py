@@ -0,0 +1,103 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+# Excepción vigente de una cancha (alias ``f``) en una fecha (expresión ``{date}``):
+# la propia de la cancha tiene prioridad sobre la general (sin cancha)
+SCHEDULE_EXCEPTION_JOIN_SQL = """
+    LEFT JOIN LATERAL (
+        SELECT e.exception_type, e.opening_time, e.closing_time
+        FROM sports_field_schedule_exception e
+        WHERE e.date = {date} AND (e.field_id = f.id OR e.field_id IS NULL)
+        ORDER BY e.field_id IS NULL
+        LIMIT 1
+    ) AS e ON TRUE
+"""
+# Horario efectivo del día, usando las columnas de SCHEDULE_EXCEPTION_JOIN_SQL
+SCHEDULE_OPEN_SQL = (
+    "(e.exception_type = 'special_hours' OR (e.exception_type IS NULL "
+    "AND f.weekday_mask & (1 << (EXTRACT(ISODOW FROM {date})::integer - 1)) <> 0))"
+)
+SCHEDULE_OPENING_SQL = "COALESCE(e.opening_time, f.opening_time)"
+SCHEDULE_CLOSING_SQL = "COALESCE(e.closing_time, f.closing_time)"
+
+
+class SportsFieldScheduleException(models.Model):
+    _name = 'sports.field.schedule.exception'
+    _description = 'Excepción de Horario de Cancha'
+    _order = 'date desc, field_id'
+
+    field_id = fields.Many2one('sports.field', string='Cancha', index=True, ondelete='cascade',
+                               help='Vacío: aplica a todas las canchas (por ejemplo, feriados)')
+    date = fields.Date(string='Fecha', required=True, index=True)
+    name = fields.Char(string='Motivo', required=True)
+    exception_type = fields.Selection([
+        ('closed', 'Cerrado'),
+        ('special_hours', 'Horario Especial'),
+    ], string='Tipo', required=True, default='closed')
+    opening_time = fields.Float(string='Hora Apertura')
+    closing_time = fields.Float(string='Hora Cierre')
+
+    _sql_constraints = [
+        ('field_date_unique', 'UNIQUE(field_id, date)', 'Ya existe una excepción para esta cancha en esa fecha!'),
+    ]
+
+    @api.constrains('exception_type', 'opening_time', 'closing_time')
+    def _check_hours(self):
+        for exception in self.filtered(lambda e: e.exception_type == 'special_hours'):
+            if not 0 <= exception.opening_time < exception.closing_time <= 24:
+                raise ValidationError(_('El horario especial debe estar entre 0 y 24 y cerrar después de abrir.'))
+
+    @api.constrains('field_id', 'date')
+    def _check_general_unique(self):
+        # UNIQUE no aplica cuando field_id es NULL
+        for exception in self.filtered(lambda e: not e.field_id):
+            if self.search_count([('id', '!=', exception.id), ('field_id', '=', False),
+                                  ('date', '=', exception.date)]):
+                raise ValidationError(_('Ya existe una excepción general para esa fecha!'))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        exceptions = super().create(vals_list)
+        exceptions._invalidate_schedule()
+        return exceptions
+
+    def write(self, vals):
+        self._invalidate_schedule()
+        res = super().write(vals)
+        self._invalidate_schedule()
+        return res
+
+    def unlink(self):
+        sports_fields = self._invalidate_schedule()
+        res = super().unlink()
+        # Un horario compilado durante el borrado todavía incluiría estas excepciones
+        sports_fields._bump_cache_version()
+        return res
+
+    def _get_affected_pairs(self):
+        """Pares ``(field_id, fecha)`` cuyo horario depende de estas excepciones"""
+        all_field_ids = None
+        pairs = set()
+        for exception in self:
+            if exception.field_id:
+                pairs.add((exception.field_id.id, exception.date))
+            else:
+                if all_field_ids is None:
+                    all_field_ids = self.env['sports.field'].sudo().with_context(active_test=False).search([]).ids
+                pairs.update((field_id, exception.date) for field_id in all_field_ids)
+        return pairs
+
+    def _invalidate_schedule(self):
+        """Invalida los horarios compilados, el reporte y la disponibilidad publicada
+
+        :return: canchas afectadas
+        """
+        pairs = self._get_affected_pairs()
+        sports_fields = self.env['sports.field'].browse({field_id for field_id, _date in pairs})
+        sports_fields._bump_cache_version()
+        self.env['sports.booking.report']._mark_dirty(pairs)
+        today = fields.Date.context_today(self)
+        self.env['sports.booking']._notify_availability({
+            (field_id, date, 0.0, 0.0) for field_id, date in pairs if date >= today
+        })
+        return sports_fields
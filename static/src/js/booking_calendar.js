@@ -1,244 +1,594 @@
-odoo.define('sports_booking.booking_calendar', function (require) {
-    'use strict';
-
-    var publicWidget = require('web.public.widget');
-    var ajax = require('web.ajax');
-
-    publicWidget.registry.BookingCalendar = publicWidget.Widget.extend({
-        selector: '#booking_form',
-        events: {
-            'change #field_id': '_onFieldChange',
-            'change #booking_date': '_onDateChange',
-            'click .time-slot': '_onSlotClick',
-        },
-
-        /**
-         * Inicialización
-         */
-        start: function () {
-            this._super.apply(this, arguments);
-            this.selectedField = null;
-            this.selectedDate = null;
-            this.selectedSlot = null;
-        },
-
-        /**
-         * Cuando cambia la cancha seleccionada
-         */
-        _onFieldChange: function (ev) {
-            var fieldId = $(ev.currentTarget).val();
-            var $option = $(ev.currentTarget).find('option:selected');
-            
-            if (!fieldId) {
-                $('#field_info').hide();
-                $('#available_slots').empty();
-                $('#booking_summary').hide();
-                $('#submit_button').prop('disabled', true);
-                return;
+/** @odoo-module **/
+
+import publicWidget from "@web/legacy/js/public/public_widget";
+import { debounce } from "@web/core/utils/timing";
+
+// Tiempo durante el que se reutiliza la disponibilidad de un (cancha, fecha)
+const SLOTS_CACHE_TTL = 30000;
+// Espera tras el último cambio de cancha o fecha antes de consultar el servidor
+const LOAD_DEBOUNCE_DELAY = 250;
+// Días anteriores y posteriores que se precargan en segundo plano
+const PREFETCH_DAYS = 1;
+
+publicWidget.registry.BookingCalendar = publicWidget.Widget.extend({
+    selector: '#booking_form',
+    events: {
+        'change #field_id': '_onFieldChange',
+        'change #booking_date': '_onDateChange',
+        'click .time-slot': '_onSlotClick',
+        'click .slot-waitlist': '_onWaitlistClick',
+    },
+
+    /**
+     * Inicialización
+     */
+    start: function () {
+        this.rpc = this.bindService('rpc');
+        this.selectedField = null;
+        this.selectedDate = null;
+        this.selectedSlot = null;
+        this.availabilityChannel = null;
+
+        // Caché de slots por "cancha/fecha": {slots, fetchedAt} o {promise}
+        this.slotsCache = new Map();
+        // Botones renderizados por "inicio-fin" y firma de la grilla mostrada
+        this.slotButtons = new Map();
+        this.renderedGrid = null;
+        this._loadAvailableSlotsDebounced = debounce(this._loadAvailableSlots.bind(this), LOAD_DEBOUNCE_DELAY);
+
+        // Disponibilidad en vivo: el servidor publica los cambios por el bus
+        this.busService = this.bindService('bus_service');
+        this._onAvailabilityNotification = this._onAvailabilityNotification.bind(this);
+        this.busService.subscribe('sports_booking/availability', this._onAvailabilityNotification);
+
+        // Cancha y fecha preseleccionadas desde la búsqueda de horarios
+        if (this.$('#field_id').val()) {
+            this.$('#field_id').trigger('change');
+            if (this.$('#booking_date').val()) {
+                this.$('#booking_date').trigger('change');
             }
-
-            this.selectedField = {
-                id: fieldId,
-                name: $option.text().split(' - ')[0],
-                price: parseFloat($option.data('price')),
-                opening: parseFloat($option.data('opening')),
-                closing: parseFloat($option.data('closing'))
-            };
-
-            // Mostrar información de la cancha
-            var fieldInfo = 'Precio: S/. ' + this.selectedField.price.toFixed(2) + '/hora<br/>' +
-                          'Horario: ' + this._formatTime(this.selectedField.opening) + 
-                          ' - ' + this._formatTime(this.selectedField.closing);
-            $('#field_details').html(fieldInfo);
-            $('#field_info').show();
-
-            // Si ya hay fecha seleccionada, cargar slots
-            if (this.selectedDate) {
-                this._loadAvailableSlots();
+        }
+        return this._super.apply(this, arguments);
+    },
+
+    /**
+     * Liberar la suscripción al bus
+     */
+    destroy: function () {
+        if (this._loadAvailableSlotsDebounced) {
+            this._loadAvailableSlotsDebounced.cancel();
+        }
+        if (this.busService) {
+            this.busService.unsubscribe('sports_booking/availability', this._onAvailabilityNotification);
+            if (this.availabilityChannel) {
+                this.busService.deleteChannel(this.availabilityChannel);
             }
+        }
+        this._super.apply(this, arguments);
+    },
 
-            this._updateSummary();
-        },
-
-        /**
-         * Cuando cambia la fecha seleccionada
-         */
-        _onDateChange: function (ev) {
-            var date = $(ev.currentTarget).val();
-            
-            if (!date) {
-                $('#available_slots').empty();
-                this.selectedDate = null;
-                return;
-            }
+    //--------------------------------------------------------------------------
+    // Handlers
+    //--------------------------------------------------------------------------
 
-            this.selectedDate = date;
+    /**
+     * Cuando cambia la cancha seleccionada
+     */
+    _onFieldChange: function (ev) {
+        const fieldId = $(ev.currentTarget).val();
+        const $option = $(ev.currentTarget).find('option:selected');
+
+        if (!fieldId) {
+            this.selectedField = null;
+            this.$('#field_info').hide();
+            this._clearSlots();
+            this.$('#booking_summary').hide();
+            this.$('#submit_button').prop('disabled', true);
+            return;
+        }
+
+        this.selectedField = {
+            id: fieldId,
+            name: $option.text().split(' - ')[0].trim(),
+            price: parseFloat($option.data('price')),
+            opening: parseFloat($option.data('opening')),
+            closing: parseFloat($option.data('closing')),
+        };
+
+        // Mostrar información de la cancha
+        const fieldInfo = 'Precio: S/. ' + this.selectedField.price.toFixed(2) + '/hora<br/>' +
+            'Horario: ' + this._formatTime(this.selectedField.opening) +
+            ' - ' + this._formatTime(this.selectedField.closing);
+        this.$('#field_details').html(fieldInfo);
+        this.$('#field_info').show();
+
+        // Si ya hay fecha seleccionada, cargar slots
+        if (this.selectedDate) {
+            this._scheduleLoad();
+        }
 
-            // Validar que haya cancha seleccionada
-            if (!this.selectedField) {
-                alert('Por favor selecciona primero una cancha');
-                $(ev.currentTarget).val('');
+        this._updateSummary();
+    },
+
+    /**
+     * Cuando cambia la fecha seleccionada
+     */
+    _onDateChange: function (ev) {
+        const date = $(ev.currentTarget).val();
+
+        if (!date) {
+            this._clearSlots();
+            this.selectedDate = null;
+            return;
+        }
+
+        // Validar que haya cancha seleccionada
+        if (!this.selectedField) {
+            alert('Por favor selecciona primero una cancha');
+            $(ev.currentTarget).val('');
+            return;
+        }
+
+        this.selectedDate = date;
+        this._scheduleLoad();
+    },
+
+    /**
+     * Cuando se hace clic en un slot de tiempo
+     */
+    _onSlotClick: function (ev) {
+        ev.preventDefault();
+
+        const $btn = $(ev.currentTarget);
+        const startTime = parseFloat($btn.data('start'));
+        const endTime = parseFloat($btn.data('end'));
+        const price = parseFloat($btn.data('price'));
+
+        // Retener el horario antes de seleccionarlo: si otro cliente ya lo
+        // tomó, se descubre aquí y no al enviar la reserva
+        this.rpc('/bookings/hold', {
+            field_id: this.selectedField.id,
+            date: this.selectedDate,
+            start_time: startTime,
+            end_time: endTime,
+        }).then((result) => {
+            if (result.error) {
+                this._setSlotAvailable($btn, false);
+                this._updateCachedSlot(this.selectedField.id, this.selectedDate, startTime, endTime, false);
+                alert(result.error);
                 return;
             }
-
-            // Cargar slots disponibles
-            this._loadAvailableSlots();
-        },
-
-        /**
-         * Cargar slots disponibles mediante llamada AJAX
-         */
-        _loadAvailableSlots: function () {
-            var self = this;
-            
-            if (!this.selectedField || !this.selectedDate) {
+            this._selectSlot($btn, startTime, endTime, price, result.expires_in);
+        }).catch((error) => {
+            console.error('Error reteniendo el horario:', error);
+            alert('No se pudo reservar el horario. Por favor intenta nuevamente.');
+        });
+    },
+
+    /**
+     * Anotarse en la lista de espera de un horario ocupado
+     */
+    _onWaitlistClick: function (ev) {
+        ev.preventDefault();
+
+        const $link = $(ev.currentTarget);
+        const $btn = $link.siblings('button');
+        this.rpc('/bookings/waitlist', {
+            field_id: this.selectedField.id,
+            date: this.selectedDate,
+            start_time: parseFloat($btn.data('start')),
+            end_time: parseFloat($btn.data('end')),
+        }).then((result) => {
+            if (result.error) {
+                alert(result.error);
                 return;
             }
-
-            // Mostrar loading
-            $('#loading_slots').show();
-            $('#available_slots').empty();
-            this.selectedSlot = null;
-            $('#selected_slot_info').hide();
-            $('#submit_button').prop('disabled', true);
-
-            // Llamada JSON-RPC a Odoo
-            ajax.jsonRpc('/bookings/available-slots', 'call', {
-                field_id: this.selectedField.id,
-                date: this.selectedDate
-            }).then(function (result) {
-                $('#loading_slots').hide();
-                
-                if (result.error) {
-                    alert('Error: ' + result.error);
-                    return;
-                }
-
-                self._renderSlots(result.slots);
-            }).catch(function (error) {
-                $('#loading_slots').hide();
-                console.error('Error cargando slots:', error);
-                alert('Error al cargar los horarios disponibles. Por favor intenta nuevamente.');
+            $link.replaceWith('<small class="slot-waitlisted d-block text-center text-muted">' +
+                '<i class="fa fa-check"></i> Te avisaremos</small>');
+        }).catch((error) => {
+            console.error('Error en la lista de espera:', error);
+            alert('No se pudo registrar en la lista de espera. Por favor intenta nuevamente.');
+        });
+    },
+
+    /**
+     * Aplicar en el lugar los cambios de disponibilidad publicados por el servidor
+     */
+    _onAvailabilityNotification: function (payload) {
+        // La caché se mantiene al día aunque el día no esté en pantalla
+        const entry = this.slotsCache.get(this._cacheKey(payload.field_id, payload.date));
+        if (entry && entry.slots) {
+            // El aviso trae el día completo; se conservan los precios ya cargados
+            entry.slots = payload.slots.map((slot) => {
+                const cached = entry.slots.find((s) => s.start_time === slot.start_time && s.end_time === slot.end_time);
+                return Object.assign({}, cached || {}, slot);
             });
-        },
-
-        /**
-         * Renderizar los slots disponibles
-         */
-        _renderSlots: function (slots) {
-            var $container = $('#available_slots');
-            $container.empty();
-
-            if (!slots || slots.length === 0) {
-                $container.append(
-                    '<div class="col-12">' +
-                    '<div class="alert alert-warning">No hay horarios disponibles para esta fecha.</div>' +
-                    '</div>'
-                );
+            entry.fetchedAt = Date.now();
+        }
+        if (!this.selectedField || String(payload.field_id) !== String(this.selectedField.id) ||
+                payload.date !== this.selectedDate) {
+            return;
+        }
+        payload.slots.forEach((slot) => {
+            const $btn = this.slotButtons.get(this._slotKey(slot));
+            if (!$btn || $btn.hasClass('time-slot') === slot.available) {
                 return;
             }
+            if (slot.available) {
+                this._setSlotAvailable($btn, true);
+                return;
+            }
+            const wasSelected = this._isSelected(slot);
+            if (wasSelected && Date.now() < this.holdExpiresAt) {
+                // Es nuestra propia retención vigente: nadie más puede reservarlo
+                return;
+            }
+            this._setSlotAvailable($btn, false);
+            if (wasSelected) {
+                // La retención venció y otro cliente tomó el horario
+                this._clearSelection();
+                alert('El horario seleccionado acaba de ser reservado. Por favor elige otro.');
+            }
+        });
+    },
+
+    //--------------------------------------------------------------------------
+    // Carga y caché de slots
+    //--------------------------------------------------------------------------
+
+    /**
+     * Mostrar al instante lo que haya en caché y agrupar en una sola consulta
+     * los cambios rápidos de cancha o fecha
+     */
+    _scheduleLoad: function () {
+        this._clearSelection();
+        const cached = this._getCachedSlots(this.selectedField.id, this.selectedDate);
+        if (cached) {
+            this._loadAvailableSlotsDebounced.cancel();
+            this.$('#loading_slots').hide();
+            this._renderSlots(cached);
+            this._watchAvailability();
+            this._prefetchAdjacentDays();
+            return;
+        }
+        this._loadAvailableSlotsDebounced();
+    },
+
+    /**
+     * Cargar los slots de la cancha y fecha seleccionadas
+     */
+    _loadAvailableSlots: function () {
+        if (!this.selectedField || !this.selectedDate) {
+            return;
+        }
+        const fieldId = this.selectedField.id;
+        const date = this.selectedDate;
 
-            slots.forEach(function (slot) {
-                var slotClass = slot.available ? 'btn-outline-success time-slot' : 'btn-secondary disabled';
-                var startTime = this._formatTime(slot.start_time);
-                var endTime = this._formatTime(slot.end_time);
-                var duration = slot.end_time - slot.start_time;
-
-                var $slotBtn = $('<div class="col-md-3 col-sm-4 col-6 mb-2">' +
-                    '<button type="button" class="btn ' + slotClass + ' btn-block" ' +
-                    (slot.available ? '' : 'disabled') + ' ' +
-                    'data-start="' + slot.start_time + '" ' +
-                    'data-end="' + slot.end_time + '">' +
-                    '<i class="fa fa-clock-o"></i><br/>' +
-                    startTime + ' - ' + endTime + '<br/>' +
-                    '<small>(' + duration.toFixed(1) + ' hrs)</small>' +
-                    '</button>' +
-                    '</div>');
-
-                $container.append($slotBtn);
-            }.bind(this));
-        },
-
-        /**
-         * Cuando se hace clic en un slot de tiempo
-         */
-        _onSlotClick: function (ev) {
-            ev.preventDefault();
-            
-            var $btn = $(ev.currentTarget);
-            var startTime = parseFloat($btn.data('start'));
-            var endTime = parseFloat($btn.data('end'));
-
-            // Remover selección anterior
-            $('.time-slot').removeClass('btn-success').addClass('btn-outline-success');
-            
-            // Marcar como seleccionado
-            $btn.removeClass('btn-outline-success').addClass('btn-success');
-
-            // Guardar selección
-            this.selectedSlot = {
-                start: startTime,
-                end: endTime,
-                duration: endTime - startTime
-            };
-
-            // Actualizar campos hidden
-            $('#start_time').val(startTime);
-            $('#end_time').val(endTime);
-
-            // Mostrar información del slot seleccionado
-            var slotInfo = 'Horario: ' + this._formatTime(startTime) + ' - ' + this._formatTime(endTime) + '<br/>' +
-                          'Duración: ' + this.selectedSlot.duration.toFixed(1) + ' horas';
-            $('#slot_details').html(slotInfo);
-            $('#selected_slot_info').show();
-
-            // Actualizar resumen y habilitar botón
-            this._updateSummary();
-            $('#submit_button').prop('disabled', false);
-        },
-
-        /**
-         * Actualizar el resumen de la reserva
-         */
-        _updateSummary: function () {
-            if (!this.selectedField || !this.selectedDate || !this.selectedSlot) {
-                $('#booking_summary').hide();
+        this.$('#loading_slots').show();
+        this._fetchSlots(fieldId, date).then((slots) => {
+            // Se ignoran las respuestas de una selección ya cambiada
+            if (!this.selectedField || this.selectedField.id !== fieldId || this.selectedDate !== date) {
                 return;
             }
+            this.$('#loading_slots').hide();
+            this._renderSlots(slots);
+            this._watchAvailability();
+            this._prefetchAdjacentDays();
+        }).catch((error) => {
+            this.$('#loading_slots').hide();
+            console.error('Error cargando slots:', error);
+            alert(error.message || 'Error al cargar los horarios disponibles. Por favor intenta nuevamente.');
+        });
+    },
+
+    /**
+     * Slots de un (cancha, fecha), desde la caché o el servidor; las consultas
+     * en curso se comparten
+     */
+    _fetchSlots: function (fieldId, date) {
+        const key = this._cacheKey(fieldId, date);
+        const cached = this._getCachedSlots(fieldId, date);
+        if (cached) {
+            return Promise.resolve(cached);
+        }
+        const entry = this.slotsCache.get(key);
+        if (entry && entry.promise) {
+            // Consulta en curso (propia o de la precarga): leer la caché al terminar
+            return entry.promise.then(() => this._fetchSlots(fieldId, date));
+        }
+        const promise = this.rpc('/bookings/available-slots', {
+            field_id: fieldId,
+            date: date,
+        }).then((result) => {
+            if (result.error) {
+                this.slotsCache.delete(key);
+                throw new Error(result.error);
+            }
+            this._setCachedSlots(fieldId, date, result.slots);
+            return result.slots;
+        }, (error) => {
+            this.slotsCache.delete(key);
+            throw error;
+        });
+        this.slotsCache.set(key, { promise: promise });
+        return promise;
+    },
+
+    /**
+     * Precargar en segundo plano los días vecinos con una sola consulta
+     */
+    _prefetchAdjacentDays: function () {
+        const fieldId = this.selectedField.id;
+        // El mínimo del campo de fecha es el día de hoy según el servidor
+        const today = this.$('#booking_date').attr('min') || '';
+        const dates = [];
+        for (let offset = -PREFETCH_DAYS; offset <= PREFETCH_DAYS; offset++) {
+            const date = this._addDays(this.selectedDate, offset);
+            const entry = this.slotsCache.get(this._cacheKey(fieldId, date));
+            if (offset !== 0 && date >= today && !this._getCachedSlots(fieldId, date) && !(entry && entry.promise)) {
+                dates.push(date);
+            }
+        }
+        if (!dates.length) {
+            return;
+        }
+        const dateFrom = dates[0];
+        const days = Math.round((new Date(dates[dates.length - 1]) - new Date(dateFrom)) / 86400000) + 1;
+        const promise = this.rpc('/bookings/available-slots/batch', {
+            field_ids: [fieldId],
+            date_from: dateFrom,
+            days: days,
+        }, { silent: true }).then((result) => {
+            const field = !result.error && result.fields[fieldId];
+            dates.forEach((date) => {
+                if (field && field.slots[date]) {
+                    this._setCachedSlots(fieldId, date, field.slots[date]);
+                } else {
+                    this.slotsCache.delete(this._cacheKey(fieldId, date));
+                }
+            });
+        }, () => {
+            dates.forEach((date) => this.slotsCache.delete(this._cacheKey(fieldId, date)));
+        });
+        dates.forEach((date) => this.slotsCache.set(this._cacheKey(fieldId, date), { promise: promise }));
+    },
+
+    _cacheKey: function (fieldId, date) {
+        return fieldId + '/' + date;
+    },
+
+    _getCachedSlots: function (fieldId, date) {
+        const entry = this.slotsCache.get(this._cacheKey(fieldId, date));
+        if (entry && entry.slots && Date.now() - entry.fetchedAt < SLOTS_CACHE_TTL) {
+            return entry.slots;
+        }
+        return null;
+    },
+
+    _setCachedSlots: function (fieldId, date, slots) {
+        this.slotsCache.set(this._cacheKey(fieldId, date), { slots: slots, fetchedAt: Date.now() });
+    },
+
+    _updateCachedSlot: function (fieldId, date, startTime, endTime, available) {
+        const entry = this.slotsCache.get(this._cacheKey(fieldId, date));
+        const slot = entry && entry.slots && entry.slots.find(
+            (s) => s.start_time === startTime && s.end_time === endTime);
+        if (slot) {
+            slot.available = available;
+        }
+    },
+
+    //--------------------------------------------------------------------------
+    // Renderizado
+    //--------------------------------------------------------------------------
+
+    /**
+     * Renderizar los slots disponibles
+     *
+     * Si la grilla de horarios es la misma que la mostrada (misma cancha u
+     * otra fecha con igual horario), solo se actualizan los botones que
+     * cambian en lugar de reconstruir la lista.
+     */
+    _renderSlots: function (slots) {
+        const grid = (slots || []).map((slot) => this._slotKey(slot)).join(',');
+        if (grid && grid === this.renderedGrid) {
+            slots.forEach((slot) => {
+                const $btn = this.slotButtons.get(this._slotKey(slot));
+                $btn.attr('data-price', slot.price || 0).data('price', slot.price || 0);
+                if ($btn.hasClass('time-slot') !== slot.available) {
+                    this._setSlotAvailable($btn, slot.available);
+                }
+            });
+            return;
+        }
 
-            var total = this.selectedField.price * this.selectedSlot.duration;
+        const $container = this.$('#available_slots');
+        $container.empty();
+        this.slotButtons = new Map();
+        this.renderedGrid = grid;
 
-            $('#summary_field').text(this.selectedField.name);
-            $('#summary_date').text(this._formatDate(this.selectedDate));
-            $('#summary_time').text(
-                this._formatTime(this.selectedSlot.start) + ' - ' + 
-                this._formatTime(this.selectedSlot.end)
+        if (!grid) {
+            $container.append(
+                '<div class="col-12">' +
+                '<div class="alert alert-warning">No hay horarios disponibles para esta fecha.</div>' +
+                '</div>'
             );
-            $('#summary_duration').text(this.selectedSlot.duration.toFixed(1) + ' horas');
-            $('#summary_price_hour').text('S/. ' + this.selectedField.price.toFixed(2));
-            $('#summary_total').text('S/. ' + total.toFixed(2));
-
-            $('#booking_summary').show();
-        },
-
-        /**
-         * Formatear hora de decimal a HH:MM
-         */
-        _formatTime: function (timeDecimal) {
-            var hours = Math.floor(timeDecimal);
-            var minutes = Math.round((timeDecimal - hours) * 60);
-            return ('0' + hours).slice(-2) + ':' + ('0' + minutes).slice(-2);
-        },
-
-        /**
-         * Formatear fecha
-         */
-        _formatDate: function (dateStr) {
-            var date = new Date(dateStr + 'T00:00:00');
-            var options = { year: 'numeric', month: 'long', day: 'numeric', weekday: 'long' };
-            return date.toLocaleDateString('es-ES', options);
-        }
-    });
-
-    return publicWidget.registry.BookingCalendar;
-});
\ No newline at end of file
+            return;
+        }
+
+        const fragment = document.createDocumentFragment();
+        slots.forEach((slot) => {
+            const duration = slot.end_time - slot.start_time;
+            const $col = $('<div class="col-md-3 col-sm-4 col-6 mb-2"/>');
+            const $btn = $('<button type="button" class="btn btn-block"/>')
+                .attr({
+                    'data-start': slot.start_time,
+                    'data-end': slot.end_time,
+                    'data-price': slot.price || 0,
+                })
+                .html('<i class="fa fa-clock-o"></i><br/>' +
+                    this._formatTime(slot.start_time) + ' - ' + this._formatTime(slot.end_time) + '<br/>' +
+                    '<small>(' + duration.toFixed(1) + ' hrs)</small>');
+            const $waitlist = $('<a href="#" class="slot-waitlist small d-block text-center">' +
+                'Avisarme si se libera</a>');
+            $col.append($btn, $waitlist);
+            this._setSlotAvailable($btn, slot.available);
+            this.slotButtons.set(this._slotKey(slot), $btn);
+            fragment.appendChild($col[0]);
+        });
+        $container[0].appendChild(fragment);
+    },
+
+    _clearSlots: function () {
+        this._loadAvailableSlotsDebounced.cancel();
+        this.$('#loading_slots').hide();
+        this.$('#available_slots').empty();
+        this.slotButtons = new Map();
+        this.renderedGrid = null;
+        this._clearSelection();
+    },
+
+    _setSlotAvailable: function ($btn, available) {
+        // La lista de espera solo se ofrece en los horarios ocupados
+        $btn.siblings('.slot-waitlist').toggleClass('d-none', available);
+        if (available) {
+            $btn.removeClass('btn-secondary disabled btn-success').addClass('btn-outline-success time-slot')
+                .prop('disabled', false);
+        } else {
+            $btn.removeClass('btn-outline-success btn-success time-slot').addClass('btn-secondary disabled')
+                .prop('disabled', true);
+        }
+    },
+
+    _slotKey: function (slot) {
+        return slot.start_time + '-' + slot.end_time;
+    },
+
+    _isSelected: function (slot) {
+        return Boolean(this.selectedSlot && this.selectedSlot.start === slot.start_time &&
+            this.selectedSlot.end === slot.end_time);
+    },
+
+    /**
+     * Suscribirse al canal de la cancha y fecha mostradas
+     */
+    _watchAvailability: function () {
+        const channel = 'sports_booking.availability/' + this.selectedField.id + '/' + this.selectedDate;
+        if (channel === this.availabilityChannel) {
+            return;
+        }
+        if (this.availabilityChannel) {
+            this.busService.deleteChannel(this.availabilityChannel);
+        }
+        this.availabilityChannel = channel;
+        this.busService.addChannel(channel);
+    },
+
+    //--------------------------------------------------------------------------
+    // Selección y resumen
+    //--------------------------------------------------------------------------
+
+    /**
+     * Marcar el slot retenido como seleccionado
+     */
+    _selectSlot: function ($btn, startTime, endTime, price, expiresIn) {
+        this.holdExpiresAt = Date.now() + expiresIn * 1000;
+
+        // Remover selección anterior y marcar la nueva
+        this.$('.time-slot').removeClass('btn-success').addClass('btn-outline-success');
+        $btn.removeClass('btn-outline-success').addClass('btn-success');
+
+        // Guardar selección
+        this.selectedSlot = {
+            start: startTime,
+            end: endTime,
+            duration: endTime - startTime,
+            price: price,
+        };
+
+        // Actualizar campos hidden
+        this.$('#start_time').val(startTime);
+        this.$('#end_time').val(endTime);
+
+        // Mostrar información del slot seleccionado
+        const slotInfo = 'Horario: ' + this._formatTime(startTime) + ' - ' + this._formatTime(endTime) + '<br/>' +
+            'Duración: ' + this.selectedSlot.duration.toFixed(1) + ' horas<br/>' +
+            '<small class="text-muted">Reservado para ti durante ' +
+            Math.round(expiresIn / 60) + ' minutos</small>';
+        this.$('#slot_details').html(slotInfo);
+        this.$('#selected_slot_info').show();
+
+        // Actualizar resumen y habilitar botón
+        this._updateSummary();
+        this.$('#submit_button').prop('disabled', false);
+    },
+
+    _clearSelection: function () {
+        this.selectedSlot = null;
+        this.holdExpiresAt = 0;
+        this.$('.time-slot').removeClass('btn-success').addClass('btn-outline-success');
+        this.$('#start_time').val('');
+        this.$('#end_time').val('');
+        this.$('#selected_slot_info').hide();
+        this.$('#submit_button').prop('disabled', true);
+        this._updateSummary();
+    },
+
+    /**
+     * Actualizar el resumen de la reserva
+     */
+    _updateSummary: function () {
+        if (!this.selectedField || !this.selectedDate || !this.selectedSlot) {
+            this.$('#booking_summary').hide();
+            return;
+        }
+
+        // El precio del slot ya incluye tarifas nocturnas, de fin de semana y de temporada
+        const total = this.selectedSlot.price || this.selectedField.price * this.selectedSlot.duration;
+
+        this.$('#summary_field').text(this.selectedField.name);
+        this.$('#summary_date').text(this._formatDate(this.selectedDate));
+        this.$('#summary_time').text(
+            this._formatTime(this.selectedSlot.start) + ' - ' +
+            this._formatTime(this.selectedSlot.end)
+        );
+        this.$('#summary_duration').text(this.selectedSlot.duration.toFixed(1) + ' horas');
+        this.$('#summary_price_hour').text('S/. ' + this.selectedField.price.toFixed(2));
+        this.$('#summary_total').text('S/. ' + total.toFixed(2));
+
+        this.$('#booking_summary').show();
+    },
+
+    //--------------------------------------------------------------------------
+    // Utilidades
+    //--------------------------------------------------------------------------
+
+    /**
+     * Formatear hora de decimal a HH:MM
+     */
+    _formatTime: function (timeDecimal) {
+        const hours = Math.floor(timeDecimal);
+        const minutes = Math.round((timeDecimal - hours) * 60);
+        return ('0' + hours).slice(-2) + ':' + ('0' + minutes).slice(-2);
+    },
+
+    /**
+     * Formatear fecha
+     */
+    _formatDate: function (dateStr) {
+        const date = new Date(dateStr + 'T00:00:00');
+        const options = { year: 'numeric', month: 'long', day: 'numeric', weekday: 'long' };
+        return date.toLocaleDateString('es-ES', options);
+    },
+
+    /**
+     * Sumar días a una fecha "YYYY-MM-DD"
+     */
+    _addDays: function (dateStr, days) {
+        const date = new Date(dateStr + 'T00:00:00Z');
+        date.setUTCDate(date.getUTCDate() + days);
+        return date.toISOString().slice(0, 10);
+    },
+});
+
+export default publicWidget.registry.BookingCalendar;
@@ -0,0 +1,11 @@
+from . import test_availability
+from . import test_booking_archive
+from . import test_booking_create
+from . import test_booking_export
+from . import test_booking_hold
+from . import test_booking_import
+from . import test_booking_waitlist
+from . import test_index_benchmark
+from . import test_next_slots
+from . import test_performance
+from . import test_portal_keyset
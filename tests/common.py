@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase
+from odoo.tests.common import new_test_user
+
+
+class SportsBookingCommon(TransactionCase):
+    """Dos canchas de fútbol 5 abiertas de 08:00 a 22:00, un cliente y un usuario portal
+
+    ``cls.monday`` es el próximo lunes, así las pruebas no dependen del día
+    en que se ejecutan.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.field, cls.field_2 = cls.env['sports.field'].create([{
+            'name': 'Cancha Prueba %s' % index,
+            'code': 'TEST-%s' % index,
+            'sport_type': 'futbol_5',
+            'price_per_hour': 40.0,
+            'price_night': 60.0,
+            'opening_time': 8.0,
+            'closing_time': 22.0,
+            'time_slot_duration': 1.0,
+        } for index in range(2)])
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Prueba', 'email': 'cliente@example.com'})
+        cls.portal_user = new_test_user(
+            cls.env, login='sports_test_portal', groups='sports_booking.group_sports_booking_portal',
+            name='Usuario Portal Prueba',
+        )
+        cls.today = fields.Date.today()
+        cls.monday = cls.today + timedelta(days=7 - cls.today.weekday())
+
+    @classmethod
+    def _book(cls, field, booking_date, start_time, end_time, **vals):
+        return cls.env['sports.booking'].create(dict({
+            'partner_id': cls.partner.id,
+            'field_id': field.id,
+            'booking_date': booking_date,
+            'start_time': start_time,
+            'end_time': end_time,
+            'state': 'confirmed',
+        }, **vals))
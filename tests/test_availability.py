@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestAvailability(SportsBookingCommon):
+
+    def _slots_by_start(self, availability, field, day):
+        return {slot['start_time']: slot for slot in availability[field.id][fields.Date.to_string(day)]}
+
+    def test_busy_slots_per_field_and_day(self):
+        self._book(self.field, self.monday, 10.0, 12.0)
+        tuesday = self.monday + timedelta(days=1)
+        fields_both = self.field | self.field_2
+        availability = fields_both._get_availability(self.monday, tuesday)
+
+        slots = self._slots_by_start(availability, self.field, self.monday)
+        self.assertEqual(len(slots), 14, "De 08:00 a 22:00 en bloques de una hora")
+        self.assertEqual([start for start, slot in sorted(slots.items()) if not slot['available']], [10.0, 11.0])
+        # La reserva no afecta a la otra cancha ni al día siguiente
+        self.assertTrue(all(slot['available'] for slot in self._slots_by_start(
+            availability, self.field_2, self.monday).values()))
+        self.assertTrue(all(slot['available'] for slot in self._slots_by_start(
+            availability, self.field, tuesday).values()))
+
+    def test_cancelled_booking_frees_slots(self):
+        booking = self._book(self.field, self.monday, 10.0, 11.0)
+        booking.action_cancel()
+        slots = self._slots_by_start(self.field._get_availability(self.monday, self.monday), self.field, self.monday)
+        self.assertTrue(slots[10.0]['available'])
+
+    def test_closed_days_and_exceptions(self):
+        self.field.available_sunday = False
+        sunday = self.monday + timedelta(days=6)
+        self.env['sports.field.schedule.exception'].create([{
+            'name': 'Mantenimiento',
+            'field_id': self.field.id,
+            'date': self.monday,
+            'exception_type': 'closed',
+        }, {
+            'name': 'Horario reducido',
+            'field_id': self.field.id,
+            'date': self.monday + timedelta(days=1),
+            'exception_type': 'special_hours',
+            'opening_time': 10.0,
+            'closing_time': 12.0,
+        }])
+        availability = self.field._get_availability(self.monday, sunday)
+        days = availability[self.field.id]
+        self.assertEqual(days[fields.Date.to_string(self.monday)], [])
+        self.assertEqual(days[fields.Date.to_string(sunday)], [])
+        self.assertEqual(
+            [slot['start_time'] for slot in days[fields.Date.to_string(self.monday + timedelta(days=1))]],
+            [10.0, 11.0],
+        )
+
+    def test_price_split_across_pricing_rules(self):
+        # 16:00-17:00 a 100 por regla; desde las 18:00 la tarifa nocturna de 60
+        self.env['sports.field.pricing.rule'].create({
+            'field_id': self.field.id,
+            'name': 'Hora pico',
+            'price_per_hour': 100.0,
+            'hour_from': 16.0,
+            'hour_to': 17.0,
+        })
+        slots = self._slots_by_start(self.field._get_availability(self.monday, self.monday), self.field, self.monday)
+        self.assertEqual(slots[15.0]['price'], 40.0)
+        self.assertEqual(slots[16.0]['price'], 100.0)
+        self.assertEqual(slots[18.0]['price'], 60.0)
+
+        # 16:30-18:30: media hora a 100, una hora a 40 y media hora a 60
+        booking = self._book(self.field, self.monday, 16.5, 18.5)
+        self.assertAlmostEqual(booking.total_price, 50.0 + 40.0 + 30.0)
+
+    def test_cached_availability_follows_bookings(self):
+        cached = self.field._get_availability_cached((self.field.id,), self.monday, self.monday)
+        self.assertTrue(self._slots_by_start(cached, self.field, self.monday)[9.0]['available'])
+        self._book(self.field, self.monday, 9.0, 10.0)
+        cached = self.field._get_availability_cached((self.field.id,), self.monday, self.monday)
+        self.assertFalse(self._slots_by_start(cached, self.field, self.monday)[9.0]['available'])
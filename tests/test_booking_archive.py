@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from odoo.tests import tagged
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBookingArchive(SportsBookingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ir.config_parameter'].sudo().set_param('sports_booking.archive_after_days', 30)
+        cls.old_day = cls.today - timedelta(days=400)
+        cls.old = cls._book(cls.field, cls.old_day, 10.0, 11.5, notes='Cumpleaños')
+        cls.old.action_start()
+        cls.old.action_complete()
+        cls.old_cancelled = cls._book(cls.field, cls.old_day, 12.0, 13.0, state='cancelled')
+        cls.recent = cls._book(cls.field, cls.today - timedelta(days=5), 10.0, 11.0, state='completed')
+        cls.old_pending = cls._book(cls.field_2, cls.old_day, 10.0, 11.0, state='pending')
+        # Mensajes y valores de seguimiento se escriben antes del commit
+        cls.env.flush_all()
+        cls.env.cr.precommit.run()
+
+    def test_archive_moves_final_bookings(self):
+        attachment = self.env['ir.attachment'].create({
+            'name': 'comprobante.txt', 'raw': b'ok', 'res_model': 'sports.booking', 'res_id': self.old.id,
+        })
+        values = {fname: self.old[fname] for fname in ['name', 'partner_id', 'field_id', 'booking_date',
+                                                        'start_time', 'end_time', 'total_price', 'notes']}
+        old_id = self.old.id
+
+        self.env['sports.booking.archive']._cron_archive()
+
+        self.assertFalse(self.old.exists())
+        self.assertFalse(self.old_cancelled.exists())
+        self.assertTrue(self.recent.exists(), "Dentro del horizonte: no se archiva")
+        self.assertTrue(self.old_pending.exists(), "Solo se archivan los estados finales")
+
+        archived = self.env['sports.booking.archive'].search([('original_id', '=', old_id)])
+        self.assertEqual(len(archived), 1)
+        self.assertEqual({fname: archived[fname] for fname in values}, values)
+        self.assertEqual(archived.state, 'completed')
+        self.assertIn('Reserva completada', archived.history)
+        self.assertIn('state: ', archived.history, "Los cambios de campos se resumen en el historial")
+        self.assertEqual((attachment.res_model, attachment.res_id), ('sports.booking.archive', archived.id))
+        self.assertFalse(self.env['mail.message'].search([('model', '=', 'sports.booking'), ('res_id', '=', old_id)]))
+
+    def test_report_keeps_archived_bookings(self):
+        Report = self.env['sports.booking.report']
+
+        def hours_sold():
+            Report._mark_dirty([(self.field.id, self.old_day)])
+            Report._cron_refresh()
+            return sum(Report.search([('field_id', '=', self.field.id), ('date', '=', self.old_day)])
+                       .mapped('hours_sold'))
+
+        self.assertEqual(hours_sold(), 1.5)
+        self.env['sports.booking.archive']._cron_archive()
+        self.assertEqual(hours_sold(), 1.5, "El reporte sigue contando las reservas archivadas")
@@ -0,0 +1,57 @@
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBookingBatchCreate(SportsBookingCommon):
+
+    def _vals(self, field, start_time, end_time, **vals):
+        return dict({
+            'partner_id': self.partner.id,
+            'field_id': field.id,
+            'booking_date': self.monday,
+            'start_time': start_time,
+            'end_time': end_time,
+            'state': 'confirmed',
+        }, **vals)
+
+    def test_batch_create(self):
+        bookings = self.env['sports.booking'].create([
+            self._vals(self.field, 8.0, 9.0),
+            self._vals(self.field, 9.0, 10.0),
+            self._vals(self.field_2, 8.0, 9.0),
+        ])
+        self.assertEqual(len(bookings), 3)
+        self.assertEqual(len(set(bookings.mapped('name'))), 3, "Cada reserva recibe su propio número")
+        self.assertEqual(bookings.mapped('total_price'), [40.0, 40.0, 40.0])
+
+    def test_batch_conflict_within_batch(self):
+        Booking = self.env['sports.booking']
+        with self.assertRaises(ValidationError):
+            Booking.create([
+                self._vals(self.field, 8.0, 10.0),
+                self._vals(self.field, 9.0, 11.0),
+            ])
+        self.assertFalse(Booking.search([('field_id', '=', self.field.id)]))
+
+    def test_batch_conflict_with_existing(self):
+        self._book(self.field, self.monday, 12.0, 14.0)
+        with self.assertRaises(ValidationError):
+            self.env['sports.booking'].create([
+                self._vals(self.field_2, 12.0, 13.0),
+                self._vals(self.field, 13.0, 14.0),
+            ])
+
+    def test_batch_outside_opening_hours(self):
+        with self.assertRaises(ValidationError):
+            self.env['sports.booking'].create([self._vals(self.field, 21.0, 23.0)])
+
+    def test_draft_and_cancelled_skip_overlap(self):
+        self._book(self.field, self.monday, 12.0, 14.0)
+        bookings = self.env['sports.booking'].create([
+            self._vals(self.field, 12.0, 13.0, state='draft'),
+            self._vals(self.field, 13.0, 14.0, state='cancelled'),
+        ])
+        self.assertEqual(len(bookings), 2)
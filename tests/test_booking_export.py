@@ -0,0 +1,77 @@
+import csv
+import io
+import zipfile
+from datetime import timedelta
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from odoo import fields
+from odoo.tests import HttpCase, tagged
+from odoo.tests.common import new_test_user
+
+from odoo.addons.sports_booking.controllers.export import SportsBookingExportController
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBookingExport(SportsBookingCommon, HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff_user = new_test_user(
+            cls.env, login='sports_test_staff', groups='sports_booking.group_sports_booking_staff',
+            name='Personal Prueba',
+        )
+        tuesday = cls.monday + timedelta(days=1)
+        cls.late = cls._book(cls.field, tuesday, 9.0, 10.5)
+        cls.early = cls._book(cls.field_2, cls.monday, 18.0, 19.0)
+        cls.other_field = cls._book(cls.field_2, tuesday, 8.0, 9.0)
+        cls.cancelled = cls._book(cls.field, cls.monday, 8.0, 9.0)
+        cls.cancelled.action_cancel()
+        # Fuera del rango exportado
+        cls._book(cls.field, cls.monday + timedelta(days=7), 8.0, 9.0)
+
+    def _export(self, **params):
+        params = dict({
+            'date_from': fields.Date.to_string(self.monday),
+            'date_to': fields.Date.to_string(self.monday + timedelta(days=1)),
+        }, **params)
+        return self.url_open('/sports_booking/export?%s' % urlencode(params))
+
+    def _csv_rows(self, response):
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(response.content.decode('utf-8-sig'))))
+        self.assertEqual(rows[0], SportsBookingExportController._export_headers)
+        return rows[1:]
+
+    def test_csv_filters_and_order(self):
+        self.authenticate(self.staff_user.login, self.staff_user.login)
+        rows = self._csv_rows(self._export(state='active', format='csv'))
+        self.assertEqual([row[0] for row in rows], [self.early.name, self.other_field.name, self.late.name])
+        self.assertEqual(rows[2][3], self.field.name)
+        self.assertEqual(rows[2][5:8], [fields.Date.to_string(self.late.booking_date), '09:00', '10:30'])
+        self.assertEqual(float(rows[2][9]), self.late.total_price)
+
+        rows = self._csv_rows(self._export(state='cancelled', format='csv',
+                                           field_ids=str(self.field.id)))
+        self.assertEqual([row[0] for row in rows], [self.cancelled.name])
+
+    def test_csv_streams_in_chunks(self):
+        self.authenticate(self.staff_user.login, self.staff_user.login)
+        with patch.object(SportsBookingExportController, '_export_chunk_size', 1):
+            rows = self._csv_rows(self._export(format='csv'))
+        self.assertEqual(len(rows), 4, "Todas las filas, sin repetir las de los bordes de bloque")
+
+    def test_xlsx(self):
+        self.authenticate(self.staff_user.login, self.staff_user.login)
+        response = self._export(format='xlsx')
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(response.content)) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row '), 5, "Encabezado y cuatro reservas")
+
+    def test_portal_user_cannot_export(self):
+        self.authenticate(self.portal_user.login, self.portal_user.login)
+        self.assertEqual(self._export(format='csv').status_code, 403)
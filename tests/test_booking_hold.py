@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import new_test_user
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBookingHold(SportsBookingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.other_user = new_test_user(
+            cls.env, login='sports_test_portal_2', groups='sports_booking.group_sports_booking_portal',
+            name='Otro Usuario Portal',
+        )
+
+    def _hold_model(self, user):
+        # Como el controlador: con sudo, pero sin perder el usuario
+        return self.env['sports.booking.hold'].with_user(user).sudo()
+
+    def _slot(self, user, start_time):
+        slots = self.field.with_user(user).sudo().get_available_slots(self.monday)
+        return next(slot for slot in slots if slot['start_time'] == start_time)
+
+    def test_hold_blocks_other_customers(self):
+        expires_at, error = self._hold_model(self.portal_user)._acquire(self.field, self.monday, 10.0, 11.0)
+        self.assertFalse(error)
+        self.assertGreater(expires_at, fields.Datetime.now())
+
+        _expires_at, error = self._hold_model(self.other_user)._acquire(self.field, self.monday, 10.5, 11.5)
+        self.assertTrue(error, "El horario retenido no puede retenerlo otro cliente")
+        self.assertFalse(self._slot(self.other_user, 10.0)['available'])
+        # Quien retiene sigue viendo el horario libre para completar la reserva
+        self.assertTrue(self._slot(self.portal_user, 10.0)['available'])
+
+    def test_new_hold_replaces_previous(self):
+        Hold = self._hold_model(self.portal_user)
+        Hold._acquire(self.field, self.monday, 10.0, 11.0)
+        Hold._acquire(self.field, self.monday, 12.0, 13.0)
+        holds = Hold.search([('user_id', '=', self.portal_user.id)])
+        self.assertEqual(holds.mapped('start_time'), [12.0])
+
+    def test_expired_hold_is_released(self):
+        Hold = self._hold_model(self.portal_user)
+        Hold._acquire(self.field, self.monday, 10.0, 11.0)
+        hold = Hold.search([('user_id', '=', self.portal_user.id)])
+        hold.expires_at = fields.Datetime.now() - timedelta(minutes=1)
+
+        self.assertTrue(self._slot(self.other_user, 10.0)['available'])
+        _expires_at, error = self._hold_model(self.other_user)._acquire(self.field, self.monday, 10.0, 11.0)
+        self.assertFalse(error, "Una retención vencida no bloquea el horario")
+        self.assertFalse(hold.exists(), "La retención vencida se borra al retener el mismo día")
+
+    def test_cron_cleanup(self):
+        Hold = self._hold_model(self.portal_user)
+        Hold._acquire(self.field, self.monday, 10.0, 11.0)
+        self._hold_model(self.other_user)._acquire(self.field_2, self.monday, 10.0, 11.0)
+        expired = Hold.search([('user_id', '=', self.portal_user.id)])
+        expired.expires_at = fields.Datetime.now() - timedelta(minutes=1)
+
+        Hold._cron_cleanup()
+        self.assertFalse(expired.exists())
+        self.assertEqual(Hold.search([]).user_id, self.other_user)
+
+    def test_booking_releases_only_covered_holds(self):
+        Hold = self.env['sports.booking.hold']
+        expires_at = fields.Datetime.now() + timedelta(minutes=5)
+        Hold._insert_hold(self.field.id, self.monday, 10.0, 11.0, self.env.uid, expires_at)
+        Hold._insert_hold(self.field_2.id, self.monday, 10.0, 11.0, self.env.uid, expires_at)
+        Hold._insert_hold(self.field.id, self.monday, 14.0, 15.0, self.env.uid, expires_at)
+
+        self._book(self.field, self.monday, 10.0, 11.0)
+        remaining = Hold.search([('user_id', '=', self.env.uid)])
+        self.assertEqual(
+            sorted((hold.field_id.id, hold.start_time) for hold in remaining),
+            sorted([(self.field_2.id, 10.0), (self.field.id, 14.0)]),
+        )
@@ -0,0 +1,83 @@
+import base64
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBookingImport(SportsBookingCommon):
+
+    def _wizard(self, import_type, lines):
+        return self.env['sports.booking.import'].create({
+            'import_type': import_type,
+            'file': base64.b64encode('\n'.join(lines).encode()),
+            'filename': 'import.csv',
+        })
+
+    def test_import_bookings(self):
+        self._book(self.field, self.monday, 18.0, 20.0, name='EXISTENTE')
+        day = fields.Date.to_string(self.monday)
+        wizard = self._wizard('bookings', [
+            'field_code,partner,booking_date,start_time,end_time,state,players_count',
+            'TEST-0,nuevo.cliente@example.com,%s,8,10,,10' % day,         # 2: válida, cliente nuevo
+            'TEST-0,cliente@example.com,%s,9,11,confirmed,' % day,        # 3: se solapa con la 2
+            'TEST-1,Cliente Prueba,%s,9,11,pending,' % day,               # 4: válida, otra cancha
+            'NO-EXISTE,cliente@example.com,%s,9,10,,' % day,              # 5: cancha desconocida
+            'TEST-1,cliente@example.com,%s,21,23,,' % day,                # 6: después del cierre
+            'TEST-0,cliente@example.com,%s,19,20,,' % day,                # 7: choca con EXISTENTE
+            'TEST-0,cliente@example.com,no-es-fecha,12,13,,',             # 8: fecha inválida
+            'TEST-0,cliente@example.com,%s,19,20,cancelled,' % day,       # 9: cancelada, no ocupa
+        ])
+        wizard.action_import()
+
+        self.assertEqual(wizard.state, 'done')
+        self.assertEqual(wizard.line_count, 8)
+        self.assertEqual(wizard.imported_count, 3)
+        self.assertEqual(wizard.error_count, 5)
+        for line in (3, 5, 6, 7, 8):
+            self.assertIn('Línea %s:' % line, wizard.error_report)
+        self.assertIn('EXISTENTE', wizard.error_report)
+
+        imported = self.env['sports.booking'].search([
+            ('booking_date', '=', self.monday), ('name', '!=', 'EXISTENTE'),
+        ], order='field_id, start_time')
+        self.assertEqual(
+            [(booking.field_id, booking.start_time, booking.state) for booking in imported],
+            [(self.field, 8.0, 'confirmed'), (self.field, 19.0, 'cancelled'), (self.field_2, 9.0, 'pending')],
+        )
+        new_partner = imported[0].partner_id
+        self.assertEqual(new_partner.email, 'nuevo.cliente@example.com')
+        self.assertEqual(imported[0].players_count, 10)
+        # Los clientes existentes se reconocen por email o por nombre
+        self.assertEqual(imported[1:].partner_id, self.partner)
+
+    def test_validate_does_not_import(self):
+        wizard = self._wizard('bookings', [
+            'field_code,partner,booking_date,start_time,end_time',
+            'TEST-0,cliente@example.com,%s,8,9' % fields.Date.to_string(self.monday),
+        ])
+        wizard.action_validate()
+        self.assertEqual(wizard.state, 'validated')
+        self.assertEqual(wizard.error_count, 0)
+        self.assertFalse(self.env['sports.booking'].search([('field_id', '=', self.field.id)]))
+
+    def test_import_fields(self):
+        wizard = self._wizard('fields', [
+            'name,code,sport_type,price_per_hour,opening_time,closing_time,available_sunday',
+            'Cancha Nueva,NUEVA-1,tenis,30,7,21,no',      # 2: válida
+            'Cancha Repetida,NUEVA-1,tenis,30,7,21,',     # 3: código repetido en el archivo
+            'Cancha Existente,TEST-0,tenis,30,7,21,',     # 4: código ya existente
+            'Cancha Rara,NUEVA-2,curling,30,7,21,',       # 5: deporte desconocido
+            'Cancha Nocturna,NUEVA-3,padel,30,22,8,',     # 6: cierra antes de abrir
+        ])
+        wizard.action_import()
+
+        self.assertEqual(wizard.imported_count, 1)
+        self.assertEqual(wizard.error_count, 4)
+        field = self.env['sports.field'].search([('code', '=', 'NUEVA-1')])
+        self.assertEqual(field.name, 'Cancha Nueva')
+        self.assertEqual((field.opening_time, field.closing_time), (7.0, 21.0))
+        self.assertFalse(field.available_sunday)
+        self.assertTrue(field.available_monday, "Las columnas ausentes toman el valor por defecto")
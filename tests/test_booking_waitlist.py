@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBookingWaitlist(SportsBookingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.first_partner = cls.portal_user.partner_id
+        cls.second_partner = cls.env['res.partner'].create({'name': 'Segundo en Espera', 'email': 'segundo@example.com'})
+        cls.booking = cls._book(cls.field, cls.monday, 10.0, 11.0)
+
+    def _join(self, partner, start_time=10.0, end_time=11.0, user=None):
+        entry, error = self.env['sports.booking.waitlist']._join(
+            partner, self.field, self.monday, start_time, end_time, user=user)
+        self.assertFalse(error)
+        return entry
+
+    def _run_precommit(self):
+        # La promoción corre justo antes del commit de la cancelación
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+
+    def test_join_free_slot(self):
+        _entry, error = self.env['sports.booking.waitlist']._join(
+            self.second_partner, self.field, self.monday, 12.0, 13.0)
+        self.assertTrue(error, "Un horario libre se reserva directamente")
+
+    def test_cancellation_promotes_first_in_line(self):
+        first = self._join(self.first_partner, user=self.portal_user)
+        second = self._join(self.second_partner)
+        self.assertEqual(self._join(self.first_partner, user=self.portal_user), first,
+                         "Volver a anotarse no duplica la solicitud")
+
+        self.booking.action_cancel()
+        self._run_precommit()
+        self.assertEqual(first.state, 'offered')
+        self.assertTrue(first.offer_expires_at)
+        self.assertEqual(second.state, 'waiting')
+        # El horario ofrecido queda retenido para el usuario del primero
+        hold = self.env['sports.booking.hold'].search([('user_id', '=', self.portal_user.id)])
+        self.assertEqual((hold.field_id, hold.booking_date, hold.start_time), (self.field, self.monday, 10.0))
+
+    def test_partially_freed_request_keeps_waiting(self):
+        self._book(self.field, self.monday, 11.0, 12.0)
+        entry = self._join(self.second_partner, 10.0, 12.0)
+        self.booking.action_cancel()
+        self._run_precommit()
+        self.assertEqual(entry.state, 'waiting', "La hora 11:00 sigue ocupada")
+
+    def test_expired_offer_moves_to_next(self):
+        first = self._join(self.first_partner)
+        second = self._join(self.second_partner)
+        self.booking.action_cancel()
+        self._run_precommit()
+        self.assertEqual(first.state, 'offered')
+
+        first.offer_expires_at = fields.Datetime.now() - timedelta(minutes=1)
+        self.env['sports.booking.waitlist']._cron_process()
+        self.assertEqual(first.state, 'expired')
+        self.assertEqual(second.state, 'offered')
+        self.assertTrue(second.notified)
+
+    def test_withdrawn_offer_moves_to_next(self):
+        first = self._join(self.first_partner, user=self.portal_user)
+        second = self._join(self.second_partner)
+        self.booking.action_cancel()
+        self._run_precommit()
+
+        first.action_cancel()
+        self._run_precommit()
+        self.assertEqual(first.state, 'cancelled')
+        self.assertFalse(self.env['sports.booking.hold'].search([('user_id', '=', self.portal_user.id)]))
+        self.assertEqual(second.state, 'offered')
+
+    def test_booking_closes_request(self):
+        entry = self._join(self.second_partner)
+        self.booking.action_cancel()
+        self._run_precommit()
+        self._book(self.field, self.monday, 10.0, 11.0, partner_id=self.second_partner.id)
+        self.assertEqual(entry.state, 'done')
@@ -0,0 +1,196 @@
+import logging
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.sports_booking.models.booking import BOOKING_ACTIVE_STATES, BOOKING_INDEXES
+from odoo.addons.sports_booking.models.sports_field import NIGHT_START
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install', '-standard', 'sports_booking_index_benchmark')
+class TestBookingIndexBenchmark(TransactionCase):
+    """Planes y tiempos de las consultas frecuentes sin y con los índices del módulo
+
+    Genera por SQL un volumen de reservas parecido al de producción dentro de
+    la transacción de la prueba, que se revierte al terminar. Solo se ejecuta
+    con ``--test-tags sports_booking_index_benchmark``; el tamaño se ajusta
+    con los atributos de la clase.
+
+    La medición "antes" elimina los índices btree de ``BOOKING_INDEXES`` en un
+    savepoint; la restricción de exclusión ``no_overlap`` (y su índice GiST)
+    se mantiene siempre.
+    """
+
+    _bookings = 1000000
+    _field_count = 50
+    _partner_count = 2000
+    # Horas reservables por día (06:00 a 22:00) y ocupación de día y de noche
+    _day_start = 6
+    _slots_per_day = 16
+    _day_ratio = 0.35
+    _night_ratio = 0.8
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.sports_fields = cls.env['sports.field'].create([{
+            'name': 'Benchmark %s' % index,
+            'code': 'BENCH-%s' % index,
+            'sport_type': 'futbol_5',
+            'price_per_hour': 50.0,
+            'price_night': 70.0,
+            'opening_time': float(cls._day_start),
+            'closing_time': float(cls._day_start + cls._slots_per_day),
+        } for index in range(cls._field_count)])
+        cls.partners = cls.env['res.partner'].create([
+            {'name': 'Cliente Benchmark %s' % index, 'email': 'bench%s@example.com' % index}
+            for index in range(cls._partner_count)
+        ])
+        cls.env.flush_all()
+        cls.today = fields.Date.today()
+        cls._seed_bookings()
+
+    @classmethod
+    def _seed_bookings(cls):
+        """Inserta reservas sin solapes, con noches más ocupadas y clientes sesgados
+
+        El rango de fechas se calcula para obtener unas ``_bookings`` reservas
+        y termina unos días en el futuro; las pasadas están completadas o
+        canceladas, como tras el cron de estados.
+        """
+        hours = range(cls._day_start, cls._day_start + cls._slots_per_day)
+        per_day = sum(cls._night_ratio if hour >= NIGHT_START else cls._day_ratio for hour in hours)
+        total_days = max(1, int(cls._bookings / (cls._field_count * per_day)))
+        date_from = fields.Date.subtract(cls.today, days=int(total_days * 0.95))
+        cls.env.cr.execute("""
+            INSERT INTO sports_booking
+                (name, partner_id, field_id, sport_type, booking_date, start_time, end_time,
+                 duration, total_price, state, create_uid, write_uid, create_date, write_date)
+            SELECT 'BENCH-' || row_number() OVER (),
+                   (%(partner_ids)s::integer[])[1 + floor(%(partner_count)s * power(who, 3))::integer],
+                   field_id, 'futbol_5', day, hour, hour + 1, 1,
+                   CASE WHEN hour >= %(night)s THEN 70 ELSE 50 END,
+                   CASE WHEN day < %(today)s THEN CASE WHEN r < 0.85 THEN 'completed' ELSE 'cancelled' END
+                        WHEN r < 0.60 THEN 'confirmed'
+                        WHEN r < 0.90 THEN 'pending'
+                        ELSE 'cancelled' END,
+                   %(uid)s, %(uid)s, now() at time zone 'UTC', now() at time zone 'UTC'
+            FROM (
+                SELECT f.field_id, d.day::date AS day, h.hour,
+                       random() AS pick, random() AS r, random() AS who
+                FROM unnest(%(field_ids)s::integer[]) AS f(field_id)
+                CROSS JOIN generate_series(%(date_from)s::date, %(date_to)s::date, interval '1 day') AS d(day)
+                CROSS JOIN generate_series(%(hour_from)s, %(hour_to)s) AS h(hour)
+            ) AS grid
+            WHERE pick < CASE WHEN hour >= %(night)s THEN %(night_ratio)s ELSE %(day_ratio)s END
+        """, {
+            'partner_ids': cls.partners.ids,
+            'partner_count': cls._partner_count,
+            'field_ids': cls.sports_fields.ids,
+            'date_from': date_from,
+            'date_to': fields.Date.add(date_from, days=total_days - 1),
+            'hour_from': hours.start,
+            'hour_to': hours.stop - 1,
+            'night': NIGHT_START,
+            'night_ratio': cls._night_ratio,
+            'day_ratio': cls._day_ratio,
+            'today': cls.today,
+            'uid': cls.env.uid,
+        })
+        _logger.info("Benchmark de índices: %s reservas en %s canchas y %s días",
+                     cls.env.cr.rowcount, cls._field_count, total_days)
+
+    def _get_hot_queries(self):
+        """Equivalentes SQL de los caminos críticos: ``[(nombre, consulta, parámetros, usa índice)]``
+
+        Los conteos sobre muchas filas pueden resolverse mejor recorriendo la
+        tabla, así que solo se registran.
+        """
+        active_states = tuple(BOOKING_ACTIVE_STATES)
+        field_ids = tuple(self.sports_fields.ids)
+        partner_id = self.partners[0].id
+        day = self.today
+        return [
+            ('overlap_check', """
+                SELECT id, name, field_id, booking_date, start_time, end_time FROM sports_booking
+                WHERE field_id IN %s AND booking_date IN %s AND state IN %s
+             """, [field_ids[:3], (day,), active_states], True),
+            ('availability_week', """
+                SELECT field_id, booking_date, array_agg(start_time), array_agg(end_time)
+                FROM sports_booking
+                WHERE field_id IN %s AND booking_date >= %s AND booking_date <= %s AND state IN %s
+                GROUP BY field_id, booking_date
+             """, [field_ids, day, fields.Date.add(day, days=6), active_states], True),
+            ('report_refresh', """
+                SELECT field_id, booking_date, SUM(duration) FROM sports_booking
+                WHERE field_id = %s AND booking_date = %s AND state NOT IN ('cancelled', 'draft')
+                GROUP BY field_id, booking_date
+             """, [field_ids[0], fields.Date.subtract(day, days=30)], True),
+            ('portal_list', """
+                SELECT id FROM sports_booking WHERE partner_id = %s
+                ORDER BY booking_date DESC, start_time DESC, id DESC LIMIT 20
+             """, [partner_id], True),
+            ('state_cron', """
+                SELECT id FROM sports_booking
+                WHERE state = 'confirmed' AND (booking_date < %s OR (booking_date = %s AND start_time <= 12))
+             """, [day, day], True),
+            ('portal_count', """
+                SELECT COUNT(*) FROM sports_booking WHERE partner_id = %s
+             """, [partner_id], False),
+            ('field_count', """
+                SELECT field_id, COUNT(*) FROM sports_booking WHERE field_id IN %s GROUP BY field_id
+             """, [field_ids], False),
+        ]
+
+    def _explain(self, query, params):
+        """Ejecuta ``EXPLAIN ANALYZE``: tiempo e índices usados por el plan"""
+        self.env.cr.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+        [plan] = self.env.cr.fetchone()[0]
+        scans, indexes = [], set()
+        nodes = [plan['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if 'Index Name' in node:
+                indexes.add(node['Index Name'])
+                scans.append('%s (%s)' % (node['Node Type'], node['Index Name']))
+            elif 'Relation Name' in node:
+                scans.append(node['Node Type'])
+            nodes.extend(node.get('Plans', []))
+        return {'time_ms': plan['Execution Time'], 'scans': scans, 'indexes': indexes}
+
+    def test_index_benchmark(self):
+        queries = self._get_hot_queries()
+        module_indexes = {indexname for indexname, _expressions, _where in BOOKING_INDEXES}
+        results = {name: {} for name, _query, _params, _indexed in queries}
+
+        self.env.cr.execute("SAVEPOINT sports_booking_index_benchmark")
+        try:
+            for indexname in module_indexes:
+                self.env.cr.execute('DROP INDEX IF EXISTS "%s"' % indexname)
+            self.env.cr.execute("ANALYZE sports_booking")
+            for name, query, params, _indexed in queries:
+                results[name]['before'] = self._explain(query, params)
+        finally:
+            self.env.cr.execute("ROLLBACK TO SAVEPOINT sports_booking_index_benchmark")
+        self.env.cr.execute("ANALYZE sports_booking")
+        for name, query, params, _indexed in queries:
+            results[name]['after'] = self._explain(query, params)
+
+        for name, _query, _params, indexed in queries:
+            before, after = results[name]['before'], results[name]['after']
+            _logger.info(
+                "Benchmark %-18s sin índices: %9.2f ms %s | con índices: %9.2f ms %s",
+                name, before['time_ms'], ', '.join(before['scans']),
+                after['time_ms'], ', '.join(after['scans']),
+            )
+            if not indexed:
+                continue
+            with self.subTest(query=name):
+                self.assertTrue(after['indexes'] & (module_indexes | {'sports_booking_no_overlap'}),
+                                "%s no usa ningún índice del módulo" % name)
+                # Comparación relativa en la misma máquina: si sin los índices
+                # se recorría la tabla, con ellos tiene que ser más rápido
+                if not before['indexes']:
+                    self.assertLess(after['time_ms'], before['time_ms'], name)
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestNextSlots(SportsBookingCommon):
+
+    def _find(self, **kwargs):
+        kwargs = dict({'sport_type': 'futbol_5', 'date_from': self.monday}, **kwargs)
+        return [
+            (fields.Date.to_date(slot['date']), slot['field_id'], slot['start_time'])
+            for slot in self.env['sports.field']._find_next_slots(**kwargs)
+        ]
+
+    def test_skips_bookings_and_holds(self):
+        self._book(self.field, self.monday, 8.0, 10.0)
+        self._book(self.field_2, self.monday, 8.0, 9.0)
+        # Retención de otro cliente: también ocupa el horario
+        self.env['sports.booking.hold']._insert_hold(
+            self.field_2.id, self.monday, 9.0, 10.0, self.portal_user.id,
+            fields.Datetime.now() + timedelta(minutes=5))
+        self.assertEqual(self._find(limit=3), [
+            (self.monday, self.field.id, 10.0),
+            (self.monday, self.field_2.id, 10.0),
+            (self.monday, self.field.id, 11.0),
+        ])
+
+    def test_time_from_and_next_day(self):
+        tuesday = self.monday + timedelta(days=1)
+        self.assertEqual(self._find(time_from=20.5, limit=3), [
+            (self.monday, self.field.id, 21.0),
+            (self.monday, self.field_2.id, 21.0),
+            (tuesday, self.field.id, 8.0),
+        ], "Los inicios se alinean a la grilla de la cancha")
+
+    def test_max_price(self):
+        # Dos horas a 40 cuestan 80; desde las 18:00 rige la tarifa nocturna de 60
+        slots = self.env['sports.field']._find_next_slots(
+            'futbol_5', self.monday, time_from=15.0, duration=2.0, max_price=80.0, limit=4)
+        self.assertEqual([(slot['field_id'], slot['start_time']) for slot in slots], [
+            (self.field.id, 15.0), (self.field_2.id, 15.0), (self.field.id, 16.0), (self.field_2.id, 16.0),
+        ])
+        self.assertEqual({slot['price'] for slot in slots}, {80.0})
+
+    def test_closed_field(self):
+        self.env['sports.field.schedule.exception'].create({
+            'name': 'Mantenimiento',
+            'field_id': self.field.id,
+            'date': self.monday,
+            'exception_type': 'closed',
+        })
+        self.assertEqual(self._find(limit=2), [
+            (self.monday, self.field_2.id, 8.0),
+            (self.monday, self.field_2.id, 9.0),
+        ])
@@ -0,0 +1,235 @@
+import json
+import logging
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import HttpCase, TransactionCase, tagged
+from odoo.tests.common import new_test_user, warmup
+
+from odoo.addons.sports_booking.models.booking import BOOKING_ACTIVE_STATES, SKIP_CHATTER_CONTEXT
+from odoo.addons.sports_booking.models.sports_field import NIGHT_START
+
+_logger = logging.getLogger(__name__)
+
+
+class SportsBookingPerformanceCommon:
+    """Conjunto de datos pequeño con distribuciones parecidas a las reales
+
+    Las suites no corren con las pruebas normales (``-standard``), solo con
+    ``--test-tags sports_booking_perf``.
+
+    Las noches se reservan más que el día y pocos clientes concentran la
+    mayoría de las reservas. Los tamaños se pueden ajustar en las subclases
+    para dimensionar un despliegue.
+    """
+
+    _field_count = 5
+    _partner_count = 20
+    _days = 7
+    _day_start = 6
+    _slots_per_day = 16
+    _day_ratio = 0.35
+    _night_ratio = 0.8
+
+    # Repeticiones de cada medición de tiempo; se registra la mediana
+    _iterations = 10
+
+    @classmethod
+    def _create_dataset(cls):
+        rng = random.Random(42)
+        cls.sports_fields = cls.env['sports.field'].create([{
+            'name': 'Cancha Rendimiento %s' % index,
+            'code': 'PERF-%s' % index,
+            'sport_type': 'futbol_5',
+            'price_per_hour': 50.0,
+            'price_night': 70.0,
+            'opening_time': float(cls._day_start),
+            'closing_time': float(cls._day_start + cls._slots_per_day),
+        } for index in range(cls._field_count)])
+        cls.partners = cls.env['res.partner'].create([
+            {'name': 'Cliente Rendimiento %s' % index, 'email': 'perf%s@example.com' % index}
+            for index in range(cls._partner_count)
+        ])
+        cls.portal_user = new_test_user(
+            cls.env, login='sports_perf_portal', groups='sports_booking.group_sports_booking_portal',
+            partner_id=cls.partners[0].id,
+        )
+
+        cls.today = fields.Date.today()
+        cls.first_day = cls.today + timedelta(days=1)
+        vals_list = []
+        for offset in range(cls._days):
+            day = cls.first_day + timedelta(days=offset)
+            for field in cls.sports_fields:
+                for hour in range(cls._day_start, cls._day_start + cls._slots_per_day):
+                    ratio = cls._night_ratio if hour >= NIGHT_START else cls._day_ratio
+                    if rng.random() >= ratio:
+                        continue
+                    vals_list.append({
+                        'partner_id': cls.partners[int(len(cls.partners) * rng.random() ** 3)].id,
+                        'field_id': field.id,
+                        'booking_date': day,
+                        'start_time': float(hour),
+                        'end_time': float(hour + 1),
+                        'state': 'confirmed' if rng.random() < 0.7 else 'pending',
+                    })
+        cls.bookings = cls.env['sports.booking'].with_context(**{SKIP_CHATTER_CONTEXT: True}).create(vals_list)
+        # Primer día sin reservas, para medir la creación
+        cls.free_day = cls.first_day + timedelta(days=cls._days)
+        cls.env.flush_all()
+
+    def _log_timing(self, name, func):
+        """Mide ``func`` varias veces y registra la mediana del tiempo y el pico de memoria
+
+        Los tiempos dependen del hardware: solo se informan. Las regresiones
+        se detectan con los límites de consultas (``assertQueryCount``).
+        """
+        func()  # calentamiento: plantillas, cachés de vistas...
+        timings = []
+        tracemalloc.start()
+        try:
+            for _iteration in range(self._iterations):
+                start = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - start) * 1000)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        timings.sort()
+        _logger.info("Rendimiento %-22s %8.2f ms (máx %8.2f) %10.1f KiB",
+                     name, timings[len(timings) // 2], timings[-1], peak / 1024)
+
+
+@tagged('post_install', '-at_install', '-standard', 'sports_booking_perf')
+class TestBookingPerformance(SportsBookingPerformanceCommon, TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._create_dataset()
+
+    @warmup
+    def test_available_slots(self):
+        field = self.sports_fields[0]
+        self.env.invalidate_all()
+        with self.assertQueryCount(4):
+            field.get_available_slots(self.first_day)
+        self._log_timing('available_slots', lambda: field.get_available_slots(self.first_day))
+
+    @warmup
+    def test_available_slots_after_booking_change(self):
+        field = self.sports_fields[0]
+        field.get_available_slots(self.first_day)
+        # Solo se recalcula el día modificado; la caché del registro no se vacía
+        self.env['sports.field']._bump_availability_version([(field.id, self.first_day)])
+        self.env.invalidate_all()
+        with self.assertQueryCount(6):
+            field.get_available_slots(self.first_day)
+
+    @warmup
+    def test_overlap_check(self):
+        bookings = self.bookings.filtered(lambda b: b.state in BOOKING_ACTIVE_STATES)[:50]
+        self.env.invalidate_all()
+        with self.assertQueryCount(6):
+            bookings._check_booking_overlap()
+
+        def overlap_check():
+            self.env.invalidate_all()
+            bookings._check_booking_overlap()
+        self._log_timing('overlap_check', overlap_check)
+
+    @warmup
+    def test_create(self):
+        Booking = self.env['sports.booking']
+        vals_list = [{
+            'partner_id': self.partners[0].id,
+            'field_id': field.id,
+            'booking_date': self.free_day,
+            'start_time': float(self._day_start),
+            'end_time': float(self._day_start + 1),
+        } for field in self.sports_fields]
+        with self.assertQueryCount(40):
+            Booking.create(vals_list)
+            self.env.flush_all()
+
+    def test_create_time(self):
+        Booking = self.env['sports.booking']
+
+        def create():
+            # Cada repetición se revierte para partir del mismo estado
+            self.env.cr.execute("SAVEPOINT sports_booking_perf_create")
+            try:
+                Booking.create([{
+                    'partner_id': self.partners[0].id,
+                    'field_id': field.id,
+                    'booking_date': self.free_day,
+                    'start_time': float(self._day_start),
+                    'end_time': float(self._day_start + 1),
+                } for field in self.sports_fields])
+                self.env.flush_all()
+            finally:
+                self.env.cr.execute("ROLLBACK TO SAVEPOINT sports_booking_perf_create")
+                self.env.invalidate_all()
+        self._log_timing('create', create)
+
+    @warmup
+    def test_portal_list(self):
+        Booking = self.env['sports.booking'].with_user(self.portal_user)
+
+        def portal_list():
+            self.env.invalidate_all()
+            self.portal_user.partner_id.with_user(self.portal_user).booking_count
+            Booking.search_fetch(
+                [('partner_id', '=', self.portal_user.partner_id.id)],
+                ['name', 'field_id', 'sport_type', 'booking_date', 'start_time', 'end_time',
+                 'duration', 'total_price', 'state'],
+                order='booking_date desc, start_time desc, id desc', limit=21,
+            ).field_id.mapped('display_name')
+
+        with self.assertQueryCount(4):
+            portal_list()
+        self._log_timing('portal_list', portal_list)
+
+
+@tagged('post_install', '-at_install', '-standard', 'sports_booking_perf')
+class TestBookingHttpPerformance(SportsBookingPerformanceCommon, HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._create_dataset()
+
+    def _get(self, url, **kwargs):
+        response = self.url_open(url, **kwargs)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_my_bookings(self):
+        self.authenticate(self.portal_user.login, self.portal_user.login)
+        self._get('/my/bookings')
+        with self.assertQueryCount(60):
+            self._get('/my/bookings')
+        self._log_timing('http_my_bookings', lambda: self._get('/my/bookings'))
+
+    def test_fields_catalog(self):
+        self._get('/bookings/fields')
+        with self.assertQueryCount(30):
+            self._get('/bookings/fields')
+        self._log_timing('http_fields', lambda: self._get('/bookings/fields'))
+
+    def test_available_slots(self):
+        payload = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': {
+            'field_id': self.sports_fields[0].id, 'date': fields.Date.to_string(self.first_day),
+        }})
+        headers = {'Content-Type': 'application/json'}
+
+        def available_slots():
+            result = self._get('/bookings/available-slots', data=payload, headers=headers).json()['result']
+            self.assertTrue(result.get('success'), result)
+        available_slots()
+        with self.assertQueryCount(20):
+            available_slots()
+        self._log_timing('http_available_slots', available_slots)
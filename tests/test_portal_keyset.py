@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from lxml import html
+
+from odoo.tests import HttpCase, tagged
+
+from odoo.addons.sports_booking.controllers.portal import SportsBookingPortal
+
+from .common import SportsBookingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPortalKeysetPagination(SportsBookingCommon, HttpCase):
+    """Listado /my/bookings paginado por clave, con páginas de tres reservas"""
+
+    _page_size = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        partner = cls.portal_user.partner_id
+        tuesday = cls.monday + timedelta(days=1)
+        # Dos reservas a la misma hora en canchas distintas: el desempate es el id
+        slots = [
+            (cls.field, cls.monday, 8.0), (cls.field, cls.monday, 10.0), (cls.field_2, cls.monday, 10.0),
+            (cls.field, cls.monday, 12.0), (cls.field, tuesday, 9.0), (cls.field_2, tuesday, 9.0),
+            (cls.field, tuesday, 15.0),
+        ]
+        cls.bookings = cls.env['sports.booking'].create([{
+            'name': 'KEYSET-%02d' % index,
+            'partner_id': partner.id,
+            'field_id': field.id,
+            'booking_date': booking_date,
+            'start_time': start_time,
+            'end_time': start_time + 1,
+            'state': 'confirmed',
+        } for index, (field, booking_date, start_time) in enumerate(slots)])
+        # Una reserva de otro cliente no aparece en el listado
+        cls._book(cls.field_2, cls.monday, 8.0, 9.0, name='KEYSET-OTHER')
+        cls.expected = cls.bookings.sorted(
+            lambda b: (b.booking_date, b.start_time, b.id), reverse=True).mapped('name')
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.portal_user.login, self.portal_user.login)
+        patcher = patch.object(SportsBookingPortal, '_items_per_page', self._page_size)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_page(self, url):
+        response = self.url_open(url)
+        self.assertEqual(response.status_code, 200, url)
+        document = html.fromstring(response.content)
+        names = [
+            name for name in (link.text_content().strip() for link in document.xpath('//a[@href]'))
+            if name.startswith('KEYSET-')
+        ]
+        links = {}
+        for link in document.xpath('//a[@href]'):
+            href = link.get('href')
+            if href.startswith('/my/bookings?'):
+                for direction in ('after', 'before'):
+                    if '%s=' % direction in href:
+                        links[direction] = href
+        return response, names, links
+
+    def test_pages_follow_order_without_gaps(self):
+        names, url, pages = [], '/my/bookings', 0
+        while url:
+            _response, page_names, links = self._get_page(url)
+            self.assertLessEqual(len(page_names), self._page_size)
+            names += page_names
+            url = links.get('after')
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(names, self.expected, "Orden por fecha, hora e id, sin repetidos ni faltantes")
+
+    def test_previous_page(self):
+        _response, first_names, links = self._get_page('/my/bookings')
+        self.assertNotIn('before', links, "La primera página no tiene página anterior")
+        _response, second_names, links = self._get_page(links['after'])
+        self.assertEqual(second_names, self.expected[3:6])
+        _response, previous_names, _links = self._get_page(links['before'])
+        self.assertEqual(previous_names, first_names)
+
+    def test_old_page_links(self):
+        response, names, _links = self._get_page('/my/bookings/page/2?sortby=date&filterby=all')
+        self.assertIn('after=', response.url)
+        self.assertIn('filterby=all', response.url)
+        self.assertEqual(names, self.expected[3:6])
+        # Una página que ya no existe vuelve al inicio del mismo listado
+        response, names, _links = self._get_page('/my/bookings/page/9')
+        self.assertNotIn('after=', response.url)
+        self.assertEqual(names, self.expected[:3])
+
+    def test_invalid_cursors_restart_the_list(self):
+        def encode(values):
+            return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        for token in ['not-base64!', encode({'a': 1}), encode(['2024-01-01', 10.0]),
+                      encode([10, 'x', 'y']), encode(['no-es-fecha', 10.0, 1]), encode(['2024-01-01', 10.0, True])]:
+            with self.subTest(token=token):
+                _response, names, _links = self._get_page('/my/bookings?after=%s' % token)
+                self.assertEqual(names, self.expected[:3])